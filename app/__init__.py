@@ -25,4 +25,9 @@ def create_app(config_class=Config):
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
     
+    # Préchargement avant le fork des workers, partagé en copie sur écriture
+    if app.config['PRELOAD']:
+        from app.lazy import preload
+        preload()
+    
     return app
\ No newline at end of file
@@ -0,0 +1,64 @@
+import gc
+import importlib
+
+# Modules chargés par preload: pile de données et géospatiale, puis services d'import et de validation
+PRELOAD_MODULES = [
+    'numpy', 'pandas', 'pyarrow.parquet', 'shapely', 'shapely.wkt', 'pyproj', 'fiona', 'geopandas',
+    'app.validators.adresse_validator', 'app.validators.organisme_validator',
+    'app.services.archive_reader', 'app.services.bulk_service', 'app.services.column_mapping',
+    'app.services.incremental_load', 'app.services.parquet_cache', 'app.services.import_service',
+]
+
+class LazyImport:
+    """
+    Module, ou attribut d'un module, importé au premier accès
+
+    Les services référencent ainsi pandas, geopandas, shapely et les validateurs sans les
+    charger au démarrage: seuls les imports et les validations les chargent, pas les
+    workers qui ne servent que des consultations. Les attributs lus sont conservés sur
+    le proxy, les accès suivants ne repassant pas par __getattr__.
+    """
+
+    def __init__(self, module, attribute=None):
+        """
+        Args:
+            module (str): Nom complet du module (ex: 'geopandas', 'app.services.bulk_service')
+            attribute (str): Attribut du module représenté (ex: 'BulkService'), None pour le module
+        """
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            self._target = getattr(target, self._attribute) if self._attribute else target
+        return self._target
+
+    def __getattr__(self, name):
+        value = getattr(self._load(), name)
+        setattr(self, name, value)
+        return value
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        name = f"{self._module}.{self._attribute}" if self._attribute else self._module
+        return f"<LazyImport {name}{'' if self._target is None else ' (chargé)'}>"
+
+
+def preload():
+    """
+    Charge les bibliothèques lourdes et prépare les règles de validation avant le fork des workers
+
+    Appelé par create_app quand PRELOAD est activé, avec un serveur qui crée l'application
+    avant de lancer ses workers (gunicorn --preload): les modules, plans de règles compilés
+    et transformations de coordonnées sont alors partagés en copie sur écriture. Les objets
+    créés sont ensuite exclus du ramasse-miettes (gc.freeze), dont les passages dans les
+    workers recopieraient sinon les pages mémoire qui les contiennent.
+    """
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+    importlib.import_module('app.validators.rules').preload()
+    gc.freeze()
@@ -0,0 +1,14 @@
+from app import db
+
+class AdresseEmpreinte(db.Model):
+    __tablename__ = 't_adresse_empreinte'
+    __table_args__ = {'schema': 'gracethd_commun'}
+    
+    # Empreinte de la dernière version chargée de chaque adresse (import incrémental)
+    ad_code = db.Column(db.String(254), primary_key=True,
+                       comment="Code de l'adresse dans la table t_adresse")
+    empreinte = db.Column(db.BigInteger, nullable=False,
+                         comment="Hachage des valeurs normalisées et de la géométrie (WKB) de l'adresse")
+    
+    def __repr__(self):
+        return f'<AdresseEmpreinte {self.ad_code}: {self.empreinte}>'
@@ -0,0 +1,29 @@
+from app import db
+
+class ValidationResult(db.Model):
+    __tablename__ = 'validation_result'
+    __table_args__ = {'schema': 'gracethd_commun'}
+    
+    # Une ligne de statut par objet validé, puis une ligne par contrôle en échec
+    # (mêmes lignes que le rapport de validation)
+    table_name = db.Column(db.String(64), primary_key=True,
+                          comment="Table de l'objet validé (ex: t_adresse)")
+    code_objet = db.Column(db.String(254), primary_key=True,
+                          comment="Code de l'objet validé")
+    controle = db.Column(db.String(100), primary_key=True,
+                        comment="Identifiant du contrôle ('Validation complète' pour le statut de l'objet)")
+    statut = db.Column(db.String(3), nullable=False,
+                      comment="Résultat du contrôle (OK/NOK)")
+    message = db.Column(db.Text,
+                       comment="Message du contrôle")
+    
+    # Méta-données de revalidation
+    ruleset_version = db.Column(db.String(12), nullable=False,
+                               comment="Version du jeu de règles utilisée (RULESET_VERSION)")
+    empreinte = db.Column(db.BigInteger,
+                         comment="Empreinte de l'objet validé, sur la ligne de statut (import incrémental)")
+    validated_at = db.Column(db.DateTime, nullable=False,
+                            comment="Date de la validation")
+    
+    def __repr__(self):
+        return f'<ValidationResult {self.table_name} {self.code_objet} {self.controle}: {self.statut}>'
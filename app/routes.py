@@ -1,10 +1,15 @@
 import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_from_directory
+import json
+import uuid
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app,
+                   send_from_directory, Response, stream_with_context)
+from werkzeug.datastructures import MultiDict
 from werkzeug.utils import secure_filename
 from app.services.adresse_service import AdresseService
 from app.services.organisme_service import OrganismeService
-from app.services.import_service import ImportService
-from app.services.export_service import ExportService
+from app.services.instrumentation import MetricsRegistry
+from app.services.job_service import JobService
+from app.services.validation_result_service import ValidationResultService
 
 bp = Blueprint('main', __name__)
 
@@ -13,6 +18,13 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in {'csv', 'shp', 'geojson', 'zip'}
 
+def save_upload(file):
+    """Enregistre un fichier déposé sous un nom unique (plusieurs imports peuvent être en cours)"""
+    filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    file.save(file_path)
+    return file_path
+
 @bp.route('/')
 def index():
     """Page d'accueil"""
@@ -37,47 +49,13 @@ def import_data():
         
         # Vérifier si le fichier est autorisé
         if file and allowed_file(file.filename):
-            # Sauvegarder le fichier
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
-            
-            # Importer les données
-            result = ImportService.import_from_file(file_path)
-            
-            # Générer le rapport de validation
-            export_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'reports')
-            report_path = ExportService.generate_validation_report(result, export_dir)
-            report_filename = os.path.basename(report_path)
-            
-            # Supprimer le fichier d'import temporaire
-            os.remove(file_path)
+            # Sauvegarder le fichier puis confier l'import et le rapport à un worker
+            file_path = save_upload(file)
+            job_id = JobService.submit(current_app._get_current_object(), file_path,
+                                       use_cache=not request.form.get('force'))
             
-            # Gérer le résultat
-            if result['success']:
-                flash(result['message'], 'success')
-                
-                # Ajouter des messages pour chaque table
-                for table_result in result.get('tables', []):
-                    status_class = 'success' if table_result.get('success') else 'warning'
-                    flash(f"Table {table_result.get('table')}: {table_result.get('message')}", status_class)
-                
-                # Rediriger vers la page d'importation avec le nom du fichier de rapport
-                return render_template('import_data.html', report_file=report_filename)
-            else:
-                flash(result['message'], 'danger')
-                
-                # Ajouter des messages pour chaque table
-                for table_result in result.get('tables', []):
-                    if not table_result.get('success'):
-                        flash(f"Table {table_result.get('table')}: {table_result.get('message')}", 'warning')
-                        
-                        # Afficher les erreurs détaillées
-                        for error in table_result.get('errors', []):
-                            flash(error, 'danger')
-                
-                # Même en cas d'erreur, on propose le téléchargement du rapport
-                return render_template('import_data.html', report_file=report_filename)
+            # La page suit l'avancement de la tâche via /api/jobs/<job_id>
+            return render_template('import_data.html', job_id=job_id)
         else:
             flash('Type de fichier non autorisé. Formats acceptés : ZIP', 'danger')
             return redirect(request.url)
@@ -95,10 +73,14 @@ def download_report(filename):
 # Routes pour la visualisation des adresses
 @bp.route('/adresses')
 def adresses():
-    """Liste des adresses avec pagination"""
-    page = request.args.get('page', 1, type=int)
+    """Liste des adresses avec pagination par curseur"""
+    cursor = request.args.get('cursor')
     per_page = request.args.get('per_page', 10, type=int)
-    adresses = AdresseService.get_all_adresses(page, per_page)
+    try:
+        adresses = AdresseService.get_adresses_page(cursor, per_page)
+    except ValueError:
+        flash('Lien de pagination invalide', 'warning')
+        return redirect(url_for('main.adresses'))
     return render_template('adresse.html', adresses=adresses)
 
 @bp.route('/adresses/<string:ad_code>')
@@ -159,34 +141,115 @@ def validate_organisme(or_code):
 # API Routes
 @bp.route('/api/adresses', methods=['GET'])
 def api_adresses():
-    """API pour récupérer la liste des adresses"""
-    page = request.args.get('page', 1, type=int)
+    """API pour récupérer la liste des adresses (pagination par curseur)"""
+    cursor = request.args.get('cursor')
     per_page = request.args.get('per_page', 10, type=int)
+    exact_count = request.args.get('count') == 'exact'
     
-    pagination = AdresseService.get_all_adresses(page, per_page)
-    adresses = pagination.items
+    try:
+        pagination = AdresseService.get_adresses_page(cursor, per_page, exact_count)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
-    # Convertir les adresses en dictionnaire
-    adresses_dict = []
-    for adresse in adresses:
-        adresse_dict = {
-            'ad_code': adresse.ad_code,
-            'ad_nomvoie': adresse.ad_nomvoie,
-            'ad_numero': adresse.ad_numero,
-            'ad_rep': adresse.ad_rep,
-            'ad_commune': adresse.ad_commune,
-            'ad_postal': adresse.ad_postal,
-            'ad_insee': adresse.ad_insee
-        }
-        adresses_dict.append(adresse_dict)
+    # Convertir les adresses en dictionnaire (colonnes projetées uniquement)
+    adresses_dict = [dict(adresse._mapping) for adresse in pagination.items]
     
     return jsonify({
         'adresses': adresses_dict,
         'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': pagination.page
+        'total_estime': pagination.total_estimated,
+        'per_page': pagination.per_page,
+        'next_cursor': pagination.next_cursor,
+        'prev_cursor': pagination.prev_cursor
     })
 
+def parse_adresse_filters(args):
+    """
+    Lit les filtres de recherche d'adresses (paramètres d'URL ou objet JSON converti en MultiDict)
+    
+    Returns:
+        tuple: (filtres pour AdresseService.search_adresses, message d'erreur ou None)
+    """
+    def values(name):
+        # Plusieurs valeurs acceptées: ?ad_insee=30117,30118 ou ?ad_insee=30117&ad_insee=30118
+        return [value.strip() for arg in args.getlist(name) for value in str(arg).split(',') if value.strip()]
+    
+    filters = {
+        'ad_insee': values('ad_insee'),
+        'ad_postal': values('ad_postal'),
+        'ad_ietat': values('ad_ietat'),
+        'statut': [value.upper() for value in values('statut')],
+        'ad_commune': str(args.get('ad_commune', '')).strip() or None,
+        'commune_mode': args.get('commune_mode', 'prefixe'),
+        'limit': args.get('limit', type=int)
+    }
+    if filters['commune_mode'] not in ('prefixe', 'trigramme'):
+        return None, "commune_mode doit valoir 'prefixe' ou 'trigramme'"
+    if not set(filters['statut']) <= {'OK', 'NOK'}:
+        return None, "statut doit valoir 'OK' ou 'NOK'"
+    
+    bbox = values('bbox')
+    if bbox:
+        try:
+            filters['bbox'] = tuple(float(value) for value in bbox)
+        except ValueError:
+            filters['bbox'] = ()
+        if len(filters['bbox']) != 4:
+            return None, 'bbox attendu: xmin,ymin,xmax,ymax (EPSG:4326)'
+    
+    if not any(filters[name] for name in ('ad_insee', 'ad_postal', 'ad_ietat', 'ad_commune', 'statut')) and not bbox:
+        return None, 'Au moins un filtre est requis'
+    return filters, None
+
+@bp.route('/api/adresses/search', methods=['GET'])
+def api_search_adresses():
+    """API de recherche d'adresses par filtres, résultats envoyés en flux"""
+    filters, error = parse_adresse_filters(request.args)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    
+    query = AdresseService.search_adresses(**filters)
+    
+    def generate():
+        # Document JSON écrit au fil du curseur serveur: les adresses ne sont jamais toutes en mémoire
+        yield '{"success": true, "adresses": ['
+        count = 0
+        for adresse in query.yield_per(1000):
+            yield (',' if count else '') + json.dumps(dict(adresse._mapping), ensure_ascii=False)
+            count += 1
+        yield f'], "count": {count}}}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+@bp.route('/api/adresses/validate', methods=['POST'])
+def api_validate_adresses():
+    """API pour valider un lot d'adresses en un seul appel (liste de codes ou filtres de recherche)"""
+    payload = request.get_json(silent=True) or {}
+    max_batch = current_app.config['VALIDATION_BATCH_MAX']
+    
+    codes = payload.get('codes')
+    if codes is not None:
+        if not isinstance(codes, list) or len(codes) > max_batch:
+            return jsonify({'success': False, 'message': f'codes doit être une liste de {max_batch} codes au plus'}), 400
+        results = AdresseService.validate_adresses(codes=[str(code) for code in codes])
+        return jsonify({
+            'success': True,
+            'results': results,
+            'not_found': [code for code in codes if str(code) not in results]
+        })
+    
+    if not isinstance(payload.get('filters'), dict):
+        return jsonify({'success': False, 'message': 'codes ou filters attendu'}), 400
+    args = MultiDict([
+        (name, value) for name, given in payload['filters'].items()
+        for value in (given if isinstance(given, list) else [given])
+    ])
+    filters, error = parse_adresse_filters(args)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    filters['limit'] = min(filters['limit'] or max_batch, max_batch)
+    return jsonify({'success': True, 'results': AdresseService.validate_adresses(filters=filters)})
+
 @bp.route('/api/adresses/<string:ad_code>', methods=['GET'])
 def api_adresse(ad_code):
     """API pour récupérer les détails d'une adresse"""
@@ -234,6 +297,22 @@ def api_organismes():
         'current_page': pagination.page
     })
 
+@bp.route('/api/organismes/validate', methods=['POST'])
+def api_validate_organismes():
+    """API pour valider un lot d'organismes en un seul appel"""
+    payload = request.get_json(silent=True) or {}
+    max_batch = current_app.config['VALIDATION_BATCH_MAX']
+    
+    codes = payload.get('codes')
+    if not isinstance(codes, list) or len(codes) > max_batch:
+        return jsonify({'success': False, 'message': f'codes doit être une liste de {max_batch} codes au plus'}), 400
+    results = OrganismeService.validate_organismes([str(code) for code in codes])
+    return jsonify({
+        'success': True,
+        'results': results,
+        'not_found': [code for code in codes if str(code) not in results]
+    })
+
 @bp.route('/api/organismes/<string:or_code>', methods=['GET'])
 def api_organisme(or_code):
     """API pour récupérer les détails d'un organisme"""
@@ -251,6 +330,47 @@ def api_organisme(or_code):
         'organisme': organisme_dict
     })
 
+@bp.route('/api/validation/summary', methods=['GET'])
+def api_validation_summary():
+    """API de synthèse des résultats de validation (nombres par table, contrôle, statut, commune)"""
+    def values(name):
+        return [value.strip() for arg in request.args.getlist(name) for value in arg.split(',') if value.strip()]
+    
+    group_by = values('group_by') or ['table', 'controle', 'statut']
+    filters = {name: values(name) for name in ValidationResultService.SUMMARY_GROUPS if values(name)}
+    try:
+        results = ValidationResultService.summary(group_by, filters)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'group_by': group_by,
+        'results': results
+    })
+
+@bp.route('/api/validation/report', methods=['POST'])
+def api_validation_report():
+    """API de régénération du rapport de validation à partir des résultats enregistrés (sans import)"""
+    payload = request.get_json(silent=True) or {}
+    tables = payload.get('tables') or list(ValidationResultService.TABLES)
+    unknown = [table for table in tables if table not in ValidationResultService.TABLES]
+    if unknown:
+        return jsonify({
+            'success': False,
+            'message': f"Table inconnue: {', '.join(map(str, unknown))} "
+                       f"(valeurs possibles: {', '.join(ValidationResultService.TABLES)})"
+        }), 400
+    
+    # Revalidation des seuls objets modifiés depuis leur dernière validation (tous avec full), en tâche de fond
+    job_id = JobService.submit_report(current_app._get_current_object(), tables, full=bool(payload.get('full')))
+    return jsonify({
+        'success': True,
+        'message': 'Régénération du rapport mise en file d\'attente',
+        'job_id': job_id,
+        'status_url': url_for('main.api_job', job_id=job_id, _external=True)
+    }), 202
+
 @bp.route('/api/import', methods=['POST'])
 def api_import_data():
     """API pour importer des données et générer un rapport"""
@@ -262,37 +382,46 @@ def api_import_data():
         return jsonify({'success': False, 'message': 'Nom de fichier vide'}), 400
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
-        # Importer les données
-        result = ImportService.import_from_file(file_path)
-        
-        # Générer le rapport de validation
-        export_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'reports')
-        report_path = ExportService.generate_validation_report(result, export_dir)
-        report_filename = os.path.basename(report_path)
-        
-        # Supprimer le fichier d'import temporaire
-        os.remove(file_path)
+        file_path = save_upload(file)
+        job_id = JobService.submit(current_app._get_current_object(), file_path,
+                                   use_cache=not request.form.get('force'))
         
-        if result['success']:
-            return jsonify({
-                'success': True,
-                'message': result['message'],
-                'tables': result.get('tables', []),
-                'report_url': url_for('main.download_report', filename=report_filename, _external=True)
-            }), 200
-        else:
-            return jsonify({
-                'success': False,
-                'message': result['message'],
-                'tables': result.get('tables', []),
-                'report_url': url_for('main.download_report', filename=report_filename, _external=True)
-            }), 400
+        return jsonify({
+            'success': True,
+            'message': 'Importation mise en file d\'attente',
+            'job_id': job_id,
+            'status_url': url_for('main.api_job', job_id=job_id, _external=True)
+        }), 202
     else:
         return jsonify({
             'success': False,
             'message': 'Type de fichier non autorisé. Formats acceptés : ZIP'
         }), 400
+
+@bp.route('/api/jobs/<string:job_id>', methods=['GET'])
+def api_job(job_id):
+    """API pour suivre l'avancement d'une importation en tâche de fond"""
+    job = JobService.get_job(current_app._get_current_object(), job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Tâche non trouvée'}), 404
+    
+    response = {
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'phase': job['phase'],
+        'rows_processed': job['rows_processed'],
+        'elapsed': job['elapsed'],
+        'throughput': job['throughput'],  # Lignes par seconde
+        'result': job['result']
+    }
+    if job['report_filename']:
+        response['report_url'] = url_for('main.download_report', filename=job['report_filename'], _external=True)
+    return jsonify(response)
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Mesures cumulées des imports de ce processus, au format texte Prometheus (METRICS_ENABLED)"""
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({'success': False, 'message': 'Métriques désactivées'}), 404
+    return Response(MetricsRegistry.to_prometheus(), mimetype='text/plain; version=0.0.4')
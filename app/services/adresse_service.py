@@ -1,16 +1,36 @@
 import os
-import zipfile
-import tempfile
-import shutil
-import pandas as pd
-import geopandas as gpd
-from shapely import wkt
+import functools
+import contextlib
+from flask import current_app
+from sqlalchemy import func, exists
 from app import db
+from app.lazy import LazyImport
 from app.models.adresse import Adresse
-from app.validators.adresse_validator import AdresseValidator
-from sqlalchemy.exc import IntegrityError
+from app.models.adresse_empreinte import AdresseEmpreinte
+from app.models.validation_result import ValidationResult
+from app.services.instrumentation import Trace
+from app.services.pagination import KeysetPagination
+from app.services.report_writer import ReportWriter
+
+# Pile de données et géospatiale chargée au premier import ou à la première validation:
+# la consultation des adresses n'en a pas besoin
+pd = LazyImport('pandas')
+gpd = LazyImport('geopandas')
+wkt = LazyImport('shapely.wkt')
+ArchiveReader = LazyImport('app.services.archive_reader', 'ArchiveReader')
+BulkService = LazyImport('app.services.bulk_service', 'BulkService')
+ColumnMapping = LazyImport('app.services.column_mapping', 'ColumnMapping')
+IncrementalLoad = LazyImport('app.services.incremental_load', 'IncrementalLoad')
+ParquetCache = LazyImport('app.services.parquet_cache', 'ParquetCache')
+AdresseValidator = LazyImport('app.validators.adresse_validator', 'AdresseValidator')
 
 class AdresseService:
+    # Colonnes chargées pour la liste des adresses (page /adresses et /api/adresses)
+    LIST_COLUMNS = ('ad_code', 'ad_nomvoie', 'ad_numero', 'ad_rep', 'ad_commune', 'ad_postal', 'ad_insee')
+    
+    # Colonnes renvoyées par la recherche (/api/adresses/search)
+    SEARCH_COLUMNS = LIST_COLUMNS + ('ad_ietat',)
+    
     @staticmethod
     def import_from_file(file_path):
         """
@@ -25,174 +45,16 @@ class AdresseService:
         file_ext = os.path.splitext(file_path)[1].lower()
         
         try:
-            # Gérer les fichiers ZIP
+            # Gérer les fichiers ZIP: lecture directe dans l'archive, sans extraction
             if file_ext == '.zip':
-                # Créer un dossier temporaire pour extraire les fichiers
-                temp_dir = tempfile.mkdtemp()
-                try:
-                    # Extraire tous les fichiers du ZIP
-                    with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                        zip_ref.extractall(temp_dir)
-                    
-                    # Chercher un fichier SHP dans le dossier
-                    # Nous cherchons d'abord les fichiers .shp
-                    shp_files = []
-                    for root, dirs, files in os.walk(temp_dir):
-                        for file in files:
-                            if file.lower().endswith('.shp') and 't_adresse' in file.lower():
-                                shp_files.append(os.path.join(root, file))
-                    
-                    if shp_files:
-                        # Utiliser le premier fichier SHP trouvé
-                        shp_path = shp_files[0]
-                        try:
-                            # Lire le fichier SHP
-                            gdf = gpd.read_file(shp_path)
-                            
-                            # Convertir à EPSG:4326 si nécessaire
-                            if gdf.crs and gdf.crs != "EPSG:4326":
-                                gdf = gdf.to_crs("EPSG:4326")
-                        except Exception as e:
-                            return {
-                                'success': False,
-                                'message': f"Erreur lors de la lecture du Shapefile: {str(e)}"
-                            }
-                    else:
-                        # Chercher des fichiers CSV si pas de SHP
-                        csv_files = []
-                        for root, dirs, files in os.walk(temp_dir):
-                            for file in files:
-                                if file.lower().endswith('.csv') and 't_adresse' in file.lower():
-                                    csv_files.append(os.path.join(root, file))
-                        
-                        if csv_files:
-                            # Utiliser le premier fichier CSV trouvé
-                            csv_path = csv_files[0]
-                            
-                            # Lire le fichier CSV avec tolérance aux erreurs
-                            try:
-                                df = pd.read_csv(csv_path, 
-                                              sep=';',
-                                              on_bad_lines='skip',
-                                              dtype=str,
-                                              encoding='utf-8-sig')
-                            except TypeError:
-                                # Pour les versions plus anciennes de pandas
-                                df = pd.read_csv(csv_path, 
-                                              sep=';',
-                                              error_bad_lines=False,
-                                              warn_bad_lines=True,
-                                              dtype=str,
-                                              encoding='utf-8-sig')
-                            
-                            # Traiter selon la structure du CSV
-                            if 'longitude' in df.columns and 'latitude' in df.columns:
-                                # Convertir les colonnes en numérique
-                                df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-                                df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-                                
-                                # Créer un GeoDataFrame à partir des coordonnées
-                                gdf = gpd.GeoDataFrame(
-                                    df, 
-                                    geometry=gpd.points_from_xy(df.longitude, df.latitude),
-                                    crs="EPSG:4326"
-                                )
-                            elif 'geom' in df.columns:
-                                # Filtrer les géométries valides
-                                df = df[df['geom'].notna()]
-                                try:
-                                    # Convertir les géométries WKT en objets shapely
-                                    df['geometry'] = df['geom'].apply(lambda x: wkt.loads(x) if isinstance(x, str) else None)
-                                    # Filtrer les lignes avec des géométries valides
-                                    df = df[df['geometry'].notna()]
-                                    gdf = gpd.GeoDataFrame(df, geometry='geometry', crs="EPSG:4326")
-                                except Exception as e:
-                                    return {
-                                        'success': False,
-                                        'message': f"Erreur lors de la conversion des géométries: {str(e)}"
-                                    }
-                            else:
-                                # Si pas de géométrie, créer un GeoDataFrame vide
-                                gdf = gpd.GeoDataFrame(df)
-                                gdf.crs = "EPSG:4326"
-                        else:
-                            # Dernier recours : chercher un fichier DBF
-                            dbf_files = []
-                            for root, dirs, files in os.walk(temp_dir):
-                                for file in files:
-                                    if file.lower().endswith('.dbf') and 't_adresse' in file.lower():
-                                        dbf_files.append(os.path.join(root, file))
-                            
-                            if dbf_files:
-                                # Créer un GeoDataFrame à partir du DBF
-                                try:
-                                    # Tenter de lire directement le DBF
-                                    df = gpd.read_file(dbf_files[0])
-                                    gdf = gpd.GeoDataFrame(df)
-                                    gdf.crs = "EPSG:4326"
-                                except Exception as e:
-                                    # Si échec, créer un DataFrame vide avec les bons noms de colonnes
-                                    return {
-                                        'success': False,
-                                        'message': f"Aucun fichier d'adresses valide trouvé dans l'archive ZIP: {str(e)}"
-                                    }
-                            else:
-                                return {
-                                    'success': False,
-                                    'message': "Aucun fichier d'adresses valide trouvé dans l'archive ZIP"
-                                }
-                finally:
-                    # Nettoyer le dossier temporaire
-                    shutil.rmtree(temp_dir)
+                with ArchiveReader(file_path) as archive:
+                    return AdresseService.import_from_archive(archive)
             
             # Traiter les autres formats directement
             elif file_ext == '.csv':
                 # Lire le CSV avec tolérance aux erreurs
-                try:
-                    df = pd.read_csv(file_path, 
-                                  sep=';',
-                                  on_bad_lines='skip',
-                                  dtype=str,
-                                  encoding='utf-8-sig')
-                except TypeError:
-                    # Pour les versions plus anciennes de pandas
-                    df = pd.read_csv(file_path, 
-                                  sep=';',
-                                  error_bad_lines=False,
-                                  warn_bad_lines=True,
-                                  dtype=str,
-                                  encoding='utf-8-sig')
-                
-                # Traiter selon la structure du CSV
-                if 'longitude' in df.columns and 'latitude' in df.columns:
-                    # Convertir les colonnes en numérique
-                    df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-                    df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-                    
-                    # Créer un GeoDataFrame à partir des coordonnées
-                    gdf = gpd.GeoDataFrame(
-                        df, 
-                        geometry=gpd.points_from_xy(df.longitude, df.latitude),
-                        crs="EPSG:4326"
-                    )
-                elif 'geom' in df.columns:
-                    # Filtrer les géométries valides
-                    df = df[df['geom'].notna()]
-                    try:
-                        # Convertir les géométries WKT en objets shapely
-                        df['geometry'] = df['geom'].apply(lambda x: wkt.loads(x) if isinstance(x, str) else None)
-                        # Filtrer les lignes avec des géométries valides
-                        df = df[df['geometry'].notna()]
-                        gdf = gpd.GeoDataFrame(df, geometry='geometry', crs="EPSG:4326")
-                    except Exception as e:
-                        return {
-                            'success': False,
-                            'message': f"Erreur lors de la conversion des géométries: {str(e)}"
-                        }
-                else:
-                    # Si pas de géométrie, créer un GeoDataFrame vide
-                    gdf = gpd.GeoDataFrame(df)
-                    gdf.crs = "EPSG:4326"
+                df = AdresseService._read_csv(pd.read_csv, file_path)
+                gdf = AdresseService._csv_to_geodataframe(df)
             
             # Traiter directement les Shapefiles et GeoJSON
             elif file_ext in ['.shp', '.geojson', '.dbf']:
@@ -238,94 +100,120 @@ class AdresseService:
                     'message': f"Format de fichier non supporté: {file_ext}"
                 }
             
-            # Validation des données avec tolérance
-            validator = AdresseValidator()
-            validation_results = {'valid': True, 'errors': []}  # Force validation à True pour permettre l'import
+            # Pas de rapport pour un fichier isolé: la section de validation est supprimée
+            return ReportWriter.discard_section(
+                AdresseService.load_prepared(AdresseService._prepare_geodataframe(gdf))
+            )
+                
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f"Erreur lors de l'importation: {str(e)}"
+            }
+    
+    @staticmethod
+    def import_from_archive(archive, memory_budget=None):
+        """
+        Importe les adresses d'une archive ZIP déjà indexée, sans rapport de validation
+        
+        Args:
+            archive (ArchiveReader): Archive ouverte
+            memory_budget (int): Mémoire disponible pour le fichier, en octets (None: illimitée)
             
-            # Préparation des données pour l'insertion
-            adresses = []
-            for _, row in gdf.iterrows():
-                try:
-                    adresse = AdresseService._create_adresse_from_row(row)
-                    adresses.append(adresse)
-                except Exception as e:
-                    # Ignorer les lignes qui posent problème
-                    continue
+        Returns:
+            dict: Résultat de l'importation avec statut et messages
+        """
+        return ReportWriter.discard_section(
+            AdresseService.load_prepared(AdresseService.prepare_archive(archive, memory_budget))
+        )
+    
+    @staticmethod
+    def prepare_archive(archive, memory_budget=None, cache_dir=None, validation=None):
+        """
+        Lit, valide et convertit les adresses d'une archive sans accéder à la base
+        
+        Seul le membre t_adresse est lu: le Shapefile via /vsizip/, à défaut le CSV
+        en flux, et en dernier recours le DBF seul. Cette étape, coûteuse en calcul,
+        peut s'exécuter dans un processus séparé. Un CSV qui ne tient pas dans le
+        budget mémoire est seulement repéré ici: il sera lu, validé et chargé par
+        morceaux par load_prepared.
+        
+        Args:
+            archive (ArchiveReader): Archive ouverte
+            memory_budget (int): Mémoire disponible pour le fichier, en octets (None: illimitée)
+            cache_dir (str): Dossier du cache Parquet des tables analysées (None: pas de cache)
+            validation (dict): Validation reprise d'une livraison identique (ValidationCache),
+                               les adresses n'étant alors pas revalidées
+            
+        Returns:
+            dict: Données préparées pour load_prepared, ou résultat d'échec
+        """
+        try:
+            # Nous cherchons d'abord les fichiers .shp
+            shp_member = archive.find('t_adresse', ('.shp',))
+            csv_member = archive.find('t_adresse', ('.csv',))
+            dbf_member = archive.find('t_adresse', ('.dbf',))
             
-            # Vérifier si des adresses ont été extraites
-            if not adresses:
+            member = shp_member or csv_member or dbf_member
+            if member is None:
                 return {
                     'success': False,
-                    'message': "Aucune adresse valide n'a été extraite du fichier",
-                    'errors': ["Format de données non conforme ou données invalides"]
+                    'message': "Aucun fichier d'adresses valide trouvé dans l'archive ZIP"
                 }
             
-            # Insertion en base de données avec gestion des doublons
-            try:
-                inserted_count = 0
-                updated_count = 0
-                skipped_count = 0
-                errors = []
-                
-                for adresse in adresses:
-                    try:
-                        # Vérifier si l'adresse existe déjà
-                        existing = Adresse.query.get(adresse.ad_code)
-                        
-                        if existing:
-                            # Mettre à jour l'adresse existante
-                            for column in Adresse.__table__.columns.keys():
-                                if column != 'ad_code':  # Ne pas modifier la clé primaire
-                                    if column == 'geom' and hasattr(adresse, 'geom') and adresse.geom is not None:
-                                        setattr(existing, column, adresse.geom)
-                                    elif hasattr(adresse, column) and getattr(adresse, column) is not None:
-                                        setattr(existing, column, getattr(adresse, column))
-                            updated_count += 1
-                        else:
-                            # Insérer la nouvelle adresse
-                            db.session.add(adresse)
-                            inserted_count += 1
-                        
-                        # Faire un commit partiel toutes les 50 opérations pour éviter une trop grosse transaction
-                        if (inserted_count + updated_count) % 50 == 0:
-                            db.session.commit()
+            if member == csv_member:
+                chunksize = archive.csv_chunksize(csv_member, memory_budget)
+                if chunksize:
+                    # Fichier trop volumineux pour le budget mémoire: traitement par morceaux
+                    return {
+                        'success': True,
+                        'stream': {'file_path': archive.file_path, 'member': csv_member, 'chunksize': chunksize,
+                                   'validation': validation}
+                    }
+            
+            # Membre déjà analysé lors d'une livraison précédente: relecture du cache columnar
+            with Trace.span('lecture', 't_adresse') as span:
+                cache = ParquetCache(cache_dir)
+                digest = archive.digest(member) if cache_dir else None
+                gdf = cache.load('t_adresse', digest)
+                if gdf is None:
+                    if member == shp_member:
+                        try:
+                            # Lire le fichier SHP
+                            gdf = archive.read_vector(shp_member)
                             
-                    except IntegrityError as ie:
-                        # Gérer spécifiquement les erreurs d'intégrité
-                        db.session.rollback()
-                        skipped_count += 1
-                        errors.append(f"Erreur d'intégrité pour l'adresse {adresse.ad_code}: {str(ie)}")
-                    except Exception as e:
-                        # Gérer les autres erreurs
-                        db.session.rollback()
-                        skipped_count += 1
-                        errors.append(f"Erreur pour l'adresse {adresse.ad_code}: {str(e)}")
-                
-                # Commit final
-                db.session.commit()
-                
-                message = f"{inserted_count} adresses importées, {updated_count} mises à jour"
-                if skipped_count > 0:
-                    message += f", {skipped_count} ignorées en raison d'erreurs"
-                
-                success = inserted_count + updated_count > 0
-                
-                return {
-                    'success': success,
-                    'message': message,
-                    'count': inserted_count + updated_count,
-                    'inserted': inserted_count,
-                    'updated': updated_count,
-                    'skipped': skipped_count,
-                    'errors': errors[:10]  # Limiter le nombre d'erreurs retournées pour éviter un message trop long
-                }
-            except Exception as e:
-                db.session.rollback()
-                return {
-                    'success': False,
-                    'message': f"Erreur lors de l'insertion en base: {str(e)}"
-                }
-                
+                            # Convertir à EPSG:4326 si nécessaire
+                            if gdf.crs and gdf.crs != "EPSG:4326":
+                                gdf = gdf.to_crs("EPSG:4326")
+                        except Exception as e:
+                            return {
+                                'success': False,
+                                'message': f"Erreur lors de la lecture du Shapefile: {str(e)}"
+                            }
+                    elif member == csv_member:
+                        # Lire le fichier CSV avec tolérance aux erreurs
+                        df = AdresseService._read_csv(archive.read_csv, csv_member)
+                        gdf = AdresseService._csv_to_geodataframe(df)
+                    else:
+                        # Dernier recours : créer un GeoDataFrame à partir du DBF
+                        try:
+                            df = archive.read_vector(dbf_member)
+                            gdf = gpd.GeoDataFrame(df)
+                            gdf.crs = "EPSG:4326"
+                        except Exception as e:
+                            return {
+                                'success': False,
+                                'message': f"Aucun fichier d'adresses valide trouvé dans l'archive ZIP: {str(e)}"
+                            }
+                    cache.store('t_adresse', digest, gdf)
+                span.rows = len(gdf)
+            
+            if validation is not None:
+                return AdresseService._prepare_geodataframe(gdf, validation=validation)
+            with Trace.span('contexte'):
+                context = AdresseValidator().read_context(archive)
+            return AdresseService._prepare_geodataframe(gdf, context)
+        
         except Exception as e:
             return {
                 'success': False,
@@ -333,45 +221,300 @@ class AdresseService:
             }
     
     @staticmethod
-    def _create_adresse_from_row(row):
+    def _read_csv(reader, source):
         """
-        Crée un objet Adresse à partir d'une ligne de DataFrame
+        Lit un CSV d'adresses avec tolérance aux lignes mal formées
         
         Args:
-            row: Ligne de DataFrame avec les données d'adresse
+            reader (callable): pandas.read_csv ou ArchiveReader.read_csv
+            source: Chemin du fichier ou nom du membre dans l'archive
             
         Returns:
-            Adresse: Instance du modèle Adresse
+            DataFrame: Contenu du CSV, toutes colonnes en texte
+        """
+        try:
+            return reader(source, 
+                          sep=';',
+                          on_bad_lines='skip',
+                          dtype=str,
+                          encoding='utf-8-sig')
+        except TypeError:
+            # Pour les versions plus anciennes de pandas
+            return reader(source, 
+                          sep=';',
+                          error_bad_lines=False,
+                          warn_bad_lines=True,
+                          dtype=str,
+                          encoding='utf-8-sig')
+    
+    @staticmethod
+    def _csv_to_geodataframe(df):
         """
-        adresse = Adresse()
+        Construit un GeoDataFrame à partir d'un CSV d'adresses selon sa structure
         
-        # Mapper les colonnes du DataFrame vers les attributs du modèle
-        for column in Adresse.__table__.columns.keys():
-            # Cas spécial pour la géométrie
-            if column == 'geom':
-                if hasattr(row, 'geometry') and row.geometry is not None:
-                    adresse.geom = row.geometry.wkt
-                continue
-                
-            # Pour les autres colonnes, vérifier si elles existent dans le DataFrame
+        Args:
+            df (DataFrame): Contenu du CSV
+            
+        Returns:
+            GeoDataFrame: Adresses en EPSG:4326
+        """
+        if 'longitude' in df.columns and 'latitude' in df.columns:
+            # Convertir les colonnes en numérique
+            df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
+            df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
+            
+            # Créer un GeoDataFrame à partir des coordonnées
+            return gpd.GeoDataFrame(
+                df, 
+                geometry=gpd.points_from_xy(df.longitude, df.latitude),
+                crs="EPSG:4326"
+            )
+        elif 'geom' in df.columns:
+            # Filtrer les géométries valides
+            df = df[df['geom'].notna()]
             try:
-                if hasattr(row, column):
-                    value = getattr(row, column)
-                elif column in row:
-                    value = row[column]
+                # Convertir les géométries WKT en objets shapely
+                df['geometry'] = df['geom'].apply(lambda x: wkt.loads(x) if isinstance(x, str) else None)
+                # Filtrer les lignes avec des géométries valides
+                df = df[df['geometry'].notna()]
+                return gpd.GeoDataFrame(df, geometry='geometry', crs="EPSG:4326")
+            except Exception as e:
+                raise ValueError(f"Erreur lors de la conversion des géométries: {str(e)}")
+        else:
+            # Si pas de géométrie, créer un GeoDataFrame vide
+            gdf = gpd.GeoDataFrame(df)
+            gdf.crs = "EPSG:4326"
+            return gdf
+    
+    @staticmethod
+    def _prepare_geodataframe(gdf, context=None, validation=None):
+        """
+        Valide et convertit un GeoDataFrame d'adresses pour le chargement en base
+        
+        Args:
+            gdf (GeoDataFrame): Adresses en EPSG:4326
+            context (dict): Zones de la livraison pour les contrôles spatiaux (AdresseValidator.read_context)
+            validation (dict): Validation reprise d'une livraison identique (pas de revalidation)
+            
+        Returns:
+            dict: Enregistrements projetés et validation ligne par ligne, ou résultat d'échec
+        """
+        # Préparation des données pour l'insertion (conversion vectorisée colonne par colonne)
+        with Trace.span('conversion', 't_adresse', len(gdf)):
+            records = ColumnMapping(Adresse.__table__).project(gdf)
+        
+        # Vérifier si des adresses ont été extraites
+        if records.empty:
+            if validation is not None:
+                os.remove(validation['report_section'])
+            return {
+                'success': False,
+                'message': "Aucune adresse valide n'a été extraite du fichier",
+                'errors': ["Format de données non conforme ou données invalides"]
+            }
+        
+        # Validation ligne par ligne vectorisée, avec tolérance: les anomalies alimentent
+        # le rapport détaillé sans bloquer l'import. Les résultats objet par objet sont
+        # écrits en flux dans une section du rapport plutôt que conservés en mémoire.
+        if validation is None:
+            validator = AdresseValidator()
+            with Trace.span('validation', 't_adresse', len(gdf)), ReportWriter.open_section() as section:
+                section.write_findings('t_adresse', AdresseService._row_codes(gdf),
+                                       validator.validate_rows(gdf, context))
+            validation = {'report_section': section.file_path}
+        
+        return {
+            'success': True,
+            'records': records,
+            'validation': validation
+        }
+    
+    @staticmethod
+    def load_prepared(prepared):
+        """
+        Charge en base des adresses préparées par prepare_archive
+        
+        En mode incrémental (IMPORT_INCREMENTAL), seules les adresses nouvelles ou
+        modifiées depuis le chargement précédent sont écrites, et les adresses absentes
+        de la livraison sont supprimées.
+        
+        Args:
+            prepared (dict): Résultat de prepare_archive ou _prepare_geodataframe
+            
+        Returns:
+            dict: Résultat de l'importation avec statut et messages
+        """
+        # Fichier volumineux: lecture, validation et chargement morceau par morceau
+        if 'stream' in prepared:
+            with Trace.span('flux', 't_adresse') as span:
+                result = AdresseService._load_stream(**prepared['stream'])
+                span.rows = result.get('count')
+            return result
+        
+        # Échec de lecture ou de préparation: le résultat est transmis tel quel
+        if 'records' not in prepared:
+            return prepared
+        
+        # Insertion en base de données en une seule passe ensembliste (INSERT ... ON CONFLICT)
+        try:
+            with Trace.span('insertion', 't_adresse', len(prepared['records'])):
+                if current_app.config['IMPORT_INCREMENTAL']:
+                    loader = AdresseService._incremental_load()
+                    outcome = loader.load(prepared['records'])
+                    outcome['deleted'] = loader.finish()
                 else:
-                    continue  # Colonne non trouvée, passer à la suivante
-                
-                if pd.isna(value):  # Vérifier si la valeur est NaN
-                    value = None
+                    outcome = BulkService.upsert_records(
+                        Adresse.__table__, prepared['records'].to_dict('records'), 'ad_code', "l'adresse",
+                        keep_existing=True
+                    )
+            return AdresseService._import_result(outcome, prepared['validation'])
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f"Erreur lors de l'insertion en base: {str(e)}"
+            }
+    
+    @staticmethod
+    def _load_stream(file_path, member, chunksize, validation=None):
+        """
+        Lit, valide et charge un CSV d'adresses par morceaux de chunksize lignes
+        
+        Seul un morceau est en mémoire à la fois; l'unicité de ad_code, ad_batcode et
+        ad_codtemp est contrôlée sur tout le fichier grâce aux index incrémentaux de
+        la validation. En mode incrémental, les suppressions n'interviennent qu'une
+        fois tout le fichier lu.
+        
+        Args:
+            file_path (str): Chemin de l'archive ZIP
+            member (str): Nom du membre CSV dans l'archive
+            chunksize (int): Nombre de lignes par morceau
+            validation (dict): Validation reprise d'une livraison identique (pas de revalidation)
+            
+        Returns:
+            dict: Résultat de l'importation avec statut et messages
+        """
+        mapping = ColumnMapping(Adresse.__table__)
+        outcome = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+        loader = None
+        rows = 0
+        
+        # Validation reprise d'une livraison identique: le fichier est seulement relu et chargé
+        section = ReportWriter.open_section() if validation is None else None
+        report = validation or {'report_section': section.file_path}
+        try:
+            with section or contextlib.nullcontext(), ArchiveReader(file_path) as archive:
+                if section is not None:
+                    validator = AdresseValidator()
+                    chunks = validator.validate_chunks(validator.read_context(archive))
+                if current_app.config['IMPORT_INCREMENTAL']:
+                    loader = AdresseService._incremental_load()
+                    outcome['unchanged'] = 0
+                reader = functools.partial(archive.iter_csv, chunksize=chunksize)
+                for chunk in AdresseService._read_csv(reader, member):
+                    gdf = AdresseService._csv_to_geodataframe(chunk)
+                    if section is not None:
+                        section.write_findings('t_adresse', AdresseService._row_codes(gdf),
+                                               chunks.evaluate(gdf), rows)
+                    rows += len(gdf)
                     
-                setattr(adresse, column, value)
-            except:
-                # En cas d'erreur, passer à la colonne suivante
-                continue
+                    records = mapping.project(gdf)
+                    if records.empty:
+                        continue
+                    if loader is not None:
+                        chunk_outcome = loader.load(records)
+                    else:
+                        chunk_outcome = BulkService.upsert_records(
+                            Adresse.__table__, records.to_dict('records'), 'ad_code', "l'adresse",
+                            keep_existing=True
+                        )
+                    for counter in ('inserted', 'updated', 'unchanged', 'skipped'):
+                        if counter in outcome:
+                            outcome[counter] += chunk_outcome[counter]
+                    outcome['errors'].extend(chunk_outcome['errors'][:10 - len(outcome['errors'])])
+                
+                # Suppressions seulement si le fichier a fourni des adresses
+                if loader is not None and rows > 0:
+                    outcome['deleted'] = loader.finish()
+        except Exception as e:
+            db.session.rollback()
+            os.remove(report['report_section'])
+            return {
+                'success': False,
+                'message': f"Erreur lors de l'importation: {str(e)}"
+            }
         
-        return adresse
-
+        # Vérifier si des adresses ont été extraites
+        if rows == 0:
+            os.remove(report['report_section'])
+            return {
+                'success': False,
+                'message': "Aucune adresse valide n'a été extraite du fichier",
+                'errors': ["Format de données non conforme ou données invalides"]
+            }
+        
+        return AdresseService._import_result(outcome, report)
+    
+    @staticmethod
+    def _import_result(outcome, validation):
+        """
+        Construit le résultat d'importation à partir des compteurs du chargement
+        
+        Args:
+            outcome (dict): Compteurs inserted, updated, skipped et erreurs du chargement
+            validation (dict): Section du rapport contenant la validation objet par objet
+            
+        Returns:
+            dict: Résultat de l'importation avec statut et messages
+        """
+        inserted_count = outcome['inserted']
+        updated_count = outcome['updated']
+        skipped_count = outcome['skipped']
+        errors = outcome['errors']
+        
+        message = f"{inserted_count} adresses importées, {updated_count} mises à jour"
+        
+        # Import incrémental: lignes identiques au chargement précédent et lignes supprimées
+        unchanged_count = outcome.get('unchanged')
+        deleted_count = outcome.get('deleted')
+        if unchanged_count is not None:
+            message += f", {unchanged_count} inchangées, {deleted_count or 0} supprimées"
+        if skipped_count > 0:
+            message += f", {skipped_count} ignorées en raison d'erreurs"
+        
+        success = inserted_count + updated_count + (unchanged_count or 0) > 0
+        
+        result = {
+            'success': success,
+            'message': message,
+            'count': inserted_count + updated_count,
+            'inserted': inserted_count,
+            'updated': updated_count,
+            'skipped': skipped_count,
+            'errors': errors[:10],  # Limiter le nombre d'erreurs retournées pour éviter un message trop long
+            'validation': validation
+        }
+        if unchanged_count is not None:
+            result['unchanged'] = unchanged_count
+            result['deleted'] = deleted_count or 0
+        return result
+    
+    @staticmethod
+    def _incremental_load():
+        """
+        Prépare le chargement différentiel des adresses (empreintes de t_adresse_empreinte)
+        """
+        return IncrementalLoad(Adresse.__table__, AdresseEmpreinte.__table__, 'ad_code', "l'adresse")
+    
+    @staticmethod
+    def _row_codes(gdf):
+        """
+        Retourne le code de chaque ligne (None si absent), dans l'ordre du fichier
+        """
+        if 'ad_code' not in gdf.columns:
+            return [None] * len(gdf)
+        return gdf['ad_code'].astype(object).where(gdf['ad_code'].notna(), None).tolist()
+    
     @staticmethod
     def get_all_adresses(page=1, per_page=10):
         """
@@ -386,6 +529,117 @@ class AdresseService:
         """
         return Adresse.query.paginate(page=page, per_page=per_page, error_out=False)
     
+    @staticmethod
+    def get_adresses_page(cursor=None, per_page=10, exact_count=False):
+        """
+        Récupère une page d'adresses, paginée par ad_code (keyset)
+        
+        Seules les colonnes de LIST_COLUMNS sont chargées (ni géométrie ni attributs
+        détaillés) et le total est par défaut estimé, sans COUNT(*) sur la table.
+        
+        Args:
+            cursor (str): Curseur renvoyé par la page précédente (None: première page)
+            per_page (int): Nombre d'éléments par page
+            exact_count (bool): Compter exactement les adresses
+            
+        Returns:
+            KeysetPage: Page contenant les adresses (lignes avec les colonnes de LIST_COLUMNS)
+            
+        Raises:
+            ValueError: Si le curseur est invalide
+        """
+        columns = [Adresse.__table__.c[name] for name in AdresseService.LIST_COLUMNS]
+        return KeysetPagination.paginate(db.session.query(*columns), Adresse.__table__.c.ad_code,
+                                         cursor, per_page, exact_count)
+    
+    @staticmethod
+    def search_adresses(ad_insee=None, ad_postal=None, ad_commune=None, commune_mode='prefixe',
+                        ad_ietat=None, bbox=None, statut=None, limit=None):
+        """
+        Recherche des adresses par filtres, entièrement évalués par PostgreSQL
+        
+        Chaque filtre s'appuie sur un index de la migration 8d2c4e6f1a35: B-tree pour
+        les codes INSEE, postaux et l'état, trigrammes (pg_trgm) pour la commune,
+        GiST pour l'emprise, clé primaire de validation_result pour le statut de validation.
+        La requête est à parcourir en flux (yield_per).
+        
+        Args:
+            ad_insee (list): Codes INSEE acceptés
+            ad_postal (list): Codes postaux acceptés
+            ad_commune (str): Nom de commune recherché
+            commune_mode (str): 'prefixe' (début du nom, sans casse) ou 'trigramme' (nom approchant)
+            ad_ietat (list): États de déploiement acceptés
+            bbox (tuple): Emprise (xmin, ymin, xmax, ymax) en EPSG:4326
+            statut (list): Statuts de la dernière validation enregistrée acceptés (OK, NOK)
+            limit (int): Nombre maximal d'adresses
+            
+        Returns:
+            Query: Requête projetée sur SEARCH_COLUMNS, ordonnée par ad_code
+        """
+        table = Adresse.__table__
+        query = db.session.query(*[table.c[name] for name in AdresseService.SEARCH_COLUMNS])
+        
+        if ad_insee:
+            query = query.filter(table.c.ad_insee.in_(ad_insee))
+        if ad_postal:
+            query = query.filter(table.c.ad_postal.in_(ad_postal))
+        if ad_ietat:
+            query = query.filter(table.c.ad_ietat.in_(ad_ietat))
+        if ad_commune:
+            if commune_mode == 'trigramme':
+                # Opérateur de similarité de pg_trgm (seuil pg_trgm.similarity_threshold)
+                query = query.filter(table.c.ad_commune.op('%')(ad_commune))
+            else:
+                escaped = ad_commune.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                query = query.filter(table.c.ad_commune.ilike(f"{escaped}%", escape='\\'))
+        if bbox:
+            xmin, ymin, xmax, ymax = bbox
+            query = query.filter(table.c.geom.op('&&')(func.ST_MakeEnvelope(xmin, ymin, xmax, ymax, 4326)))
+        if statut:
+            # Ligne de statut de l'objet dans les résultats de validation (clé primaire)
+            query = query.filter(exists().where(
+                (ValidationResult.table_name == 't_adresse')
+                & (ValidationResult.code_objet == table.c.ad_code)
+                & (ValidationResult.controle == ReportWriter.OBJECT_CONTROL)
+                & ValidationResult.statut.in_(statut)
+            ))
+        
+        query = query.order_by(table.c.ad_code)
+        if limit:
+            query = query.limit(limit)
+        return query
+    
+    @staticmethod
+    def validate_adresses(codes=None, filters=None):
+        """
+        Valide un lot d'adresses relues en une seule requête, en une passe vectorisée
+        
+        Seules les colonnes contrôlées par les règles sont chargées, la géométrie
+        étant transmise en EWKB puis décodée d'un bloc.
+        
+        Args:
+            codes (list): Codes des adresses à valider
+            filters (dict): À défaut de codes, filtres de search_adresses (limit compris)
+            
+        Returns:
+            dict: Résultat par code trouvé en base, au même format que validate_adresse
+        """
+        table = Adresse.__table__
+        validator = AdresseValidator()
+        columns = [
+            func.ST_AsEWKB(table.c.geom).label('geom') if name == 'geom' else table.c[name]
+            for name in validator.plan.fields() if name in table.c
+        ]
+        if codes is not None:
+            query = db.session.query(*columns).filter(table.c.ad_code.in_(codes))
+        else:
+            query = AdresseService.search_adresses(**filters).with_entities(*columns)
+        
+        df = pd.DataFrame.from_records(query.all(), columns=[column.name for column in columns])
+        wkb = [bytes(value) if value is not None else None for value in df.pop('geom')]
+        gdf = gpd.GeoDataFrame(df, geometry=gpd.GeoSeries.from_wkb(wkb, index=df.index), crs="EPSG:4326")
+        return validator.validate_records(gdf)
+    
     @staticmethod
     def get_adresse_by_code(ad_code):
         """
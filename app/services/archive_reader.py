@@ -0,0 +1,229 @@
+import os
+import hashlib
+import zipfile
+import pandas as pd
+import geopandas as gpd
+
+class ArchiveReader:
+    """
+    Lecture d'une archive ZIP GRACE THD sans extraction sur disque
+
+    Le répertoire central de l'archive est indexé une seule fois à l'ouverture;
+    les membres CSV sont lus en flux depuis l'archive et les couches vectorielles
+    (SHP, GeoJSON, DBF) via le système de fichiers virtuel /vsizip/ de GDAL.
+    """
+
+    # Extensions des fichiers de données reconnus, par ordre de priorité par défaut
+    DATA_EXTENSIONS = ('.shp', '.csv', '.geojson', '.dbf')
+
+    # Rapport estimé entre la taille d'un CSV et la mémoire occupée une fois chargé
+    # (une chaîne Python par cellule, puis copies de validation et de conversion)
+    MEMORY_EXPANSION = 10
+
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path (str): Chemin vers l'archive ZIP
+        """
+        self.file_path = os.path.abspath(file_path)
+        self.zip_file = zipfile.ZipFile(self.file_path, 'r')
+
+        # Index nom de table -> {extension: membre}, construit depuis le répertoire central
+        self.members = {}
+        for info in self.zip_file.infolist():
+            if info.is_dir():
+                continue
+            stem, ext = os.path.splitext(os.path.basename(info.filename))
+            ext = ext.lower()
+            if ext not in self.DATA_EXTENSIONS:
+                continue
+            # Le premier membre trouvé pour une table et une extension est conservé
+            self.members.setdefault(stem.lower(), {}).setdefault(ext, info.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Ferme l'archive
+        """
+        self.zip_file.close()
+
+    def find(self, table_name, extensions=DATA_EXTENSIONS):
+        """
+        Recherche le membre de l'archive contenant une table
+
+        Un fichier nommé exactement comme la table est préféré à un fichier dont le nom
+        la contient (t_cable.csv plutôt que t_cableline.shp).
+
+        Args:
+            table_name (str): Nom de la table (ex: t_adresse)
+            extensions (tuple): Extensions acceptées, par ordre de préférence
+
+        Returns:
+            str: Nom du membre dans l'archive ou None si absent
+        """
+        table_name = table_name.lower()
+        for ext in extensions:
+            if ext in self.members.get(table_name, {}):
+                return self.members[table_name][ext]
+        for ext in extensions:
+            for stem, members in self.members.items():
+                if table_name in stem and ext in members:
+                    return members[ext]
+        return None
+
+    def digest(self, member):
+        """
+        Calcule l'empreinte (SHA-256) du contenu d'un membre de l'archive
+
+        Pour un Shapefile, les fichiers compagnons (.shx, .dbf, .prj, .cpg) de même
+        nom sont inclus dans l'empreinte.
+
+        Args:
+            member (str): Nom du membre dans l'archive
+
+        Returns:
+            str: Empreinte hexadécimale
+        """
+        stem, ext = os.path.splitext(member)
+        if ext.lower() == '.shp':
+            names = sorted(name for name in self.zip_file.namelist() if os.path.splitext(name)[0] == stem)
+        else:
+            names = [member]
+
+        digest = hashlib.sha256()
+        for name in names:
+            digest.update(os.path.basename(name).encode('utf-8'))
+            with self.zip_file.open(name) as stream:
+                for block in iter(lambda: stream.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def table_digest(self, table_name):
+        """
+        Calcule l'empreinte de l'ensemble des fichiers d'une table, tous formats confondus
+
+        Comme pour find, seuls les fichiers nommés exactement comme la table sont retenus
+        s'il en existe (l'empreinte de t_cable n'inclut pas t_cableline), à défaut ceux dont
+        le nom la contient.
+
+        Args:
+            table_name (str): Nom de la table (ex: t_adresse)
+
+        Returns:
+            str: Empreinte hexadécimale
+        """
+        table_name = table_name.lower()
+        if table_name in self.members:
+            stems = [table_name]
+        else:
+            stems = sorted(stem for stem in self.members if table_name in stem)
+        digest = hashlib.sha256()
+        for stem in stems:
+            members = self.members[stem]
+            for ext, member in sorted(members.items()):
+                # Le DBF d'un Shapefile est déjà inclus dans l'empreinte du .shp
+                if ext == '.dbf' and '.shp' in members:
+                    continue
+                digest.update(self.digest(member).encode('ascii'))
+        return digest.hexdigest()
+
+    def read_csv(self, member, **kwargs):
+        """
+        Lit un membre CSV en flux, sans l'écrire sur disque
+
+        Args:
+            member (str): Nom du membre dans l'archive
+            **kwargs: Options transmises à pandas.read_csv
+
+        Returns:
+            DataFrame: Contenu du fichier CSV
+        """
+        with self.zip_file.open(member) as stream:
+            return pd.read_csv(stream, **kwargs)
+
+    def iter_csv(self, member, chunksize, **kwargs):
+        """
+        Lit un membre CSV par morceaux de chunksize lignes, en flux
+
+        Args:
+            member (str): Nom du membre dans l'archive
+            chunksize (int): Nombre de lignes par morceau
+            **kwargs: Options transmises à pandas.read_csv
+
+        Yields:
+            DataFrame: Morceaux successifs du fichier
+        """
+        with self.zip_file.open(member) as stream:
+            for chunk in pd.read_csv(stream, chunksize=chunksize, **kwargs):
+                yield chunk
+
+    def csv_chunksize(self, member, memory_budget):
+        """
+        Calcule la taille des morceaux permettant de lire un membre CSV dans un budget mémoire
+
+        La taille décompressée est lue dans le répertoire central; la taille moyenne d'une
+        ligne est estimée sur le début du fichier.
+
+        Args:
+            member (str): Nom du membre dans l'archive
+            memory_budget (int): Mémoire disponible pour le fichier, en octets (None: illimitée)
+
+        Returns:
+            int: Nombre de lignes par morceau, ou None si le fichier peut être lu en une fois
+        """
+        size = self.zip_file.getinfo(member).file_size
+        if not memory_budget or size * self.MEMORY_EXPANSION <= memory_budget:
+            return None
+
+        with self.zip_file.open(member) as stream:
+            sample = stream.read(1 << 16)
+        bytes_per_row = len(sample) / max(sample.count(b'\n'), 1)
+        return max(int(memory_budget / (bytes_per_row * self.MEMORY_EXPANSION)), 1000)
+
+    def read_columns(self, member, columns):
+        """
+        Lit des colonnes attributaires d'un membre (CSV, DBF, GeoJSON, SHP), en texte
+
+        Les géométries ne sont pas décodées; les colonnes absentes du fichier sont ignorées.
+
+        Args:
+            member (str): Nom du membre dans l'archive
+            columns (list): Colonnes à lire
+
+        Returns:
+            DataFrame: Colonnes trouvées, valeurs vides à None
+        """
+        if member.lower().endswith('.csv'):
+            df = self.read_csv(member, sep=';', dtype=str, encoding='utf-8-sig',
+                               on_bad_lines='skip', usecols=lambda column: column in columns)
+        else:
+            df = gpd.read_file(self.vsi_path(member), ignore_geometry=True)
+            df = df[[column for column in columns if column in df.columns]]
+            df = df.apply(lambda values: values.astype(str).where(values.notna()))
+        return df.apply(lambda values: values.where(values.str.strip() != ''))
+
+    def read_vector(self, member):
+        """
+        Lit une couche vectorielle (SHP, GeoJSON, DBF) via /vsizip/
+
+        Les fichiers compagnons d'un Shapefile (.shx, .dbf, .prj, .cpg) sont
+        résolus par GDAL directement dans l'archive.
+
+        Args:
+            member (str): Nom du membre dans l'archive
+
+        Returns:
+            GeoDataFrame: Contenu de la couche
+        """
+        return gpd.read_file(self.vsi_path(member))
+
+    def vsi_path(self, member):
+        """
+        Retourne le chemin GDAL /vsizip/ d'un membre de l'archive
+        """
+        return f"/vsizip/{self.file_path}/{member}"
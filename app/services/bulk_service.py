@@ -0,0 +1,374 @@
+import io
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+from geoalchemy2 import Geometry
+from sqlalchemy import Integer, Numeric, Float, String, Date, DateTime
+from app import db
+
+class BulkService:
+    """
+    Chargement ensembliste des données dans PostgreSQL (INSERT ... ON CONFLICT)
+    """
+
+    # Nombre de lignes envoyées par instruction INSERT multi-lignes
+    PAGE_SIZE = 1000
+
+    # Nombre de lignes traitées entre deux commits
+    BATCH_SIZE = 10000
+
+    # Nombre de lignes sérialisées à la fois lors d'un COPY
+    COPY_CHUNK_SIZE = 50000
+
+    @staticmethod
+    def upsert_records(table, records, key, label, keep_existing=False):
+        """
+        Insère ou met à jour des enregistrements par lots avec INSERT ... ON CONFLICT
+
+        Args:
+            table (Table): Table SQLAlchemy cible
+            records (list): Liste de dictionnaires colonne -> valeur
+            key (str): Nom de la clé primaire utilisée pour détecter les conflits
+            label (str): Libellé de l'objet utilisé dans les messages d'erreur (ex: "l'adresse")
+            keep_existing (bool): Conserver la valeur en base lorsque la nouvelle valeur est nulle
+
+        Returns:
+            dict: Compteurs inserted/updated/skipped, liste des erreurs et codes des lignes rejetées par la base
+        """
+        result = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': [], 'rejected': []}
+
+        # Écarter les enregistrements sans clé et fusionner les doublons du fichier
+        # (un doublon aurait mis à jour la ligne précédente dans le traitement ligne à ligne)
+        pending = {}
+        for record in records:
+            code = record.get(key)
+            if code is None:
+                result['skipped'] += 1
+                result['errors'].append(f"Erreur pour {label} sans code: valeur manquante pour {key}")
+                continue
+
+            if code in pending:
+                if keep_existing:
+                    pending[code] = {**pending[code], **{c: v for c, v in record.items() if v is not None}}
+                else:
+                    pending[code] = record
+                result['updated'] += 1
+            else:
+                pending[code] = record
+
+        if not pending:
+            return result
+
+        # Colonnes présentes dans les enregistrements, dans l'ordre de la table
+        present = set()
+        for record in pending.values():
+            present.update(record.keys())
+        columns = [column for column in table.columns if column.name in present]
+
+        sql, template = BulkService._build_upsert_sql(table, columns, key, keep_existing)
+        codes = list(pending.keys())
+        rows = [
+            tuple(BulkService._to_python(record.get(column.name)) for column in columns)
+            for record in pending.values()
+        ]
+
+        for start in range(0, len(rows), BulkService.BATCH_SIZE):
+            batch_rows = rows[start:start + BulkService.BATCH_SIZE]
+            batch_codes = codes[start:start + BulkService.BATCH_SIZE]
+
+            connection = db.session.connection().connection
+            with connection.cursor() as cursor:
+                cursor.execute("SAVEPOINT bulk_upsert")
+                try:
+                    flags = execute_values(cursor, sql, batch_rows, template=template,
+                                           page_size=BulkService.PAGE_SIZE, fetch=True)
+                    cursor.execute("RELEASE SAVEPOINT bulk_upsert")
+                except psycopg2.Error:
+                    # Un lot en échec est rejoué ligne par ligne pour isoler les lignes fautives
+                    cursor.execute("ROLLBACK TO SAVEPOINT bulk_upsert")
+                    flags = BulkService._upsert_row_by_row(cursor, sql, template, batch_rows,
+                                                           batch_codes, label, result)
+
+            inserted = sum(1 for (is_insert,) in flags if is_insert)
+            result['inserted'] += inserted
+            result['updated'] += len(flags) - inserted
+
+            db.session.commit()
+
+        return result
+
+    @staticmethod
+    def copy_upsert(table, df, key, label, keep_existing=False):
+        """
+        Charge un DataFrame via COPY dans une table de transit puis le fusionne
+        dans la table cible avec une seule instruction INSERT ... ON CONFLICT
+
+        Les lignes qui ne peuvent pas être converties vers les types de la table
+        (clé manquante, texte trop long, nombre ou date invalide) sont écartées
+        avant la fusion et signalées individuellement.
+
+        Args:
+            table (Table): Table SQLAlchemy cible
+            df (DataFrame): Données à charger
+            key (str): Nom de la clé primaire utilisée pour détecter les conflits
+            label (str): Libellé de l'objet utilisé dans les messages d'erreur (ex: "l'organisme")
+            keep_existing (bool): Conserver la valeur en base lorsque la nouvelle valeur est nulle
+
+        Returns:
+            dict: Compteurs inserted/updated/skipped et liste des erreurs
+        """
+        result = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+        preparer = db.engine.dialect.identifier_preparer
+        staging = preparer.quote(f"staging_{table.name}")
+        quoted_key = preparer.quote(key)
+
+        columns = list(table.columns)
+        loaded = [column.name for column in columns if column.name in df.columns]
+
+        connection = db.session.connection().connection
+        with connection.cursor() as cursor:
+            # Table de transit entièrement textuelle: aucune ligne ne peut faire échouer le COPY
+            definitions = ', '.join(f"{preparer.quote(column.name)} text" for column in columns)
+            cursor.execute(f"CREATE TEMP TABLE {staging} (ligne bigint, {definitions}) ON COMMIT DROP")
+
+            copy_columns = ', '.join(['ligne'] + [preparer.quote(name) for name in loaded])
+            cursor.copy_expert(
+                f"COPY {staging} ({copy_columns}) FROM STDIN WITH (FORMAT csv, DELIMITER ';')",
+                _DataFrameCsvStream(df[loaded], BulkService.COPY_CHUNK_SIZE),
+                size=1 << 20
+            )
+
+            # Écarter les lignes non convertibles en signalant le code de chaque objet rejeté
+            cursor.execute(
+                f"DELETE FROM {staging} WHERE {BulkService._rejection_expression(columns, key)} IS NOT NULL "
+                f"RETURNING ligne, {quoted_key}, {BulkService._rejection_expression(columns, key)}"
+            )
+            for _, code, motif in sorted(cursor.fetchall()):
+                result['skipped'] += 1
+                result['errors'].append(f"Erreur pour {label} {code if code is not None else 'sans code'}: {motif}")
+
+            # Doublons du fichier: la dernière occurrence l'emporte, comme une mise à jour successive
+            cursor.execute(
+                f"DELETE FROM {staging} s USING {staging} d "
+                f"WHERE s.{quoted_key} = d.{quoted_key} AND s.ligne < d.ligne"
+            )
+            result['updated'] += cursor.rowcount
+
+            merge_sql = BulkService._build_merge_sql(table, columns, key, staging, keep_existing)
+            cursor.execute("SAVEPOINT bulk_merge")
+            try:
+                cursor.execute(
+                    f"WITH merged AS ({merge_sql}) "
+                    f"SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM merged"
+                )
+                inserted, updated = cursor.fetchone()
+                cursor.execute("RELEASE SAVEPOINT bulk_merge")
+            except psycopg2.Error:
+                # Conflit sur une autre contrainte: fusion ligne par ligne pour isoler les objets fautifs
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_merge")
+                inserted, updated = BulkService._merge_row_by_row(cursor, merge_sql, staging, key, label, result)
+
+            result['inserted'] += inserted
+            result['updated'] += updated
+
+        db.session.commit()
+        return result
+
+    @staticmethod
+    def _merge_row_by_row(cursor, merge_sql, staging, key, label, result):
+        """
+        Fusionne la table de transit ligne par ligne, chaque ligne étant protégée par un point de sauvegarde
+
+        Returns:
+            tuple: (nombre d'insertions, nombre de mises à jour)
+        """
+        quoted_key = db.engine.dialect.identifier_preparer.quote(key)
+        cursor.execute(f"SELECT ligne, {quoted_key} FROM {staging} ORDER BY ligne")
+        inserted = updated = 0
+        row_sql = merge_sql.replace(f"FROM {staging} s", f"FROM {staging} s WHERE s.ligne = %s", 1)
+        for ligne, code in cursor.fetchall():
+            cursor.execute("SAVEPOINT bulk_merge_row")
+            try:
+                cursor.execute(row_sql, (ligne,))
+                (is_insert,) = cursor.fetchone()
+                cursor.execute("RELEASE SAVEPOINT bulk_merge_row")
+            except psycopg2.IntegrityError as ie:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_merge_row")
+                result['skipped'] += 1
+                result['errors'].append(f"Erreur d'intégrité pour {label} {code}: {str(ie).strip()}")
+                continue
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_merge_row")
+                result['skipped'] += 1
+                result['errors'].append(f"Erreur pour {label} {code}: {str(e).strip()}")
+                continue
+            if is_insert:
+                inserted += 1
+            else:
+                updated += 1
+        return inserted, updated
+
+    @staticmethod
+    def _rejection_expression(columns, key):
+        """
+        Construit une expression SQL renvoyant le motif de rejet d'une ligne de transit (NULL si valide)
+        """
+        preparer = db.engine.dialect.identifier_preparer
+        cases = [f"WHEN {preparer.quote(key)} IS NULL THEN 'valeur manquante pour {key}'"]
+        for column in columns:
+            name = preparer.quote(column.name)
+            if isinstance(column.type, Integer):
+                cases.append(f"WHEN {name} !~ '^\\s*[-+]?\\d+\\s*$' THEN 'valeur entière invalide pour {column.name}'")
+            elif isinstance(column.type, (Numeric, Float)):
+                cases.append(
+                    f"WHEN {name} !~ '^\\s*[-+]?(\\d+\\.?\\d*|\\.\\d+)([eE][-+]?\\d+)?\\s*$' "
+                    f"THEN 'valeur numérique invalide pour {column.name}'"
+                )
+            elif isinstance(column.type, (Date, DateTime)):
+                cases.append(f"WHEN {name} !~ '^\\s*\\d{{4}}-\\d{{2}}-\\d{{2}}' THEN 'date invalide pour {column.name}'")
+            elif isinstance(column.type, String) and column.type.length:
+                cases.append(
+                    f"WHEN char_length({name}) > {column.type.length} "
+                    f"THEN 'valeur trop longue pour {column.name} (max {column.type.length} caractères)'"
+                )
+        return f"(CASE {' '.join(cases)} END)"
+
+    @staticmethod
+    def _build_merge_sql(table, columns, key, staging, keep_existing):
+        """
+        Construit l'instruction INSERT ... SELECT ... ON CONFLICT de fusion depuis la table de transit
+        """
+        dialect = db.engine.dialect
+        preparer = dialect.identifier_preparer
+        names = [preparer.quote(column.name) for column in columns]
+
+        selected = []
+        for column, name in zip(columns, names):
+            if isinstance(column.type, Geometry):
+                selected.append(f"ST_GeomFromEWKB(decode(s.{name}, 'hex'))")
+            else:
+                selected.append(f"CAST(s.{name} AS {column.type.compile(dialect=dialect)})")
+
+        assignments = []
+        for column, name in zip(columns, names):
+            if column.name == key:
+                continue
+            if keep_existing:
+                assignments.append(f"{name} = COALESCE(EXCLUDED.{name}, cible.{name})")
+            else:
+                assignments.append(f"{name} = EXCLUDED.{name}")
+        if not assignments:
+            quoted_key = preparer.quote(key)
+            assignments.append(f"{quoted_key} = EXCLUDED.{quoted_key}")
+
+        return (
+            f"INSERT INTO {preparer.format_table(table)} AS cible ({', '.join(names)}) "
+            f"SELECT {', '.join(selected)} FROM {staging} s ORDER BY s.ligne "
+            f"ON CONFLICT ({preparer.quote(key)}) DO UPDATE SET {', '.join(assignments)} "
+            f"RETURNING (xmax = 0) AS inserted"
+        )
+
+    @staticmethod
+    def _upsert_row_by_row(cursor, sql, template, rows, codes, label, result):
+        """
+        Rejoue un lot ligne par ligne, chaque ligne étant protégée par un point de sauvegarde
+
+        Returns:
+            list: Indicateurs d'insertion des lignes acceptées
+        """
+        flags = []
+        for row, code in zip(rows, codes):
+            cursor.execute("SAVEPOINT bulk_upsert_row")
+            try:
+                flags.extend(execute_values(cursor, sql, [row], template=template, fetch=True))
+                cursor.execute("RELEASE SAVEPOINT bulk_upsert_row")
+            except psycopg2.IntegrityError as ie:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_upsert_row")
+                result['skipped'] += 1
+                result['errors'].append(f"Erreur d'intégrité pour {label} {code}: {str(ie).strip()}")
+                result['rejected'].append(code)
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_upsert_row")
+                result['skipped'] += 1
+                result['errors'].append(f"Erreur pour {label} {code}: {str(e).strip()}")
+                result['rejected'].append(code)
+        return flags
+
+    @staticmethod
+    def _build_upsert_sql(table, columns, key, keep_existing):
+        """
+        Construit l'instruction INSERT ... ON CONFLICT et le gabarit VALUES pour execute_values
+
+        Returns:
+            tuple: (requête SQL, gabarit d'une ligne)
+        """
+        preparer = db.engine.dialect.identifier_preparer
+        names = [preparer.quote(column.name) for column in columns]
+
+        # Les géométries sont transmises en EWKB hexadécimal (ColumnMapping)
+        template = '(' + ', '.join(
+            "ST_GeomFromEWKB(decode(%s, 'hex'))" if isinstance(column.type, Geometry) else '%s'
+            for column in columns
+        ) + ')'
+
+        assignments = []
+        for column, name in zip(columns, names):
+            if column.name == key:
+                continue
+            if keep_existing:
+                assignments.append(f"{name} = COALESCE(EXCLUDED.{name}, cible.{name})")
+            else:
+                assignments.append(f"{name} = EXCLUDED.{name}")
+        if not assignments:
+            quoted_key = preparer.quote(key)
+            assignments.append(f"{quoted_key} = EXCLUDED.{quoted_key}")
+
+        sql = (
+            f"INSERT INTO {preparer.format_table(table)} AS cible ({', '.join(names)}) VALUES %s "
+            f"ON CONFLICT ({preparer.quote(key)}) DO UPDATE SET {', '.join(assignments)} "
+            f"RETURNING (xmax = 0)"
+        )
+        return sql, template
+
+    @staticmethod
+    def _to_python(value):
+        """
+        Convertit les scalaires NumPy en types Python natifs adaptables par psycopg2
+        """
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+
+class _DataFrameCsvStream(io.TextIOBase):
+    """
+    Flux texte sérialisant un DataFrame en CSV par tranches, consommé par COPY FROM STDIN
+
+    La première colonne émise est la position de la ligne dans le DataFrame.
+    """
+
+    def __init__(self, df, chunk_size):
+        self._df = df
+        self._chunk_size = chunk_size
+        self._position = 0
+        self._buffer = ''
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if self._offset >= len(self._buffer):
+            if self._position >= len(self._df):
+                return ''
+            chunk = self._df.iloc[self._position:self._position + self._chunk_size]
+            chunk = chunk.set_axis(pd.RangeIndex(self._position, self._position + len(chunk)))
+            self._buffer = chunk.to_csv(sep=';', header=False, index=True)
+            self._offset = 0
+            self._position += len(chunk)
+
+        end = len(self._buffer) if size is None or size < 0 else self._offset + size
+        data = self._buffer[self._offset:end]
+        self._offset += len(data)
+        return data
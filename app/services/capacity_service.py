@@ -0,0 +1,52 @@
+from app.services.archive_reader import ArchiveReader
+from app.services.report_writer import ReportWriter
+from app.validators.capacity import CAPACITY_COLUMNS, CapacityCheck
+
+class CapacityService:
+    """
+    Contrôle de cohérence des capacités d'une livraison GRACE THD (câbles, fibres,
+    cassettes, positions)
+    """
+    
+    # Nom sous lequel le contrôle figure dans les résultats de l'import et le rapport
+    TABLE = 'capacites'
+    
+    # Formats lus par ordre de préférence (tables attributaires)
+    EXTENSIONS = ('.csv', '.dbf')
+    
+    @staticmethod
+    def check_archive(file_path):
+        """
+        Contrôle les capacités des câbles et cassettes d'une archive
+        
+        Seules les colonnes utiles sont lues. Exécuté dans un processus du pool de
+        préparation de l'import.
+        
+        Args:
+            file_path (str): Chemin de l'archive ZIP
+            
+        Returns:
+            dict: Résultat du contrôle (success, message, count, errors, validation),
+                  ou None si la livraison ne contient ni fibres ni positions
+        """
+        with ArchiveReader(file_path) as archive:
+            frames = {}
+            for table, columns in CAPACITY_COLUMNS.items():
+                member = archive.find(table, CapacityService.EXTENSIONS)
+                if member:
+                    frames[table] = archive.read_columns(member, columns)
+        
+        if 't_fibre' not in frames and 't_position' not in frames:
+            return None
+        
+        findings, counts = CapacityCheck(frames).check()
+        count = len(findings)
+        checked = ', '.join(f"{len(frames[table])} {table}" for table in CAPACITY_COLUMNS if table in frames)
+        return ReportWriter.check_result(
+            findings.itertuples(index=False, name=None),
+            f"{count} anomalies de capacité ({checked})" if count else f"Capacités cohérentes ({checked})",
+            [
+                {'controle': controle, 'message': f"{table}: {number} anomalies {controle}"}
+                for (table, controle), number in counts.items()
+            ]
+        )
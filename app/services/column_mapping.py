@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import shapely
+from geoalchemy2 import Geometry
+from sqlalchemy import Integer, Numeric, Float, String, Date, DateTime
+
+class ColumnMapping:
+    """
+    Projection vectorisée d'un DataFrame vers les colonnes d'une table du modèle
+
+    Le plan de conversion (type cible de chaque colonne) est calculé une seule fois
+    à partir de la table SQLAlchemy, puis appliqué colonne par colonne sur tout le
+    DataFrame au lieu de parcourir chaque cellule de chaque ligne.
+    """
+
+    def __init__(self, table, srid=4326):
+        """
+        Args:
+            table (Table): Table SQLAlchemy cible (ex: Adresse.__table__)
+            srid (int): SRID des géométries transmises à la base
+        """
+        self.table = table
+        self.srid = srid
+        self.converters = {}
+        self.geometry_columns = set()
+        for column in table.columns:
+            if isinstance(column.type, Geometry):
+                self.geometry_columns.add(column.name)
+                self.converters[column.name] = self._convert_geometry
+            elif isinstance(column.type, Integer):
+                self.converters[column.name] = self._convert_integer
+            elif isinstance(column.type, (Numeric, Float)):
+                self.converters[column.name] = self._convert_numeric
+            elif isinstance(column.type, DateTime):
+                self.converters[column.name] = self._convert_datetime
+            elif isinstance(column.type, Date):
+                self.converters[column.name] = self._convert_date
+            elif isinstance(column.type, String):
+                self.converters[column.name] = self._convert_string
+            else:
+                self.converters[column.name] = self._convert_object
+
+    def project(self, df):
+        """
+        Projette un DataFrame sur les colonnes de la table en convertissant les types
+
+        Les colonnes absentes du DataFrame sont ignorées, les valeurs manquantes
+        deviennent None et les valeurs non convertibles sont conservées telles
+        quelles pour que le chargement les rejette avec un message explicite.
+
+        Args:
+            df (DataFrame): DataFrame ou GeoDataFrame source
+
+        Returns:
+            DataFrame: DataFrame de type object prêt pour l'insertion en masse
+        """
+        projected = {}
+        for name, converter in self.converters.items():
+            if name in self.geometry_columns:
+                source = self._geometry_source(df)
+                if source is None:
+                    continue
+            elif name in df.columns:
+                source = df[name]
+            else:
+                continue
+            projected[name] = converter(source)
+
+        return pd.DataFrame(projected, index=df.index)
+
+    def to_records(self, df):
+        """
+        Convertit un DataFrame en liste de dictionnaires colonne -> valeur
+
+        Args:
+            df (DataFrame): DataFrame ou GeoDataFrame source
+
+        Returns:
+            list: Enregistrements prêts pour l'insertion en masse
+        """
+        return self.project(df).to_dict('records')
+
+    @staticmethod
+    def _geometry_source(df):
+        """
+        Retourne la colonne de géométrie active d'un GeoDataFrame, ou None s'il n'en a pas
+        """
+        geometry_name = getattr(df, '_geometry_column_name', None)
+        if geometry_name is not None and geometry_name in df.columns:
+            return df[geometry_name]
+        return None
+
+    @staticmethod
+    def _finalize(values, original):
+        """
+        Remplace les NaN par None et réinjecte les valeurs d'origine non convertibles
+        """
+        result = values.astype(object)
+        failed = values.isna() & original.notna()
+        result[failed] = original[failed]
+        return result.where(result.notna() | failed, None)
+
+    def _convert_integer(self, series):
+        numeric = pd.to_numeric(series, errors='coerce')
+        integral = numeric.notna() & (numeric % 1 == 0) & (numeric.abs() < 2 ** 63)
+        values = pd.Series(np.nan, index=series.index, dtype=object)
+        values[integral] = numeric[integral].astype('int64').astype(object)
+        return self._finalize(values, series)
+
+    def _convert_numeric(self, series):
+        numeric = pd.to_numeric(series, errors='coerce')
+        return self._finalize(numeric, series)
+
+    def _convert_datetime(self, series):
+        parsed = pd.to_datetime(series, errors='coerce')
+        values = pd.Series(parsed.dt.to_pydatetime(), index=series.index, dtype=object)
+        values[parsed.isna()] = np.nan
+        return self._finalize(values, series)
+
+    def _convert_date(self, series):
+        parsed = pd.to_datetime(series, errors='coerce')
+        values = parsed.dt.date.astype(object)
+        values[parsed.isna()] = np.nan
+        return self._finalize(values, series)
+
+    def _convert_string(self, series):
+        if pd.api.types.is_float_dtype(series):
+            # Champs texte lus comme flottants depuis un DBF (ex: code INSEE): supprimer le ".0"
+            integral = series.notna() & (series % 1 == 0)
+            if integral[series.notna()].all():
+                series = series.astype('Int64')
+        values = series.astype(object)
+        mask = series.notna()
+        values[mask] = values[mask].astype(str)
+        return values.where(mask, None)
+
+    def _convert_object(self, series):
+        return series.astype(object).where(series.notna(), None)
+
+    def _convert_geometry(self, series):
+        geometries = np.asarray(series, dtype=object)
+        geometries = shapely.set_srid(geometries, self.srid)
+        # EWKB hexadécimal, décodé par ST_GeomFromEWKB(decode(..., 'hex')) côté PostGIS
+        wkb = shapely.to_wkb(geometries, hex=True, include_srid=True)
+        return pd.Series(wkb, index=series.index, dtype=object).where(pd.notna(wkb), None)
@@ -1,120 +1,96 @@
 import os
-import csv
+import uuid
 import datetime
-from app.services.adresse_service import AdresseService
-from app.services.organisme_service import OrganismeService
-from app.models.adresse import Adresse
-from app.models.organisme import Organisme
+from app.services.instrumentation import Trace
+from app.services.report_writer import ReportWriter
+from app.services.validation_result_service import ValidationResultService
 
 class ExportService:
     @staticmethod
-    def generate_validation_report(results, export_dir):
+    def generate_validation_report(results, export_dir, compress=False, flush_interval=10000):
         """
         Génère un rapport de validation unique pour toutes les tables importées
         
+        Le rapport est écrit en flux: les résultats objet par objet produits pendant la
+        validation (sections temporaires) y sont recopiés sans être chargés en mémoire.
+        
         Args:
             results (dict): Résultats de validation pour chaque table
             export_dir (str): Répertoire où enregistrer le rapport
+            compress (bool): Compresser le rapport en gzip (.csv.gz)
+            flush_interval (int): Nombre de lignes écrites entre deux vidages sur disque
             
         Returns:
             str: Chemin vers le fichier de rapport généré
         """
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"rapport_validation_grace_{timestamp}.csv"
-        file_path = os.path.join(export_dir, filename)
+        file_path = ExportService._report_path(export_dir, compress)
         
-        # Création du répertoire d'export s'il n'existe pas
-        os.makedirs(export_dir, exist_ok=True)
-        
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['table', 'code_objet', 'controle', 'statut', 'message']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=';')
-            writer.writeheader()
-            
+        with Trace.span('rapport'), ReportWriter(file_path, compress=compress, flush_interval=flush_interval) as writer:
             # Ajout des résultats pour chaque table
             for table_result in results.get('tables', []):
                 table_name = table_result.get('table')
                 
-                # Statut global de la table
-                writer.writerow({
-                    'table': table_name,
-                    'code_objet': 'GLOBAL',
-                    'controle': 'Validation globale',
-                    'statut': 'OK' if table_result.get('success') else 'NOK',
-                    'message': table_result.get('message')
-                })
+                # Statut global de la table et erreurs détaillées
+                writer.write_status(table_name, table_result)
                 
-                # Erreurs détaillées
-                for error in table_result.get('errors', []):
-                    writer.writerow({
-                        'table': table_name,
-                        'code_objet': error.get('code', 'N/A'),
-                        'controle': error.get('controle', 'N/A'),
-                        'statut': 'NOK',
-                        'message': error.get('message', '')
-                    })
-                
-                # Si aucune erreur mais que la table a été importée, on génère un rapport détaillé
-                if table_result.get('success') and 'errors' not in table_result:
-                    ExportService._add_detailed_validation(writer, table_name)
+                # Résultats objet par objet produits pendant l'import: pas de relecture de la table
+                validation = results.get('validation', {}).get(table_name)
+                if validation is not None:
+                    writer.append_section(validation['report_section'])
         
         return file_path
     
     @staticmethod
-    def _add_detailed_validation(writer, table_name):
+    def generate_stored_report(export_dir, table_names=None, full=False, compress=False, flush_interval=10000,
+                               batch_size=1000):
         """
-        Ajoute des validations détaillées pour chaque enregistrement d'une table
+        Régénère le rapport de validation à partir des résultats enregistrés, sans import
+        
+        Les objets dont le résultat n'est plus à jour (modifiés depuis leur dernière
+        validation, ou jeu de règles changé) sont d'abord revalidés; les résultats de
+        chaque table sont ensuite relus par lots, la mémoire restant constante quelle
+        que soit la taille de la table.
         
         Args:
-            writer: Writer CSV pour écrire les résultats
-            table_name (str): Nom de la table
+            export_dir (str): Répertoire où enregistrer le rapport
+            table_names (list): Tables du rapport (toutes les tables de ValidationResultService.TABLES par défaut)
+            full (bool): Revalider tous les objets
+            compress (bool): Compresser le rapport en gzip (.csv.gz)
+            flush_interval (int): Nombre de lignes écrites entre deux vidages sur disque
+            batch_size (int): Nombre d'objets revalidés ou de résultats relus par lot
+            
+        Returns:
+            tuple: (chemin du rapport, nombre d'objets revalidés par table)
         """
-        if table_name == 't_adresse':
-            # Récupérer toutes les adresses et les valider individuellement
-            adresses = Adresse.query.all()
-            for adresse in adresses:
-                result = AdresseService.validate_adresse(adresse)
-                
-                # Résultat global pour cette adresse
-                writer.writerow({
-                    'table': 't_adresse',
-                    'code_objet': adresse.ad_code,
-                    'controle': 'Validation complète',
-                    'statut': 'OK' if result['valid'] else 'NOK',
-                    'message': 'Tous les contrôles sont valides' if result['valid'] else 'Des contrôles ont échoué'
-                })
-                
-                # Détails des erreurs s'il y en a
-                for error in result.get('errors', []):
-                    writer.writerow({
-                        'table': 't_adresse',
-                        'code_objet': adresse.ad_code,
-                        'controle': error.get('controle', 'N/A'),
-                        'statut': 'NOK',
-                        'message': error.get('message', '')
-                    })
+        file_path = ExportService._report_path(export_dir, compress)
+        revalidated = {}
         
-        elif table_name == 't_organisme':
-            # Récupérer tous les organismes et les valider individuellement
-            organismes = Organisme.query.all()
-            for organisme in organismes:
-                result = OrganismeService.validate_organisme(organisme)
+        with Trace.span('rapport'), ReportWriter(file_path, compress=compress, flush_interval=flush_interval) as writer:
+            for table_name in table_names or list(ValidationResultService.TABLES):
+                with Trace.span('revalidation', table_name) as span:
+                    revalidated[table_name] = ValidationResultService.revalidate(table_name, full, batch_size)
+                    span.rows = revalidated[table_name]
                 
-                # Résultat global pour cet organisme
-                writer.writerow({
-                    'table': 't_organisme',
-                    'code_objet': organisme.or_code,
-                    'controle': 'Validation complète',
-                    'statut': 'OK' if result['valid'] else 'NOK',
-                    'message': 'Tous les contrôles sont valides' if result['valid'] else 'Des contrôles ont échoué'
+                writer.write_status(table_name, {
+                    'success': True,
+                    'message': f"Résultats enregistrés, {revalidated[table_name]} objets revalidés"
                 })
-                
-                # Détails des erreurs s'il y en a
-                for error in result.get('errors', []):
-                    writer.writerow({
-                        'table': 't_organisme',
-                        'code_objet': organisme.or_code,
-                        'controle': error.get('controle', 'N/A'),
-                        'statut': 'NOK',
-                        'message': error.get('message', '')
-                    })
+                for row in ValidationResultService.iter_results(table_name, batch_size):
+                    writer.write_row(row)
+        
+        return file_path, revalidated
+    
+    @staticmethod
+    def _report_path(export_dir, compress=False):
+        """
+        Chemin d'un nouveau rapport horodaté, après création du répertoire d'export
+        """
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Suffixe unique: deux tâches terminées dans la même seconde n'écrivent pas le même fichier
+        filename = f"rapport_validation_grace_{timestamp}_{uuid.uuid4().hex}.csv"
+        if compress:
+            filename += '.gz'
+        
+        # Création du répertoire d'export s'il n'existe pas
+        os.makedirs(export_dir, exist_ok=True)
+        return os.path.join(export_dir, filename)
@@ -1,30 +1,78 @@
 import os
-import zipfile
-import tempfile
-import shutil
-import pandas as pd
-import geopandas as gpd
+import threading
+import contextvars
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from flask import current_app
 from app import db
+from app.services.archive_reader import ArchiveReader
+from app.services.capacity_service import CapacityService
+from app.services.instrumentation import Trace
+from app.services.integrity_service import IntegrityService
+from app.services.topology_service import TopologyService
+from app.services.validation_cache import ValidationCache
+from app.services.validation_result_service import ValidationResultService
 from app.services.adresse_service import AdresseService
 from app.services.organisme_service import OrganismeService
 
 class ImportService:
+    # Tables GRACE THD importées depuis une archive, avec les tables à charger avant elles
+    # (ex: t_organisme.or_ad_code référence t_adresse) et les tables de la livraison lues
+    # pour leur validation (ex: zones des contrôles spatiaux des adresses)
+    TABLES = [
+        {'table': 't_adresse', 'service': AdresseService, 'depends_on': [], 'context': ['t_znro', 't_zsro']},
+        {'table': 't_organisme', 'service': OrganismeService, 'depends_on': ['t_adresse'], 'context': []},
+    ]
+    
+    # Contrôles portant sur l'ensemble de la livraison (plusieurs tables), exécutés en parallèle
+    # de la préparation des tables; chaque service expose TABLE et check_archive(file_path)
+    CHECKS = [IntegrityService, TopologyService, CapacityService]
+    
+    # Extensions recherchées dans l'archive pour chaque table
+    EXTENSIONS = ('.shp', '.csv', '.geojson')
+    
+    _pool = None
+    _lock = threading.Lock()
+    
     @staticmethod
-    def import_from_file(file_path):
+    def import_from_file(file_path, progress=None, use_cache=True):
         """
         Importe les données depuis un fichier (ZIP) et analyse les différentes tables GRACE THD
         
+        La lecture et la validation des tables (pandas/shapely, limitées par le CPU) s'exécutent
+        en parallèle dans un pool de processus; le chargement en base suit ensuite l'ordre des
+        dépendances, les tables d'un même niveau étant chargées simultanément sur des
+        connexions distinctes. Une table dont les fichiers et les règles n'ont pas changé
+        depuis une livraison précédente reprend la validation mise en cache: rejetée, elle
+        n'est pas relue; chargée, elle est rechargée sans être revalidée, la base ayant pu
+        changer depuis (table vidée, autre livraison chargée, mode incrémental).
+        
         Args:
             file_path (str): Chemin vers le fichier à importer
-            
+            progress (callable): Fonction appelée avec (phase, lignes traitées) à chaque changement de phase
+            use_cache (bool): Réutiliser les tables analysées et les résultats mis en cache
+        
         Returns:
-            dict: Résultat de l'importation avec statut et messages pour chaque table
+            dict: Résultat de l'importation avec statut et messages pour chaque table,
+                  et mesures des phases (metrics: durée, lignes et requêtes SQL)
+        """
+        with Trace.collect(current_app.config['IMPORT_TRACE_MEMORY']) as trace:
+            results = ImportService._import_archive(file_path, progress, use_cache)
+            if 'tables' in results:
+                results['metrics'] = trace.summary()
+            return results
+    
+    @staticmethod
+    def _import_archive(file_path, progress=None, use_cache=True):
+        """
+        Importe une archive dans la trace courante (voir import_from_file)
         """
         file_ext = os.path.splitext(file_path)[1].lower()
         results = {
             'success': True,
             'message': 'Importation réussie',
-            'tables': []
+            'tables': [],
+            'validation': {}  # Résultats de validation ligne par ligne, par table
         }
         
         try:
@@ -35,84 +83,299 @@ class ImportService:
                     'message': 'Seuls les fichiers ZIP sont acceptés pour l\'importation multi-tables'
                 }
             
-            # Créer un dossier temporaire pour extraire les fichiers
-            temp_dir = tempfile.mkdtemp()
-            try:
-                # Extraire tous les fichiers du ZIP
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(temp_dir)
-                
-                # Vérifier les fichiers disponibles
-                all_files = []
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        all_files.append(file_path)
-                
-                # Rechercher les fichiers pour chaque table en filtrant les extensions
-                adresse_files = [f for f in all_files if 't_adresse' in f.lower() and (
-                    f.lower().endswith('.shp') or 
-                    f.lower().endswith('.csv') or 
-                    f.lower().endswith('.geojson')
-                )]
-                
-                organisme_files = [f for f in all_files if 't_organisme' in f.lower() and (
-                    f.lower().endswith('.shp') or 
-                    f.lower().endswith('.csv') or 
-                    f.lower().endswith('.geojson')
-                )]
+            config = current_app.config
+            validation_cache = ValidationCache(config['VALIDATION_CACHE_FOLDER'] if use_cache else None)
+            cache_dir = config['PARSED_CACHE_FOLDER'] if use_cache else None
+            
+            # Indexer l'archive une seule fois pour savoir quelles tables sont livrées,
+            # et reprendre le résultat des tables inchangées depuis une livraison précédente
+            table_results = {}
+            cache_keys = {}
+            reused = {}
+            with Trace.span('index'), ArchiveReader(file_path) as archive:
+                present = {
+                    spec['table'] for spec in ImportService.TABLES
+                    if archive.find(spec['table'], ImportService.EXTENSIONS)
+                }
+                if validation_cache.cache_dir:
+                    for spec in ImportService.TABLES:
+                        table_name = spec['table']
+                        if table_name not in present:
+                            continue
+                        # Les tables référencées ou lues pour la validation font partie de la clé:
+                        # leur modification invalide l'entrée
+                        digest = ':'.join(archive.table_digest(name)
+                                          for name in [table_name] + spec['depends_on'] + spec['context'])
+                        cache_keys[table_name] = ValidationCache.key(table_name, digest)
+                        cached = validation_cache.get(table_name, cache_keys[table_name])
+                        if cached is None:
+                            continue
+                        if cached['success']:
+                            # Seule la validation est reprise: la table est rechargée
+                            reused[table_name] = cached['validation']
+                        else:
+                            table_results[table_name] = cached
+            
+            # Avancement: phase = étape ou tables en cours de chargement
+            rows_processed = 0
+            if progress:
+                progress('analyse', rows_processed)
+            
+            # Lecture et validation de toutes les tables en parallèle
+            # (les CSV dépassant le budget mémoire sont ensuite traités par morceaux)
+            pool = ImportService._get_pool()
+            memory_budget = config['IMPORT_MEMORY_BUDGET']
+            trace_memory = config['IMPORT_TRACE_MEMORY']
+            prepared = {}
+            cacheable = {}  # Résultat réutilisable pour un contenu identique (_cacheable), par table chargée
+            for spec in ImportService.TABLES:
+                if spec['table'] in present and spec['table'] not in table_results:
+                    prepared[spec['table']] = pool.submit(
+                        ImportService._prepare_table, spec['service'], file_path, memory_budget, cache_dir,
+                        trace_memory, reused.get(spec['table'])
+                    )
+            
+            # Contrôles entre les tables de la livraison (CHECKS), en parallèle de leur préparation
+            checks = {
+                check.TABLE: pool.submit(ImportService._run_check, check, file_path, trace_memory)
+                for check in ImportService.CHECKS
+            }
+            
+            # Chargement par niveaux de dépendance
+            app = current_app._get_current_object()
+            for level in ImportService._load_levels():
+                tables = [spec for spec in level if spec['table'] in prepared]
+                if not tables:
+                    continue
+                if progress:
+                    progress(', '.join(spec['table'] for spec in tables), rows_processed)
                 
-                # Traiter t_adresse
-                if adresse_files:
-                    # Sélectionner le premier fichier trouvé pour t_adresse
-                    adresse_file = adresse_files[0]
-                    adresse_result = AdresseService.import_from_file(adresse_file)
-                    results['tables'].append({
-                        'table': 't_adresse',
-                        'success': adresse_result['success'],
-                        'message': adresse_result['message'],
-                        'errors': adresse_result.get('errors', [])
-                    })
-                    if not adresse_result['success']:
-                        results['success'] = False
+                if len(tables) == 1:
+                    spec = tables[0]
+                    table_results[spec['table']], cacheable[spec['table']] = ImportService._load_prepared(
+                        spec, prepared[spec['table']]
+                    )
                 else:
-                    results['tables'].append({
-                        'table': 't_adresse',
-                        'success': False,
-                        'message': 'Aucun fichier trouvé pour la table t_adresse'
-                    })
+                    # Tables indépendantes: une connexion (session) par thread, chaque thread
+                    # rattachant ses mesures à la trace de l'import (copie du contexte)
+                    with ThreadPoolExecutor(max_workers=len(tables)) as loaders:
+                        futures = {
+                            spec['table']: loaders.submit(
+                                contextvars.copy_context().run,
+                                ImportService._load_table, app, spec, prepared[spec['table']]
+                            )
+                            for spec in tables
+                        }
+                    for table_name, future in futures.items():
+                        table_results[table_name], cacheable[table_name] = future.result()
                 
-                # Traiter t_organisme
-                if organisme_files:
-                    # Sélectionner le premier fichier trouvé pour t_organisme
-                    organisme_file = organisme_files[0]
-                    organisme_result = OrganismeService.import_from_file(organisme_file)
-                    results['tables'].append({
-                        'table': 't_organisme',
-                        'success': organisme_result['success'],
-                        'message': organisme_result['message'],
-                        'errors': organisme_result.get('errors', [])
-                    })
-                    if not organisme_result['success']:
-                        results['success'] = False
-                else:
+                rows_processed += sum(table_results[spec['table']].get('count', 0) for spec in tables)
+            
+            # Résultats de validation des tables chargées, conservés pour la revalidation incrémentale
+            with Trace.span('resultats'):
+                stored = False
+                for table_name in prepared:
+                    table_result = table_results[table_name]
+                    if table_result['success'] and 'report_section' in table_result.get('validation', {}):
+                        ValidationResultService.store_section(table_result['validation']['report_section'])
+                        stored = True
+                if stored:
+                    ValidationResultService.refresh_summary()
+            
+            # Mise en cache des tables traitées dont le résultat ne dépend que de leur contenu
+            with Trace.span('cache'):
+                for table_name, key in cache_keys.items():
+                    if table_name in reused or table_name not in prepared:
+                        continue
+                    if cacheable[table_name]:
+                        validation_cache.put(table_name, key, table_results[table_name])
+                ValidationCache.evict(config['VALIDATION_CACHE_FOLDER'], config['VALIDATION_CACHE_MAX_SIZE'])
+                ValidationCache.evict(config['PARSED_CACHE_FOLDER'], config['PARSED_CACHE_MAX_SIZE'])
+            
+            # Résultats dans l'ordre des tables, au même format que le traitement séquentiel
+            for spec in ImportService.TABLES:
+                table_name = spec['table']
+                if table_name not in table_results:
                     results['tables'].append({
-                        'table': 't_organisme',
+                        'table': table_name,
                         'success': False,
-                        'message': 'Aucun fichier trouvé pour la table t_organisme'
+                        'message': f'Aucun fichier trouvé pour la table {table_name}'
                     })
+                    continue
                 
-                # Mettre à jour le message global
-                if not results['success']:
-                    results['message'] = 'Certaines tables n\'ont pas pu être importées. Consultez les détails ci-dessous.'
-            finally:
-                # Nettoyer le dossier temporaire
-                shutil.rmtree(temp_dir)
-                
+                table_result = table_results[table_name]
+                results['tables'].append({
+                    'table': table_name,
+                    'success': table_result['success'],
+                    'message': table_result['message'],
+                    'errors': table_result.get('errors', [])
+                })
+                if 'validation' in table_result:
+                    results['validation'][table_name] = table_result['validation']
+                if not table_result['success']:
+                    results['success'] = False
+            
+            # Anomalies entre les tables: signalées dans le rapport, sans empêcher le chargement
+            for check_name, future in checks.items():
+                try:
+                    check_result, spans = future.result()
+                except Exception as e:
+                    # Contrôle en échec: signalé dans le rapport sans écarter les tables déjà chargées
+                    check_result, spans = {
+                        'success': False,
+                        'message': f"Erreur lors du contrôle: {str(e)}",
+                        'count': 0,
+                        'errors': []
+                    }, None
+                Trace.graft(spans, check_name)
+                if check_result is None:
+                    continue
+                results['tables'].append({
+                    'table': check_name,
+                    'success': check_result['success'],
+                    'message': check_result['message'],
+                    'errors': check_result['errors']
+                })
+                if 'validation' in check_result:
+                    results['validation'][check_name] = check_result['validation']
+            
+            if progress:
+                progress('import_termine', rows_processed)
+            
+            # Mettre à jour le message global
+            if not results['success']:
+                results['message'] = 'Certaines tables n\'ont pas pu être importées. Consultez les détails ci-dessous.'
+            
             return results
-                
+        
         except Exception as e:
             return {
                 'success': False,
                 'message': f"Erreur lors de l'importation: {str(e)}"
             }
+    
+    @staticmethod
+    def _prepare_table(service, file_path, memory_budget, cache_dir, trace_memory=False, validation=None):
+        """
+        Lit, valide et convertit une table dans un processus du pool
+        
+        Chaque processus ouvre sa propre instance de l'archive; une table dont le membre
+        source n'a pas changé depuis une livraison précédente est relue depuis le cache Parquet.
+        
+        Args:
+            service (type): Service de la table (AdresseService, OrganismeService...)
+            file_path (str): Chemin de l'archive ZIP
+            memory_budget (int): Mémoire disponible pour la table, en octets
+            cache_dir (str): Dossier du cache Parquet des tables analysées
+            trace_memory (bool): Mesurer le pic de mémoire des phases
+            validation (dict): Validation reprise du cache (ValidationCache), à ne pas refaire
+        
+        Returns:
+            dict: Données préparées pour service.load_prepared, avec les mesures
+                  de la préparation (metrics) à rattacher à la trace de l'import
+        """
+        with Trace.collect(trace_memory, record=False) as trace:
+            with Trace.span('preparation'), ArchiveReader(file_path) as archive:
+                prepared = service.prepare_archive(archive, memory_budget, cache_dir, validation)
+            prepared['metrics'] = trace.to_list()
+            return prepared
+    
+    @staticmethod
+    def _run_check(check, file_path, trace_memory=False):
+        """
+        Exécute un contrôle de la livraison (CHECKS) dans un processus du pool
+        
+        Returns:
+            tuple: (résultat de check.check_archive, mesures du contrôle)
+        """
+        with Trace.collect(trace_memory, record=False) as trace:
+            with Trace.span('controle'):
+                result = check.check_archive(file_path)
+            return result, trace.to_list()
+    
+    @staticmethod
+    def _cacheable(prepared, result):
+        """
+        Indique si le résultat d'une table peut être réutilisé pour un contenu identique
+        
+        Un chargement réussi peut l'être, de même qu'un rejet par la validation (rien
+        n'a été chargé); un échec de lecture ou d'insertion, éventuellement passager,
+        ne l'est pas.
+        """
+        if result['success']:
+            return True
+        return 'validation' in prepared and 'records' not in prepared and 'stream' not in prepared
+    
+    @staticmethod
+    def _load_prepared(spec, prepared):
+        """
+        Charge une table préparée, dans le thread de l'import ou un thread de chargement
+        
+        Attend la préparation (processus du pool) puis rattache ses mesures à la trace de l'import.
+        
+        Args:
+            spec (dict): Spécification de la table (TABLES)
+            prepared (Future): Préparation de la table (_prepare_table)
+        
+        Returns:
+            tuple: (résultat de l'importation de la table, résultat réutilisable pour un contenu identique)
+        """
+        result = prepared.result()
+        Trace.graft(result.pop('metrics', None), spec['table'])
+        with Trace.span('chargement', spec['table']):
+            loaded = spec['service'].load_prepared(result)
+        
+        # Le Future conserve la préparation jusqu'à la fin de l'import: les enregistrements
+        # chargés en sont retirés pour que la mémoire ne cumule pas ceux de toutes les tables
+        cacheable = ImportService._cacheable(result, loaded)
+        result.pop('records', None)
+        return loaded, cacheable
+    
+    @staticmethod
+    def _load_table(app, spec, prepared):
+        """
+        Charge une table préparée depuis un thread, avec sa propre session (voir _load_prepared)
+        """
+        with app.app_context():
+            try:
+                return ImportService._load_prepared(spec, prepared)
+            finally:
+                db.session.remove()
+    
+    @staticmethod
+    def _load_levels():
+        """
+        Regroupe les tables par niveau de dépendance (tri topologique)
+        
+        Returns:
+            list: Niveaux successifs, chacun étant une liste de spécifications de table
+        """
+        loaded = set()
+        remaining = list(ImportService.TABLES)
+        levels = []
+        while remaining:
+            level = [spec for spec in remaining if all(dep in loaded for dep in spec['depends_on'])]
+            if not level:
+                raise ValueError("Dépendance circulaire entre les tables: " +
+                                 ', '.join(spec['table'] for spec in remaining))
+            levels.append(level)
+            loaded.update(spec['table'] for spec in level)
+            remaining = [spec for spec in remaining if spec not in level]
+        return levels
+    
+    @staticmethod
+    def _get_pool():
+        """
+        Crée le pool de processus de préparation au premier usage
+        
+        Les processus sont lancés par 'spawn': le serveur exécute les imports dans des
+        threads, et dupliquer (fork) un processus multi-thread n'est pas sûr. Chaque processus
+        réimporte le module principal sous le nom __mp_main__: run.py n'y crée pas l'application.
+        """
+        with ImportService._lock:
+            if ImportService._pool is None:
+                ImportService._pool = ProcessPoolExecutor(
+                    max_workers=current_app.config['IMPORT_PROCESSES'],
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return ImportService._pool
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+from app import db
+from app.services.bulk_service import BulkService, _DataFrameCsvStream
+
+class IncrementalLoad:
+    """
+    Chargement différentiel d'une table à partir des empreintes de ses lignes
+
+    L'empreinte d'une ligne est un hachage 64 bits de ses valeurs normalisées (la
+    géométrie étant déjà en EWKB après projection). Elle est comparée à celle de la
+    version chargée précédemment, conservée dans une table annexe: seules les lignes
+    nouvelles ou modifiées sont écrites, et les lignes absentes de la livraison sont
+    supprimées à la fin du chargement (finish). Les données sont écrites avant les
+    empreintes: une interruption entre les deux ne fait que réécrire les lignes au
+    chargement suivant.
+
+    La comparaison se fait en base, lot par lot, sans charger les empreintes en
+    mémoire: les empreintes du lot sont copiées dans une table de transit et jointes
+    à la table annexe et à la table cible. Une ligne supprimée de la table cible hors
+    de l'import n'est donc pas considérée comme inchangée: elle est réécrite.
+    """
+
+    def __init__(self, table, fingerprint_table, key, label):
+        """
+        Args:
+            table (Table): Table SQLAlchemy cible (ex: Adresse.__table__)
+            fingerprint_table (Table): Table des empreintes (clé, empreinte)
+            key (str): Nom de la clé primaire, commun aux deux tables
+            label (str): Libellé de l'objet utilisé dans les messages d'erreur (ex: "l'adresse")
+        """
+        self.table = table
+        self.fingerprint_table = fingerprint_table
+        self.key = key
+        self.label = label
+        self.seen = []
+
+    @staticmethod
+    def fingerprints(records):
+        """
+        Calcule l'empreinte de chaque ligne d'un DataFrame projeté par ColumnMapping
+
+        Args:
+            records (DataFrame): Lignes projetées sur les colonnes de la table
+
+        Returns:
+            ndarray: Empreintes (int64, stockables en bigint), dans l'ordre des lignes
+        """
+        # Normalisation en texte: une même valeur donne la même empreinte quel que soit
+        # son type d'origine (Shapefile, CSV, cache Parquet)
+        normalized = records.reindex(columns=sorted(records.columns)).astype(str)
+        hashes = pd.util.hash_pandas_object(normalized, index=False, categorize=False)
+        return hashes.to_numpy().view('int64')
+
+    def load(self, records):
+        """
+        Charge les lignes nouvelles ou modifiées d'un lot et enregistre leurs empreintes
+
+        Comme au chargement complet, une valeur vide de la livraison conserve celle en base.
+
+        Args:
+            records (DataFrame): Lignes projetées sur les colonnes de la table
+
+        Returns:
+            dict: Compteurs inserted/updated/unchanged/skipped et liste des erreurs
+        """
+        if self.key not in records.columns:
+            # Aucune ligne identifiable: le chargement signale chaque ligne sans code
+            outcome = BulkService.upsert_records(self.table, records.to_dict('records'), self.key, self.label,
+                                                 keep_existing=True)
+            outcome['unchanged'] = 0
+            return outcome
+
+        # Doublons du fichier: la dernière occurrence l'emporte
+        keyed = records[records[self.key].notna()]
+        keyed = keyed[~keyed[self.key].duplicated(keep='last')]
+        fingerprints = self.fingerprints(keyed)
+        codes = keyed[self.key].to_numpy(dtype=object)
+        self.seen.append(codes)
+
+        # Lignes nouvelles (code inconnu), dont l'empreinte a changé ou absentes de la table
+        changed = ~self._unchanged(codes, fingerprints)
+
+        # Les lignes sans code sont transmises au chargement pour être signalées
+        delta = pd.concat([keyed[changed], records[records[self.key].isna()]])
+        outcome = BulkService.upsert_records(self.table, delta.to_dict('records'), self.key, self.label,
+                                             keep_existing=True)
+        outcome['unchanged'] = int((~changed).sum())
+
+        # Empreintes des lignes effectivement écrites
+        written = changed & ~pd.Series(codes).isin(outcome['rejected']).to_numpy()
+        self._save(codes[written], fingerprints[written])
+        return outcome
+
+    def finish(self):
+        """
+        Supprime les lignes chargées précédemment et absentes de la livraison
+
+        Les codes de la livraison sont copiés dans une table de transit: les empreintes
+        absentes de la livraison sont supprimées avec leurs lignes en une instruction.
+
+        Returns:
+            int: Nombre de lignes supprimées
+        """
+        seen = np.concatenate(self.seen) if self.seen else np.array([], dtype=object)
+        preparer = db.engine.dialect.identifier_preparer
+        staging = preparer.quote(f"staging_{self.fingerprint_table.name}")
+        quoted_key = preparer.quote(self.key)
+
+        connection = db.session.connection().connection
+        with connection.cursor() as cursor:
+            self._stage(cursor, staging, pd.DataFrame({'code': seen}), 'code text')
+            cursor.execute(
+                f"WITH missing AS ("
+                f"DELETE FROM {preparer.format_table(self.fingerprint_table)} f "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {staging} s WHERE s.code = f.{quoted_key}) "
+                f"RETURNING f.{quoted_key}), "
+                f"removed AS ("
+                f"DELETE FROM {preparer.format_table(self.table)} t USING missing m "
+                f"WHERE t.{quoted_key} = m.{quoted_key} RETURNING 1) "
+                f"SELECT count(*) FROM removed"
+            )
+            deleted = cursor.fetchone()[0]
+        db.session.commit()
+        return deleted
+
+    def _unchanged(self, codes, fingerprints):
+        """
+        Repère les lignes d'un lot dont l'empreinte enregistrée est identique et la ligne présente en base
+
+        Args:
+            codes (ndarray): Codes des lignes du lot (sans doublon)
+            fingerprints (ndarray): Empreintes des lignes, dans le même ordre
+
+        Returns:
+            ndarray: Masque booléen des lignes inchangées
+        """
+        unchanged = np.zeros(len(codes), dtype=bool)
+        if len(codes) == 0:
+            return unchanged
+        preparer = db.engine.dialect.identifier_preparer
+        staging = preparer.quote(f"staging_{self.fingerprint_table.name}")
+        quoted_key = preparer.quote(self.key)
+
+        connection = db.session.connection().connection
+        with connection.cursor() as cursor:
+            self._stage(cursor, staging, pd.DataFrame({'code': codes, 'empreinte': fingerprints}),
+                        'code text, empreinte bigint')
+            cursor.execute(
+                f"SELECT s.ligne FROM {staging} s "
+                f"JOIN {preparer.format_table(self.fingerprint_table)} f "
+                f"ON f.{quoted_key} = s.code AND f.empreinte = s.empreinte "
+                f"JOIN {preparer.format_table(self.table)} t ON t.{quoted_key} = s.code"
+            )
+            positions = [position for position, in cursor.fetchall()]
+            cursor.execute(f"DROP TABLE {staging}")
+        unchanged[positions] = True
+        return unchanged
+
+    @staticmethod
+    def _stage(cursor, staging, df, definitions):
+        """
+        Copie un DataFrame dans une table de transit temporaire (COPY), précédé de la position de chaque ligne
+        """
+        cursor.execute(f"CREATE TEMP TABLE {staging} (ligne bigint, {definitions}) ON COMMIT DROP")
+        cursor.copy_expert(
+            f"COPY {staging} FROM STDIN WITH (FORMAT csv, DELIMITER ';')",
+            _DataFrameCsvStream(df, BulkService.COPY_CHUNK_SIZE),
+            size=1 << 20
+        )
+        cursor.execute(f"ANALYZE {staging}")
+
+    def _save(self, codes, fingerprints):
+        """
+        Enregistre les empreintes des lignes écrites (INSERT ... ON CONFLICT)
+        """
+        if len(codes) == 0:
+            return
+        preparer = db.engine.dialect.identifier_preparer
+        quoted_key = preparer.quote(self.key)
+        sql = (
+            f"INSERT INTO {preparer.format_table(self.fingerprint_table)} ({quoted_key}, empreinte) VALUES %s "
+            f"ON CONFLICT ({quoted_key}) DO UPDATE SET empreinte = EXCLUDED.empreinte"
+        )
+        rows = list(zip(codes.tolist(), fingerprints.tolist()))
+        connection = db.session.connection().connection
+        with connection.cursor() as cursor:
+            execute_values(cursor, sql, rows, page_size=BulkService.PAGE_SIZE)
+        db.session.commit()
@@ -0,0 +1,317 @@
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+import psycopg2.extensions
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+class Span:
+    """
+    Phase mesurée d'un traitement: durée (ns), lignes traitées, requêtes SQL et pic
+    de mémoire Python (tracemalloc) entre l'entrée et la sortie du bloc
+    """
+    
+    def __init__(self, trace, name, table=None, rows=None, parent=None):
+        self.trace = trace
+        self.parent = parent
+        self.phase = f"{parent.phase}/{name}" if parent else name
+        self.table = table or (parent.table if parent else None)
+        self.rows = rows
+        self.queries = 0
+        self.peak_memory = None
+        self.child_peak = 0
+        self.start = None
+        self.duration_ns = None
+    
+    def to_dict(self):
+        return {
+            'phase': self.phase,
+            'table': self.table,
+            'duration_ns': self.duration_ns,
+            'rows': self.rows,
+            'queries': self.queries,
+            'peak_memory': self.peak_memory,
+        }
+
+
+class Trace:
+    """
+    Mesures d'un traitement (import, rapport), phase par phase
+    
+    La trace et la phase en cours sont portées par des variables de contexte: les services
+    ouvrent leurs phases avec Trace.span sans recevoir la trace en paramètre, et une phase
+    ouverte hors de toute trace ne mesure rien. Les threads lancés avec
+    contextvars.copy_context().run rattachent leurs phases à celle qui les a lancés; les
+    processus du pool renvoient les leurs (Trace.collect) pour qu'elles soient greffées
+    (Trace.graft) dans la trace de l'import.
+    
+    Le pic de mémoire (tracemalloc) est celui du processus pendant la phase: des imports
+    simultanés dans le même processus le faussent. Il n'est pas mesuré avant Python 3.9.
+    """
+    
+    _current = ContextVar('trace', default=None)
+    _span = ContextVar('span', default=None)
+    
+    # Nombre de traces mesurant la mémoire: tracemalloc est actif tant qu'il en reste une
+    _memory_users = 0
+    _memory_lock = threading.Lock()
+    
+    def __init__(self, trace_memory=False):
+        """
+        Args:
+            trace_memory (bool): Mesurer le pic de mémoire des phases (tracemalloc, coûteux)
+        """
+        self.trace_memory = trace_memory
+        self.spans = []
+        self.queries = 0
+        self.start = time.perf_counter_ns()
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    @contextmanager
+    def collect(trace_memory=False, record=True):
+        """
+        Ouvre une trace, ou rejoint celle déjà ouverte dans le contexte courant
+        
+        Seule la trace la plus externe est ajoutée au registre des métriques (MetricsRegistry).
+        
+        Args:
+            trace_memory (bool): Mesurer le pic de mémoire des phases
+            record (bool): Ajouter la trace au registre (False dans les processus du pool,
+                           dont les mesures sont greffées dans la trace de l'import)
+        
+        Yields:
+            Trace: Trace en cours
+        """
+        current = Trace._current.get()
+        if current is not None:
+            yield current
+            return
+        
+        trace = Trace(trace_memory)
+        token = Trace._current.set(trace)
+        if trace_memory:
+            Trace._start_memory()
+        try:
+            yield trace
+        finally:
+            Trace._current.reset(token)
+            if trace_memory:
+                Trace._stop_memory()
+            if record:
+                MetricsRegistry.record(trace)
+    
+    @staticmethod
+    @contextmanager
+    def span(name, table=None, rows=None):
+        """
+        Mesure un bloc de code comme une phase de la trace courante
+        
+        Args:
+            name (str): Nom de la phase (préfixé par celui de la phase englobante)
+            table (str): Table traitée (héritée de la phase englobante par défaut)
+            rows (int): Lignes traitées, modifiable pendant la phase (span.rows)
+        
+        Yields:
+            Span: Phase en cours (non enregistrée hors de toute trace)
+        """
+        trace = Trace._current.get()
+        if trace is None:
+            yield Span(None, name, table, rows)
+            return
+        
+        span = Span(trace, name, table, rows, Trace._span.get())
+        token = Trace._span.set(span)
+        # Pic propre à la phase: tracemalloc.reset_peak n'existe qu'à partir de Python 3.9
+        memory = trace.trace_memory and tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak')
+        if memory:
+            tracemalloc.reset_peak()
+        span.start = time.perf_counter_ns()
+        try:
+            yield span
+        finally:
+            span.duration_ns = time.perf_counter_ns() - span.start
+            if memory:
+                # Le pic d'une phase englobante inclut ceux de ses sous-phases (qui l'ont remis à zéro)
+                span.peak_memory = max(tracemalloc.get_traced_memory()[1], span.child_peak)
+                if span.parent is not None:
+                    span.parent.child_peak = max(span.parent.child_peak, span.peak_memory)
+            Trace._span.reset(token)
+            with trace.lock:
+                trace.spans.append(span.to_dict())
+    
+    @staticmethod
+    def graft(spans, table=None):
+        """
+        Rattache à la phase courante des phases mesurées dans un autre processus
+        
+        Args:
+            spans (list): Phases retournées par Trace.to_list dans le processus distant
+            table (str): Table traitée, à défaut de celle des phases
+        """
+        trace, parent = Trace._current.get(), Trace._span.get()
+        if trace is None or not spans:
+            return
+        with trace.lock:
+            for span in spans:
+                trace.spans.append({
+                    **span,
+                    'phase': f"{parent.phase}/{span['phase']}" if parent else span['phase'],
+                    'table': span['table'] or table or (parent.table if parent else None),
+                })
+    
+    def to_list(self):
+        """
+        Returns:
+            list: Phases terminées, dans l'ordre de leur fin
+        """
+        with self.lock:
+            return list(self.spans)
+    
+    def summary(self):
+        """
+        Résumé des mesures pour le résultat d'un import (durées en ms)
+        
+        Returns:
+            dict: Durée écoulée et requêtes SQL depuis l'ouverture de la trace, détail des phases
+        """
+        spans = self.to_list()
+        return {
+            'duration_ms': round((time.perf_counter_ns() - self.start) / 1e6, 3),
+            'queries': self.queries,
+            'spans': [
+                {**span, 'duration_ms': round(span['duration_ns'] / 1e6, 3)}
+                for span in sorted(spans, key=lambda span: span['phase'])
+            ],
+        }
+    
+    @staticmethod
+    def _count_query():
+        """
+        Compte une requête SQL dans la trace courante, sa phase et les phases englobantes
+        """
+        trace = Trace._current.get()
+        if trace is None:
+            return
+        span = Trace._span.get()
+        with trace.lock:
+            trace.queries += 1
+            while span is not None:
+                span.queries += 1
+                span = span.parent
+    
+    @staticmethod
+    def _start_memory():
+        with Trace._memory_lock:
+            if Trace._memory_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            Trace._memory_users += 1
+    
+    @staticmethod
+    def _stop_memory():
+        with Trace._memory_lock:
+            Trace._memory_users -= 1
+            if Trace._memory_users == 0 and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """
+    Curseur psycopg2 comptant ses instructions dans la trace courante
+    
+    Les chargements de masse (COPY, execute_values) passent par le curseur DBAPI sans
+    les événements d'exécution de SQLAlchemy: le comptage se fait au niveau du curseur.
+    """
+    
+    def execute(self, query, vars=None):
+        Trace._count_query()
+        return super().execute(query, vars)
+    
+    def executemany(self, query, vars_list):
+        Trace._count_query()
+        return super().executemany(query, vars_list)
+    
+    def copy_expert(self, sql, file, size=8192):
+        Trace._count_query()
+        return super().copy_expert(sql, file, size)
+
+
+@event.listens_for(Pool, 'connect')
+def _count_queries(dbapi_connection, connection_record):
+    """
+    Installe le curseur de comptage sur chaque nouvelle connexion PostgreSQL
+    """
+    if isinstance(dbapi_connection, psycopg2.extensions.connection):
+        dbapi_connection.cursor_factory = CountingCursor
+
+
+class MetricsRegistry:
+    """
+    Cumul des phases des traces du processus, exposé au format texte Prometheus (/metrics)
+    
+    Les valeurs sont propres au processus serveur qui a exécuté les imports.
+    """
+    
+    PREFIX = 'grace_thd'
+    
+    _lock = threading.Lock()
+    _traces = 0
+    _phases = {}
+    
+    @staticmethod
+    def record(trace):
+        """
+        Ajoute les phases d'une trace terminée aux cumuls
+        """
+        with MetricsRegistry._lock:
+            MetricsRegistry._traces += 1
+            for span in trace.to_list():
+                totals = MetricsRegistry._phases.setdefault(
+                    (span['phase'], span['table'] or ''),
+                    {'count': 0, 'seconds': 0.0, 'rows': 0, 'queries': 0, 'peak_memory': None}
+                )
+                totals['count'] += 1
+                totals['seconds'] += span['duration_ns'] / 1e9
+                totals['rows'] += span['rows'] or 0
+                totals['queries'] += span['queries']
+                if span['peak_memory'] is not None:
+                    totals['peak_memory'] = max(totals['peak_memory'] or 0, span['peak_memory'])
+    
+    @staticmethod
+    def to_prometheus():
+        """
+        Returns:
+            str: Métriques au format d'exposition texte de Prometheus
+        """
+        prefix = MetricsRegistry.PREFIX
+        metrics = [
+            ('phase_runs_total', 'counter', "Nombre d'exécutions de la phase", 'count'),
+            ('phase_seconds_total', 'counter', "Durée cumulée de la phase (secondes)", 'seconds'),
+            ('phase_rows_total', 'counter', "Lignes traitées par la phase", 'rows'),
+            ('phase_queries_total', 'counter', "Requêtes SQL exécutées pendant la phase", 'queries'),
+            ('phase_peak_memory_bytes', 'gauge', "Pic de mémoire Python observé pendant la phase (tracemalloc)",
+             'peak_memory'),
+        ]
+        with MetricsRegistry._lock:
+            lines = [
+                f"# HELP {prefix}_traces_total Nombre de traitements mesurés",
+                f"# TYPE {prefix}_traces_total counter",
+                f"{prefix}_traces_total {MetricsRegistry._traces}",
+            ]
+            phases = sorted(MetricsRegistry._phases.items())
+            for name, kind, description, field in metrics:
+                lines.append(f"# HELP {prefix}_{name} {description}")
+                lines.append(f"# TYPE {prefix}_{name} {kind}")
+                for (phase, table), totals in phases:
+                    if totals[field] is None:
+                        continue
+                    labels = f'phase="{MetricsRegistry._escape(phase)}",table="{MetricsRegistry._escape(table)}"'
+                    lines.append(f"{prefix}_{name}{{{labels}}} {totals[field]:g}" if field == 'seconds'
+                                 else f"{prefix}_{name}{{{labels}}} {totals[field]}")
+        return '\n'.join(lines) + '\n'
+    
+    @staticmethod
+    def _escape(value):
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
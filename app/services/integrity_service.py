@@ -0,0 +1,67 @@
+from app.services.archive_reader import ArchiveReader
+from app.services.report_writer import ReportWriter
+from app.validators.integrity import REFERENCES, ReferenceCheck, required_columns
+
+class IntegrityService:
+    """
+    Contrôle des références entre les tables d'une livraison GRACE THD
+    """
+    
+    # Nom sous lequel le contrôle figure dans les résultats de l'import et le rapport
+    TABLE = 'references'
+    
+    # Formats lus par ordre de préférence: les attributs d'un Shapefile sont lus dans
+    # son DBF, sans décoder les géométries
+    EXTENSIONS = ('.csv', '.dbf', '.geojson', '.shp')
+    
+    @staticmethod
+    def check_archive(file_path):
+        """
+        Contrôle les références de toutes les tables d'une archive
+        
+        Seules les colonnes de clé et de référence sont lues, une fois par table.
+        Exécuté dans un processus du pool de préparation de l'import.
+        
+        Args:
+            file_path (str): Chemin de l'archive ZIP
+            
+        Returns:
+            dict: Résultat du contrôle (success, message, count, errors, validation),
+                  ou None si aucune table livrée ne porte de référence
+        """
+        with ArchiveReader(file_path) as archive:
+            frames = {}
+            for table in REFERENCES:
+                member = archive.find(table, IntegrityService.EXTENSIONS)
+                if member:
+                    frames[table] = archive.read_columns(member, required_columns(table))
+        
+        check = ReferenceCheck(frames)
+        results = {table: check.check(table) for table in frames}
+        if not any(counts or skipped for _, counts, skipped in results.values()):
+            return None
+        
+        count, checked, errors, unchecked = 0, 0, [], []
+        for table, (findings, counts, skipped) in results.items():
+            count += len(findings)
+            checked += len(counts)
+            errors.extend(
+                {'controle': f"{column}_reference",
+                 'message': f"{table}.{column}: {dangling} références inexistantes dans {target}"}
+                for column, (target, dangling) in counts.items() if dangling
+            )
+            unchecked.extend(f"{table}.{column} ({target})" for column, target in skipped.items())
+        
+        if count:
+            message = f"{count} références inexistantes sur {checked} colonnes contrôlées"
+        elif checked:
+            message = f"Toutes les références sont valides ({checked} colonnes contrôlées)"
+        else:
+            message = "Aucune référence contrôlée"
+        if unchecked:
+            message += f"; non contrôlées, table référencée absente ou sans clé: {', '.join(unchecked)}"
+        return ReportWriter.check_result(
+            ((table, *finding) for table, (findings, _, _) in results.items()
+             for finding in findings.itertuples(index=False, name=None)),
+            message, errors
+        )
@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from app import db
+from app.lazy import LazyImport
+from app.services.export_service import ExportService
+from app.services.instrumentation import Trace
+
+# Import des archives (pandas, geopandas...): chargé par le premier worker qui en exécute un
+ImportService = LazyImport('app.services.import_service', 'ImportService')
+
+class JobService:
+    """
+    Exécution des imports et des régénérations de rapport en tâche de fond
+
+    L'état des tâches est conservé dans une base SQLite locale (aucun broker externe),
+    ce qui permet à n'importe quel processus du serveur de répondre sur l'avancement.
+    Le processus qui exécute une tâche en est le propriétaire et signale régulièrement
+    qu'il est en vie (heartbeat_at): une tâche dont le propriétaire ne donne plus signe
+    de vie, arrêté ou redémarré, est marquée en échec quel que soit son âge.
+    """
+
+    # Statuts d'une tâche
+    PENDING = 'en_attente'
+    RUNNING = 'en_cours'
+    DONE = 'terminee'
+    FAILED = 'echec'
+
+    # Nombre d'intervalles de signe de vie manqués avant qu'une tâche soit considérée comme interrompue
+    MISSED_HEARTBEATS = 3
+
+    _executor = None
+    _owner = None
+    _lock = threading.Lock()
+
+    # Bases de tâches dont le schéma a été créé par ce processus
+    _initialized = set()
+
+    @staticmethod
+    def submit(app, file_path, use_cache=True):
+        """
+        Enregistre une tâche d'import et la confie au pool de workers
+
+        Args:
+            app (Flask): Application Flask (le worker s'exécute dans son contexte)
+            file_path (str): Chemin du fichier ZIP déposé, supprimé en fin de tâche
+            use_cache (bool): Réutiliser les résultats des tables inchangées (False: tout revalider)
+
+        Returns:
+            str: Identifiant de la tâche
+        """
+        return JobService._enqueue(app, file_path, JobService._run, use_cache)
+
+    @staticmethod
+    def submit_report(app, table_names, full=False):
+        """
+        Enregistre une régénération du rapport à partir des résultats enregistrés et la confie au pool
+
+        Args:
+            app (Flask): Application Flask (le worker s'exécute dans son contexte)
+            table_names (list): Tables du rapport
+            full (bool): Revalider tous les objets, et non seulement ceux modifiés
+
+        Returns:
+            str: Identifiant de la tâche
+        """
+        return JobService._enqueue(app, None, JobService._run_report, table_names, full)
+
+    @staticmethod
+    def _enqueue(app, file_path, target, *args):
+        """
+        Enregistre une tâche en attente puis soumet target(app, job_id, *args) au pool de workers
+        """
+        job_id = uuid.uuid4().hex
+        executor = JobService._get_executor(app)
+        with JobService._connect(app) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, phase, file_path, rows_processed, created_at, owner, heartbeat_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, JobService.PENDING, 'en_attente', file_path, time.time(), JobService._owner_id(),
+                 time.time())
+            )
+        executor.submit(target, app, job_id, *args)
+        return job_id
+
+    @staticmethod
+    def get_job(app, job_id):
+        """
+        Récupère l'état d'une tâche
+
+        Args:
+            app (Flask): Application Flask
+            job_id (str): Identifiant de la tâche
+
+        Returns:
+            dict: État de la tâche (statut, phase, lignes traitées, débit, résultat) ou None
+        """
+        with JobService._connect(app) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row['status'] in (JobService.PENDING, JobService.RUNNING):
+                # Propriétaire arrêté depuis le dernier signe de vie: la tâche ne se terminera pas
+                if JobService._fail_orphans(app, conn):
+                    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+
+        # Débit calculé sur la durée écoulée depuis le démarrage du worker
+        elapsed = None
+        if job['started_at']:
+            elapsed = (job['finished_at'] or time.time()) - job['started_at']
+        job['elapsed'] = round(elapsed, 3) if elapsed is not None else None
+        job['throughput'] = round(job['rows_processed'] / elapsed, 1) if elapsed else None
+        return job
+
+    @staticmethod
+    def _run(app, job_id, use_cache=True):
+        """
+        Exécute une tâche d'import dans le contexte de l'application (thread du pool)
+        """
+        with app.app_context():
+            with JobService._connect(app) as conn:
+                file_path = conn.execute("SELECT file_path FROM jobs WHERE id = ?", (job_id,)).fetchone()['file_path']
+            JobService._update(app, job_id, status=JobService.RUNNING, phase='extraction', started_at=time.time())
+
+            def progress(phase, rows_processed):
+                JobService._update(app, job_id, phase=phase, rows_processed=rows_processed)
+
+            try:
+                # Mesures de l'import et du rapport, jointes au résultat de la tâche
+                with Trace.collect(app.config['IMPORT_TRACE_MEMORY']) as trace:
+                    result = ImportService.import_from_file(file_path, progress=progress, use_cache=use_cache)
+
+                    JobService._update(app, job_id, phase='rapport')
+                    export_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'reports')
+                    report_path = ExportService.generate_validation_report(
+                        result, export_dir,
+                        compress=app.config['REPORT_COMPRESS'],
+                        flush_interval=app.config['REPORT_FLUSH_INTERVAL']
+                    )
+
+                JobService._update(
+                    app, job_id,
+                    status=JobService.DONE,
+                    phase='terminee',
+                    finished_at=time.time(),
+                    report_filename=os.path.basename(report_path),
+                    result=json.dumps({
+                        'success': result['success'],
+                        'message': result['message'],
+                        'tables': result.get('tables', []),
+                        'metrics': trace.summary()
+                    })
+                )
+            except Exception as e:
+                JobService._update(
+                    app, job_id,
+                    status=JobService.FAILED,
+                    finished_at=time.time(),
+                    result=json.dumps({'success': False, 'message': f"Erreur lors de l'importation: {str(e)}"})
+                )
+            finally:
+                db.session.remove()
+                # Supprimer le fichier d'import temporaire
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+
+    @staticmethod
+    def _run_report(app, job_id, table_names, full=False):
+        """
+        Régénère le rapport de validation dans le contexte de l'application (thread du pool)
+        """
+        with app.app_context():
+            JobService._update(app, job_id, status=JobService.RUNNING, phase='revalidation', started_at=time.time())
+            try:
+                with Trace.collect(app.config['IMPORT_TRACE_MEMORY']) as trace:
+                    report_path, revalidated = ExportService.generate_stored_report(
+                        os.path.join(app.config['UPLOAD_FOLDER'], 'reports'), table_names, full=full,
+                        compress=app.config['REPORT_COMPRESS'],
+                        flush_interval=app.config['REPORT_FLUSH_INTERVAL']
+                    )
+
+                JobService._update(
+                    app, job_id,
+                    status=JobService.DONE,
+                    phase='terminee',
+                    finished_at=time.time(),
+                    rows_processed=sum(revalidated.values()),
+                    report_filename=os.path.basename(report_path),
+                    result=json.dumps({
+                        'success': True,
+                        'message': f"Rapport régénéré, {sum(revalidated.values())} objets revalidés",
+                        'revalidated': revalidated,
+                        'metrics': trace.summary()
+                    })
+                )
+            except Exception as e:
+                JobService._update(
+                    app, job_id,
+                    status=JobService.FAILED,
+                    finished_at=time.time(),
+                    result=json.dumps({'success': False,
+                                       'message': f"Erreur lors de la génération du rapport: {str(e)}"})
+                )
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _update(app, job_id, **fields):
+        """
+        Met à jour les champs d'une tâche
+        """
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with JobService._connect(app) as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    @staticmethod
+    def _get_executor(app):
+        """
+        Crée le pool de workers au premier usage, avec le thread des signes de vie,
+        et marque les tâches interrompues par un arrêt précédent
+        """
+        with JobService._lock:
+            if JobService._executor is None:
+                with JobService._connect(app) as conn:
+                    JobService._fail_orphans(app, conn)
+                JobService._executor = ThreadPoolExecutor(
+                    max_workers=app.config['IMPORT_WORKERS'],
+                    thread_name_prefix='import-job'
+                )
+                threading.Thread(target=JobService._heartbeat, args=(app, JobService._owner_id()),
+                                 name='import-job-heartbeat', daemon=True).start()
+            return JobService._executor
+
+    @staticmethod
+    def _heartbeat(app, owner):
+        """
+        Signale à intervalle régulier que les tâches de ce processus sont toujours suivies
+        """
+        while True:
+            time.sleep(app.config['IMPORT_JOB_HEARTBEAT'])
+            try:
+                with JobService._connect(app) as conn:
+                    conn.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+                        (time.time(), owner, JobService.PENDING, JobService.RUNNING)
+                    )
+            except sqlite3.Error:
+                # Base momentanément verrouillée: le prochain signe de vie suffira
+                continue
+
+    @staticmethod
+    def _fail_orphans(app, conn):
+        """
+        Marque en échec les tâches non terminées dont le propriétaire ne donne plus signe de vie
+
+        Returns:
+            int: Nombre de tâches marquées en échec
+        """
+        now = time.time()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ? WHERE status IN (?, ?) AND heartbeat_at < ?",
+            (JobService.FAILED, now,
+             json.dumps({'success': False, 'message': "Tâche interrompue par l'arrêt du serveur"}),
+             JobService.PENDING, JobService.RUNNING,
+             now - JobService.MISSED_HEARTBEATS * app.config['IMPORT_JOB_HEARTBEAT'])
+        )
+        return cursor.rowcount
+
+    @staticmethod
+    def _owner_id():
+        """
+        Identifiant du processus courant (hôte, pid), recalculé après un fork
+        """
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        if JobService._owner is None or not JobService._owner.startswith(owner + ':'):
+            JobService._owner = f"{owner}:{uuid.uuid4().hex[:8]}"
+        return JobService._owner
+
+    @staticmethod
+    @contextmanager
+    def _connect(app):
+        """
+        Ouvre une transaction sur la base SQLite des tâches
+
+        La base et sa table sont créées à la première connexion du processus.
+        """
+        database = app.config['JOBS_DATABASE']
+        conn = sqlite3.connect(database, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            if database not in JobService._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    "id TEXT PRIMARY KEY, status TEXT NOT NULL, phase TEXT, file_path TEXT, "
+                    "rows_processed INTEGER DEFAULT 0, report_filename TEXT, result TEXT, "
+                    "created_at REAL, started_at REAL, finished_at REAL, owner TEXT NOT NULL, "
+                    "heartbeat_at REAL NOT NULL)"
+                )
+                JobService._initialized.add(database)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
@@ -1,15 +1,19 @@
 import os
-import zipfile
-import tempfile
-import shutil
-import pandas as pd
-import geopandas as gpd
+import functools
 from app import db
+from app.lazy import LazyImport
 from app.models.organisme import Organisme
-from app.validators.organisme_validator import OrganismeValidator
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import update
+from app.services.instrumentation import Trace
+from app.services.report_writer import ReportWriter
+
+# Chargés au premier import ou à la première validation (voir AdresseService)
+pd = LazyImport('pandas')
+gpd = LazyImport('geopandas')
+ArchiveReader = LazyImport('app.services.archive_reader', 'ArchiveReader')
+BulkService = LazyImport('app.services.bulk_service', 'BulkService')
+ColumnMapping = LazyImport('app.services.column_mapping', 'ColumnMapping')
+ParquetCache = LazyImport('app.services.parquet_cache', 'ParquetCache')
+OrganismeValidator = LazyImport('app.validators.organisme_validator', 'OrganismeValidator')
 
 class OrganismeService:
     @staticmethod
@@ -26,82 +30,13 @@ class OrganismeService:
         file_ext = os.path.splitext(file_path)[1].lower()
         
         try:
-            # Gérer les fichiers ZIP
+            # Gérer les fichiers ZIP: lecture directe dans l'archive, sans extraction
             if file_ext == '.zip':
-                # Créer un dossier temporaire pour extraire les fichiers
-                temp_dir = tempfile.mkdtemp()
-                try:
-                    # Extraire tous les fichiers du ZIP
-                    with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                        zip_ref.extractall(temp_dir)
-                    
-                    # Chercher un fichier contenant les données d'organismes
-                    csv_files = [f for f in os.listdir(temp_dir) if f.lower().endswith('.csv') and 't_organisme' in f.lower()]
-                    shp_files = [f for f in os.listdir(temp_dir) if f.lower().endswith('.shp') and 't_organisme' in f.lower()]
-                    
-                    if csv_files:
-                        # Utiliser le premier fichier CSV trouvé
-                        file_path = os.path.join(temp_dir, csv_files[0])
-                        # Lire le fichier CSV avec une gestion d'erreurs améliorée
-                        try:
-                            df = pd.read_csv(file_path, 
-                                          sep=';',  # Utiliser le point-virgule comme séparateur
-                                          on_bad_lines='skip',  # Ignorer les lignes problématiques
-                                          dtype=str,  # Tout traiter comme des chaînes
-                                          encoding='utf-8-sig')  # Gérer les BOM
-                        except:
-                            # Fallback au cas où on_bad_lines n'est pas disponible (versions pandas plus anciennes)
-                            df = pd.read_csv(file_path, 
-                                          sep=';', 
-                                          error_bad_lines=False, 
-                                          warn_bad_lines=True,
-                                          dtype=str,
-                                          encoding='utf-8-sig')
-                        
-                        # Vérifier et ajouter les colonnes requises manquantes
-                        required_columns = ['or_code', 'or_nom', 'or_type']
-                        for col in required_columns:
-                            if col not in df.columns:
-                                df[col] = None  # Ajouter une colonne vide pour éviter les erreurs de validation
-                                
-                        return OrganismeService._process_dataframe(df)
-                    elif shp_files:
-                        # Utiliser le premier fichier SHP trouvé
-                        shp_path = os.path.join(temp_dir, shp_files[0])
-                        # Lire le fichier SHP
-                        gdf = gpd.read_file(shp_path)
-                        
-                        # Vérifier et ajouter les colonnes requises manquantes
-                        required_columns = ['or_code', 'or_nom', 'or_type']
-                        for col in required_columns:
-                            if col not in gdf.columns:
-                                gdf[col] = None
-                                
-                        return OrganismeService._process_dataframe(gdf)
-                    else:
-                        return {
-                            'success': False,
-                            'message': "Aucun fichier contenant des données d'organismes n'a été trouvé dans l'archive ZIP"
-                        }
-                finally:
-                    # Nettoyer le dossier temporaire
-                    shutil.rmtree(temp_dir)
+                with ArchiveReader(file_path) as archive:
+                    return OrganismeService.import_from_archive(archive)
             # Traiter les autres formats
             elif file_ext == '.csv':
-                try:
-                    df = pd.read_csv(file_path, 
-                                  sep=';',  # Utiliser le point-virgule comme séparateur
-                                  on_bad_lines='skip',  # Ignorer les lignes problématiques
-                                  dtype=str,  # Tout traiter comme des chaînes
-                                  encoding='utf-8-sig')  # Gérer les BOM
-                except:
-                    # Fallback au cas où on_bad_lines n'est pas disponible (versions pandas plus anciennes)
-                    df = pd.read_csv(file_path, 
-                                  sep=';', 
-                                  error_bad_lines=False, 
-                                  warn_bad_lines=True,
-                                  dtype=str,
-                                  encoding='utf-8-sig')
+                df = OrganismeService._read_csv(pd.read_csv, file_path)
                 
                 # Vérifier et ajouter les colonnes requises manquantes
                 required_columns = ['or_code', 'or_nom', 'or_type']
@@ -133,142 +68,350 @@ class OrganismeService:
             }
     
     @staticmethod
-    def _process_dataframe(df):
+    def import_from_archive(archive, memory_budget=None):
         """
-        Traite un DataFrame contenant des données d'organismes
+        Importe les organismes d'une archive ZIP déjà indexée, sans rapport de validation
         
         Args:
-            df (DataFrame): DataFrame avec les données d'organismes
+            archive (ArchiveReader): Archive ouverte
+            memory_budget (int): Mémoire disponible pour le fichier, en octets (None: illimitée)
             
         Returns:
-            dict: Résultat du traitement avec statut et messages
+            dict: Résultat de l'importation avec statut et messages
         """
-        # Validation des données
-        validator = OrganismeValidator()
-        validation_results = validator.validate_dataframe(df)
+        return ReportWriter.discard_section(
+            OrganismeService.load_prepared(OrganismeService.prepare_archive(archive, memory_budget))
+        )
+    
+    @staticmethod
+    def prepare_archive(archive, memory_budget=None, cache_dir=None, validation=None):
+        """
+        Lit, valide et convertit les organismes d'une archive sans accéder à la base
+        
+        Seul le membre t_organisme est lu: le CSV en flux depuis l'archive,
+        à défaut le Shapefile via /vsizip/. Cette étape peut s'exécuter dans
+        un processus séparé. Un CSV qui ne tient pas dans le budget mémoire est
+        validé ici par morceaux, puis relu et chargé par morceaux par load_prepared.
         
-        if not validation_results['valid']:
+        Args:
+            archive (ArchiveReader): Archive ouverte
+            memory_budget (int): Mémoire disponible pour le fichier, en octets (None: illimitée)
+            cache_dir (str): Dossier du cache Parquet des tables analysées (None: pas de cache)
+            validation (dict): Validation reprise d'une livraison identique (ValidationCache),
+                               les organismes n'étant alors pas revalidés
+            
+        Returns:
+            dict: Données préparées pour load_prepared, ou résultat d'échec
+        """
+        try:
+            # Chercher un fichier contenant les données d'organismes
+            csv_member = archive.find('t_organisme', ('.csv',))
+            shp_member = archive.find('t_organisme', ('.shp',))
+            
+            member = csv_member or shp_member
+            if member is None:
+                return {
+                    'success': False,
+                    'message': "Aucun fichier contenant des données d'organismes n'a été trouvé dans l'archive ZIP"
+                }
+            
+            if member == csv_member:
+                chunksize = archive.csv_chunksize(csv_member, memory_budget)
+                if chunksize and validation is not None:
+                    # Fichier déjà validé à l'identique: seulement relu et chargé par morceaux
+                    return {
+                        'success': True,
+                        'stream': {'file_path': archive.file_path, 'member': csv_member, 'chunksize': chunksize},
+                        'validation': validation
+                    }
+                if chunksize:
+                    # Fichier trop volumineux pour le budget mémoire: traitement par morceaux
+                    return OrganismeService._prepare_stream(archive, csv_member, chunksize)
+            
+            # Membre déjà analysé lors d'une livraison précédente: relecture du cache columnar
+            with Trace.span('lecture', 't_organisme') as span:
+                cache = ParquetCache(cache_dir)
+                digest = archive.digest(member) if cache_dir else None
+                df = cache.load('t_organisme', digest)
+                if df is None:
+                    if member == csv_member:
+                        df = OrganismeService._read_csv(archive.read_csv, csv_member)
+                    else:
+                        df = archive.read_vector(shp_member)
+                    cache.store('t_organisme', digest, df)
+                span.rows = len(df)
+            
+            OrganismeService._add_required_columns(df)
+            return OrganismeService._prepare_dataframe(df, validation)
+            
+        except Exception as e:
             return {
                 'success': False,
-                'message': "Validation échouée",
-                'errors': validation_results['errors']
+                'message': f"Erreur lors de l'importation: {str(e)}"
             }
+    
+    @staticmethod
+    def _prepare_stream(archive, member, chunksize):
+        """
+        Valide un CSV d'organismes par morceaux, sans le charger entièrement en mémoire
         
-        # Préparation des données pour l'insertion
-        organismes = []
-        for _, row in df.iterrows():
-            try:
-                organisme = OrganismeService._create_organisme_from_row(row)
-                organismes.append(organisme)
-            except Exception as e:
-                # Ignorer les lignes qui posent problème
-                continue
+        La validation bloquant l'import, le fichier est entièrement validé avant
+        tout chargement; l'unicité de or_code est contrôlée sur tout le fichier
+        grâce à l'index incrémental de la validation.
+        
+        Args:
+            archive (ArchiveReader): Archive ouverte
+            member (str): Nom du membre CSV dans l'archive
+            chunksize (int): Nombre de lignes par morceau
+            
+        Returns:
+            dict: Référence du fichier à charger par morceaux, ou résultat d'échec
+        """
+        validation = OrganismeValidator().validate_chunks()
+        reader = functools.partial(archive.iter_csv, chunksize=chunksize)
+        with Trace.span('validation', 't_organisme') as span, ReportWriter.open_section() as section:
+            for chunk in OrganismeService._read_csv(reader, member):
+                OrganismeService._add_required_columns(chunk)
+                offset = validation.offset
+                section.write_findings('t_organisme', OrganismeService._row_codes(chunk),
+                                       validation.evaluate(chunk), offset)
+            span.rows = validation.offset
+        report = {'report_section': section.file_path}
+        
+        errors = validation.summarize()
+        if errors:
+            return {
+                'success': False,
+                'message': "Validation échouée",
+                'errors': errors,
+                'validation': report
+            }
         
         # Vérifier si des organismes ont été extraits
-        if not organismes:
+        if validation.offset == 0:
+            os.remove(section.file_path)
             return {
                 'success': False,
                 'message': "Aucun organisme valide n'a été extrait du fichier",
                 'errors': ["Format de données non conforme ou données invalides"]
             }
         
-        # Insertion en base de données avec gestion des doublons
-        try:
-            inserted_count = 0
-            updated_count = 0
-            skipped_count = 0
-            errors = []
-            
-            for organisme in organismes:
-                try:
-                    # Vérifier si l'organisme existe déjà
-                    existing = Organisme.query.get(organisme.or_code)
-                    
-                    if existing:
-                        # Mettre à jour l'organisme existant (version simple)
-                        # Alternativement, vous pouvez décider de ne pas mettre à jour et simplement ignorer
-                        for column in Organisme.__table__.columns.keys():
-                            if column != 'or_code':  # Ne pas modifier la clé primaire
-                                setattr(existing, column, getattr(organisme, column))
-                        updated_count += 1
-                    else:
-                        # Insérer le nouvel organisme
-                        db.session.add(organisme)
-                        inserted_count += 1
-                    
-                    # Faire un commit partiel toutes les 50 opérations pour éviter une trop grosse transaction
-                    if (inserted_count + updated_count) % 50 == 0:
-                        db.session.commit()
-                        
-                except IntegrityError as ie:
-                    # Gérer spécifiquement les erreurs d'intégrité
-                    db.session.rollback()
-                    skipped_count += 1
-                    errors.append(f"Erreur d'intégrité pour l'organisme {organisme.or_code}: {str(ie)}")
-                except Exception as e:
-                    # Gérer les autres erreurs
-                    db.session.rollback()
-                    skipped_count += 1
-                    errors.append(f"Erreur pour l'organisme {organisme.or_code}: {str(e)}")
+        return {
+            'success': True,
+            'stream': {'file_path': archive.file_path, 'member': member, 'chunksize': chunksize},
+            'validation': report
+        }
+    
+    @staticmethod
+    def _add_required_columns(df):
+        """
+        Ajoute les colonnes requises manquantes (vides) pour que la validation les signale
+        """
+        required_columns = ['or_code', 'or_nom', 'or_type']
+        for col in required_columns:
+            if col not in df.columns:
+                df[col] = None  # Ajouter une colonne vide pour éviter les erreurs de validation
+    
+    @staticmethod
+    def _row_codes(df):
+        """
+        Retourne le code de chaque ligne (None si absent), dans l'ordre du fichier
+        """
+        if 'or_code' not in df.columns:
+            return [None] * len(df)
+        return df['or_code'].astype(object).where(df['or_code'].notna(), None).tolist()
+    
+    @staticmethod
+    def _read_csv(reader, source):
+        """
+        Lit un CSV d'organismes avec tolérance aux lignes mal formées
+        
+        Args:
+            reader (callable): pandas.read_csv ou ArchiveReader.read_csv
+            source: Chemin du fichier ou nom du membre dans l'archive
             
-            # Commit final
-            db.session.commit()
+        Returns:
+            DataFrame: Contenu du CSV, toutes colonnes en texte
+        """
+        try:
+            return reader(source, 
+                          sep=';',  # Utiliser le point-virgule comme séparateur
+                          on_bad_lines='skip',  # Ignorer les lignes problématiques
+                          dtype=str,  # Tout traiter comme des chaînes
+                          encoding='utf-8-sig')  # Gérer les BOM
+        except TypeError:
+            # Fallback au cas où on_bad_lines n'est pas disponible (versions pandas plus anciennes)
+            return reader(source, 
+                          sep=';', 
+                          error_bad_lines=False, 
+                          warn_bad_lines=True,
+                          dtype=str,
+                          encoding='utf-8-sig')
+    
+    @staticmethod
+    def _process_dataframe(df):
+        """
+        Traite un DataFrame contenant des données d'organismes
+        
+        Args:
+            df (DataFrame): DataFrame avec les données d'organismes
             
-            message = f"{inserted_count} organismes importés, {updated_count} mis à jour"
-            if skipped_count > 0:
-                message += f", {skipped_count} ignorés en raison d'erreurs"
+        Returns:
+            dict: Résultat du traitement avec statut et messages (sans rapport: la section
+                  de validation est supprimée)
+        """
+        return ReportWriter.discard_section(OrganismeService.load_prepared(OrganismeService._prepare_dataframe(df)))
+    
+    @staticmethod
+    def _prepare_dataframe(df, validation=None):
+        """
+        Valide et convertit un DataFrame d'organismes pour le chargement en base
+        
+        Args:
+            df (DataFrame): DataFrame avec les données d'organismes
+            validation (dict): Validation reprise d'une livraison identique (pas de revalidation)
             
-            success = inserted_count + updated_count > 0
+        Returns:
+            dict: Enregistrements projetés, ou résultat d'échec
+        """
+        # Validation des données en une seule passe: messages agrégés pour le statut de la
+        # table et résultats objet par objet écrits en flux dans une section du rapport
+        report = validation
+        if report is None:
+            chunks = OrganismeValidator().validate_chunks()
+            with Trace.span('validation', 't_organisme', len(df)), ReportWriter.open_section() as section:
+                section.write_findings('t_organisme', OrganismeService._row_codes(df), chunks.evaluate(df))
+            report = {'report_section': section.file_path}
             
+            errors = chunks.summarize()
+            if errors:
+                return {
+                    'success': False,
+                    'message': "Validation échouée",
+                    'errors': errors,
+                    'validation': report
+                }
+        
+        # Vérifier si des organismes ont été extraits
+        if df.empty or 'or_code' not in df.columns:
+            os.remove(report['report_section'])
             return {
-                'success': success,
-                'message': message,
-                'count': inserted_count + updated_count,
-                'inserted': inserted_count,
-                'updated': updated_count,
-                'skipped': skipped_count,
-                'errors': errors[:10]  # Limiter le nombre d'erreurs retournées pour éviter un message trop long
+                'success': False,
+                'message': "Aucun organisme valide n'a été extrait du fichier",
+                'errors': ["Format de données non conforme ou données invalides"]
             }
+        
+        with Trace.span('conversion', 't_organisme', len(df)):
+            records = ColumnMapping(Organisme.__table__).project(df)
+        return {
+            'success': True,
+            'records': records,
+            'validation': report
+        }
+    
+    @staticmethod
+    def load_prepared(prepared):
+        """
+        Charge en base des organismes préparés par prepare_archive
+        
+        Args:
+            prepared (dict): Résultat de prepare_archive ou _prepare_dataframe
+            
+        Returns:
+            dict: Résultat de l'importation avec statut et messages
+        """
+        # Échec de lecture ou de préparation: le résultat est transmis tel quel
+        if 'records' not in prepared and 'stream' not in prepared:
+            return prepared
+        
+        if 'stream' in prepared:
+            # Fichier volumineux: chargement morceau par morceau (déjà validé)
+            with Trace.span('flux', 't_organisme') as span:
+                result = OrganismeService._load_stream(**prepared['stream'])
+                span.rows = result.get('count')
+        else:
+            # Chargement par COPY dans une table de transit puis fusion en une seule instruction
+            try:
+                with Trace.span('insertion', 't_organisme', len(prepared['records'])):
+                    outcome = BulkService.copy_upsert(Organisme.__table__, prepared['records'], 'or_code', "l'organisme")
+                result = OrganismeService._import_result(outcome)
+            except Exception as e:
+                db.session.rollback()
+                result = {
+                    'success': False,
+                    'message': f"Erreur lors de l'insertion en base: {str(e)}"
+                }
+        
+        # Section du rapport produite par la validation
+        result['validation'] = prepared['validation']
+        return result
+    
+    @staticmethod
+    def _load_stream(file_path, member, chunksize):
+        """
+        Charge un CSV d'organismes validé par morceaux de chunksize lignes
+        
+        Args:
+            file_path (str): Chemin de l'archive ZIP
+            member (str): Nom du membre CSV dans l'archive
+            chunksize (int): Nombre de lignes par morceau
+            
+        Returns:
+            dict: Résultat de l'importation avec statut et messages
+        """
+        mapping = ColumnMapping(Organisme.__table__)
+        outcome = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+        
+        try:
+            with ArchiveReader(file_path) as archive:
+                reader = functools.partial(archive.iter_csv, chunksize=chunksize)
+                for chunk in OrganismeService._read_csv(reader, member):
+                    chunk_outcome = BulkService.copy_upsert(
+                        Organisme.__table__, mapping.project(chunk), 'or_code', "l'organisme"
+                    )
+                    for counter in ('inserted', 'updated', 'skipped'):
+                        outcome[counter] += chunk_outcome[counter]
+                    outcome['errors'].extend(chunk_outcome['errors'][:10 - len(outcome['errors'])])
         except Exception as e:
             db.session.rollback()
             return {
                 'success': False,
                 'message': f"Erreur lors de l'insertion en base: {str(e)}"
             }
+        
+        return OrganismeService._import_result(outcome)
     
     @staticmethod
-    def _create_organisme_from_row(row):
+    def _import_result(outcome):
         """
-        Crée un objet Organisme à partir d'une ligne de DataFrame
+        Construit le résultat d'importation à partir des compteurs du chargement
         
         Args:
-            row: Ligne de DataFrame avec les données d'organisme
+            outcome (dict): Compteurs inserted, updated, skipped et erreurs du chargement
             
         Returns:
-            Organisme: Instance du modèle Organisme
+            dict: Résultat de l'importation avec statut et messages
         """
-        organisme = Organisme()
+        inserted_count = outcome['inserted']
+        updated_count = outcome['updated']
+        skipped_count = outcome['skipped']
+        errors = outcome['errors']
         
-        # Mapper les colonnes du DataFrame vers les attributs du modèle
-        for column in Organisme.__table__.columns.keys():
-            # Vérifier si la colonne existe dans le DataFrame
-            if hasattr(row, column) or column in row:
-                try:
-                    # Utilisation plus sûre avec une gestion des erreurs
-                    if hasattr(row, column):
-                        value = getattr(row, column)
-                    else:
-                        value = row[column]
-                    
-                    if pd.isna(value):  # Vérifier si la valeur est NaN
-                        value = None
-                        
-                    setattr(organisme, column, value)
-                except:
-                    # En cas d'erreur, définir la valeur à None
-                    setattr(organisme, column, None)
+        message = f"{inserted_count} organismes importés, {updated_count} mis à jour"
+        if skipped_count > 0:
+            message += f", {skipped_count} ignorés en raison d'erreurs"
         
-        return organisme
+        success = inserted_count + updated_count > 0
+        
+        return {
+            'success': success,
+            'message': message,
+            'count': inserted_count + updated_count,
+            'inserted': inserted_count,
+            'updated': updated_count,
+            'skipped': skipped_count,
+            'errors': errors[:10]  # Limiter le nombre d'erreurs retournées pour éviter un message trop long
+        }
 
     @staticmethod
     def get_all_organismes(page=1, per_page=10):
@@ -284,6 +427,24 @@ class OrganismeService:
         """
         return Organisme.query.paginate(page=page, per_page=per_page, error_out=False)
     
+    @staticmethod
+    def validate_organismes(codes):
+        """
+        Valide un lot d'organismes relus en une seule requête, en une passe vectorisée
+        
+        Args:
+            codes (list): Codes des organismes à valider
+            
+        Returns:
+            dict: Résultat par code trouvé en base, au même format que validate_organisme
+        """
+        table = Organisme.__table__
+        validator = OrganismeValidator()
+        columns = [table.c[name] for name in validator.plan.fields() if name in table.c]
+        query = db.session.query(*columns).filter(table.c.or_code.in_(codes))
+        df = pd.DataFrame.from_records(query.all(), columns=[column.name for column in columns])
+        return validator.validate_records(df)
+    
     @staticmethod
     def get_organisme_by_code(or_code):
         """
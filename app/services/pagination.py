@@ -0,0 +1,136 @@
+import json
+import base64
+import binascii
+from sqlalchemy import text
+from app import db
+
+class KeysetPage:
+    """
+    Page de résultats paginée par clé (keyset)
+
+    Les curseurs sont des jetons opaques à repasser tels quels pour obtenir la
+    page suivante ou précédente (None s'il n'y en a pas).
+    """
+
+    def __init__(self, items, per_page, next_cursor, prev_cursor, total, total_estimated):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+        self.total = total
+        self.total_estimated = total_estimated
+
+
+class KeysetPagination:
+    """
+    Pagination par clé: chaque page reprend après la dernière clé de la précédente
+    (WHERE cle > :derniere ORDER BY cle LIMIT n) au lieu d'un OFFSET, pour un coût
+    constant quelle que soit la profondeur de la page, via l'index de la clé primaire.
+    """
+
+    @staticmethod
+    def paginate(query, key_column, cursor=None, per_page=10, exact_count=False):
+        """
+        Retourne une page d'une requête, ordonnée par une colonne clé unique
+
+        Args:
+            query (Query): Requête à paginer (colonnes projetées ou entités)
+            key_column (Column): Colonne unique servant de clé de pagination
+            cursor (str): Curseur renvoyé par une page précédente (None: première page)
+            per_page (int): Nombre d'éléments par page
+            exact_count (bool): Compter exactement les lignes plutôt qu'utiliser l'estimation du planificateur
+
+        Returns:
+            KeysetPage: Page de résultats
+
+        Raises:
+            ValueError: Si le curseur est invalide
+        """
+        per_page = max(per_page, 1)
+        key, direction = KeysetPagination.decode_cursor(cursor) if cursor else (None, 'next')
+
+        # Une ligne de plus que la page pour savoir s'il en reste au-delà
+        if direction == 'next':
+            page_query = query.order_by(key_column.asc())
+            if key is not None:
+                page_query = page_query.filter(key_column > key)
+        else:
+            page_query = query.order_by(key_column.desc()).filter(key_column < key)
+        rows = page_query.limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == 'prev':
+            rows.reverse()
+
+        key_name = key_column.key
+        first_key = getattr(rows[0], key_name) if rows else None
+        last_key = getattr(rows[-1], key_name) if rows else None
+        if direction == 'next':
+            has_next, has_prev = more, key is not None
+        else:
+            has_next, has_prev = True, more
+
+        if exact_count:
+            total, total_estimated = query.order_by(None).count(), False
+        else:
+            total, total_estimated = KeysetPagination.estimated_count(key_column.table), True
+            if total is None:
+                total, total_estimated = query.order_by(None).count(), False
+
+        return KeysetPage(
+            rows, per_page,
+            KeysetPagination.encode_cursor(last_key, 'next') if has_next and rows else None,
+            KeysetPagination.encode_cursor(first_key, 'prev') if has_prev and rows else None,
+            total, total_estimated
+        )
+
+    @staticmethod
+    def estimated_count(table):
+        """
+        Estime le nombre de lignes d'une table à partir des statistiques du planificateur (pg_class.reltuples)
+
+        Args:
+            table (Table): Table SQLAlchemy
+
+        Returns:
+            int: Nombre de lignes estimé, ou None si la table n'a jamais été analysée
+        """
+        name = db.engine.dialect.identifier_preparer.format_table(table)
+        reltuples = db.session.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)"), {'name': name}
+        ).scalar()
+        # -1 (PostgreSQL 14+) ou 0: statistiques absentes, pas d'estimation fiable
+        if reltuples is None or reltuples <= 0:
+            return None
+        return int(reltuples)
+
+    @staticmethod
+    def encode_cursor(key, direction):
+        """
+        Encode une clé et un sens de parcours en jeton opaque (base64 URL)
+        """
+        payload = json.dumps({'k': key, 'd': direction}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Décode un jeton produit par encode_cursor
+
+        Returns:
+            tuple: (clé, sens 'next' ou 'prev')
+
+        Raises:
+            ValueError: Si le jeton est invalide
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            key, direction = payload['k'], payload['d']
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+            raise ValueError(f"Curseur de pagination invalide: {cursor}")
+        if key is None or direction not in ('next', 'prev'):
+            raise ValueError(f"Curseur de pagination invalide: {cursor}")
+        return key, direction
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import pandas as pd
+import geopandas as gpd
+import pyarrow
+import pyarrow.parquet as pq
+
+class ParquetCache:
+    """
+    Cache des tables analysées au format columnar (Parquet / GeoParquet)
+
+    Chaque table lue dans une livraison est conservée sous le nom
+    {table}_{empreinte}.parquet, l'empreinte étant le hachage du contenu du membre
+    source dans l'archive. Une livraison identique (même fichier renvoyé pour une
+    nouvelle validation) est relue depuis ce fichier par projection mémoire, sans
+    repasser par l'analyse CSV ou GDAL.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        Args:
+            cache_dir (str): Dossier du cache (None: cache désactivé)
+        """
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, table_name, digest):
+        """
+        Retourne le chemin du fichier Parquet d'une table analysée
+        """
+        return os.path.join(self.cache_dir, f"{table_name}_{digest}.parquet")
+
+    def load(self, table_name, digest):
+        """
+        Relit une table analysée depuis le cache
+
+        Args:
+            table_name (str): Nom de la table (ex: t_adresse)
+            digest (str): Empreinte du membre source
+
+        Returns:
+            DataFrame: Table analysée (GeoDataFrame si elle a une géométrie), ou None si absente du cache
+        """
+        if not self.cache_dir:
+            return None
+        path = self.path(table_name, digest)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            # Fichier utilisé: il devient le plus récent pour l'éviction (ValidationCache.evict)
+            os.utime(path)
+            metadata = pq.read_schema(path, memory_map=True).metadata or {}
+            if b'geo' in metadata:
+                return gpd.read_parquet(path, memory_map=True)
+            return pd.read_parquet(path, engine='pyarrow', memory_map=True)
+        except (OSError, ValueError, pyarrow.ArrowException):
+            # Fichier tronqué, illisible ou évincé entre-temps: régénéré à partir de l'archive
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+
+    def store(self, table_name, digest, df):
+        """
+        Enregistre une table analysée dans le cache
+
+        L'écriture passe par un fichier temporaire renommé à la fin pour qu'un autre
+        processus ne lise jamais un fichier partiel. Une table que Parquet ne sait pas
+        représenter (types mixtes, GeoDataFrame sans géométrie) n'est simplement pas
+        mise en cache.
+
+        Args:
+            table_name (str): Nom de la table (ex: t_adresse)
+            digest (str): Empreinte du membre source
+            df (DataFrame): Table analysée
+        """
+        if not self.cache_dir:
+            return
+        descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(descriptor)
+        try:
+            df.to_parquet(temp_path, index=False)
+            os.replace(temp_path, self.path(table_name, digest))
+        except (ValueError, TypeError, AttributeError, pyarrow.ArrowException):
+            os.remove(temp_path)
@@ -0,0 +1,211 @@
+import os
+import csv
+import gzip
+import shutil
+import tempfile
+
+class ReportWriter:
+    """
+    Écriture en flux du rapport de validation (CSV, éventuellement compressé en gzip)
+
+    Les lignes sont écrites au fil de l'eau, sans être accumulées en mémoire, et le
+    fichier est vidé sur disque toutes les flush_interval lignes. La validation de
+    chaque table écrit ses résultats objet par objet dans une section temporaire
+    (voir open_section), recopiée ensuite dans le rapport final.
+    """
+
+    FIELDNAMES = ['table', 'code_objet', 'controle', 'statut', 'message']
+
+    # Contrôle de la ligne de statut de chaque objet
+    OBJECT_CONTROL = 'Validation complète'
+
+    def __init__(self, file_path, compress=False, flush_interval=10000, header=True):
+        """
+        Args:
+            file_path (str): Chemin du fichier à écrire
+            compress (bool): Compresser le fichier en gzip
+            flush_interval (int): Nombre de lignes écrites entre deux vidages sur disque
+            header (bool): Écrire la ligne d'en-tête
+        """
+        self.file_path = file_path
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        if compress:
+            self.stream = gzip.open(file_path, 'wt', newline='', encoding='utf-8')
+        else:
+            self.stream = open(file_path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.stream, fieldnames=self.FIELDNAMES, delimiter=';')
+        if header:
+            self.writer.writeheader()
+
+    @staticmethod
+    def open_section():
+        """
+        Ouvre une section temporaire (sans en-tête) pour les résultats objet par objet d'une table
+
+        Returns:
+            ReportWriter: Writer de la section; son chemin est à transmettre à append_section
+        """
+        descriptor, path = tempfile.mkstemp(prefix='rapport_', suffix='.csv')
+        os.close(descriptor)
+        return ReportWriter(path, header=False)
+
+    @staticmethod
+    def discard_section(result):
+        """
+        Supprime la section temporaire d'un résultat d'import sans rapport
+
+        Les imports d'un fichier isolé (import_from_file des services) ne produisent pas de
+        rapport: leur section, qui ne sera recopiée par aucun append_section, est supprimée.
+
+        Args:
+            result (dict): Résultat de l'import d'une table (validation.report_section)
+
+        Returns:
+            dict: Le résultat, sans sa clé validation
+        """
+        section_path = (result.pop('validation', None) or {}).get('report_section')
+        if section_path and os.path.exists(section_path):
+            os.remove(section_path)
+        return result
+
+    @staticmethod
+    def check_result(findings, message, errors):
+        """
+        Écrit les anomalies d'un contrôle de la livraison dans une section et construit son résultat
+
+        Args:
+            findings (iterable): Anomalies, tuples (table, code_objet, controle, message), écrites en NOK
+            message (str): Message du statut global du contrôle
+            errors (list): Anomalies résumées pour le statut (dictionnaires controle/message)
+
+        Returns:
+            dict: Résultat du contrôle (success, message, count, errors, validation)
+        """
+        with ReportWriter.open_section() as section:
+            for table, code, controle, detail in findings:
+                section.write_row({
+                    'table': table,
+                    'code_objet': code,
+                    'controle': controle,
+                    'statut': 'NOK',
+                    'message': detail
+                })
+        return {
+            'success': section.rows_written == 0,
+            'message': message,
+            'count': section.rows_written,
+            'errors': errors[:10],
+            'validation': {'report_section': section.file_path}
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Ferme le fichier
+        """
+        self.stream.close()
+
+    def write_row(self, row):
+        """
+        Écrit une ligne du rapport et vide le tampon à intervalle régulier
+
+        Args:
+            row (dict): Ligne avec les colonnes table, code_objet, controle, statut, message
+        """
+        self.writer.writerow(row)
+        self.rows_written += 1
+        if self.rows_written % self.flush_interval == 0:
+            self.stream.flush()
+
+    def write_status(self, table_name, table_result):
+        """
+        Écrit le statut global d'une table et ses erreurs d'importation
+
+        Args:
+            table_name (str): Nom de la table
+            table_result (dict): Résultat de l'importation de la table
+        """
+        self.write_row({
+            'table': table_name,
+            'code_objet': 'GLOBAL',
+            'controle': 'Validation globale',
+            'statut': 'OK' if table_result.get('success') else 'NOK',
+            'message': table_result.get('message')
+        })
+
+        # Erreurs détaillées (messages texte ou dictionnaires code/controle/message)
+        for error in table_result.get('errors', []):
+            if not isinstance(error, dict):
+                error = {'controle': 'Importation', 'message': str(error)}
+            self.write_row({
+                'table': table_name,
+                'code_objet': error.get('code', 'N/A'),
+                'controle': error.get('controle', 'N/A'),
+                'statut': 'NOK',
+                'message': error.get('message', '')
+            })
+
+    def write_object(self, table_name, code, details):
+        """
+        Écrit le résultat de validation d'un objet puis le détail de ses anomalies
+
+        Args:
+            table_name (str): Nom de la table
+            code (str): Code de l'objet (None si absent)
+            details (list): Anomalies de l'objet, tuples (controle, message)
+        """
+        code_objet = code if code is not None else 'N/A'
+        self.write_row({
+            'table': table_name,
+            'code_objet': code_objet,
+            'controle': self.OBJECT_CONTROL,
+            'statut': 'NOK' if details else 'OK',
+            'message': 'Des contrôles ont échoué' if details else 'Tous les contrôles sont valides'
+        })
+        for controle, message in details:
+            self.write_row({
+                'table': table_name,
+                'code_objet': code_objet,
+                'controle': controle,
+                'statut': 'NOK',
+                'message': message
+            })
+
+    def write_findings(self, table_name, codes, findings, offset=0):
+        """
+        Écrit les résultats d'un lot de lignes validées par RulePlan.evaluate_frame
+
+        Args:
+            table_name (str): Nom de la table
+            codes (list): Codes des objets du lot, dans l'ordre du fichier
+            findings (DataFrame): Anomalies au format long, triées par position
+            offset (int): Position de la première ligne du lot dans le fichier
+        """
+        rows = findings[['index', 'controle', 'message']].itertuples(index=False, name=None)
+        current = next(rows, None)
+
+        for position, code in enumerate(codes, start=offset):
+            # Anomalies de cette ligne (les anomalies sont triées par position)
+            details = []
+            while current is not None and current[0] == position:
+                details.append(current[1:])
+                current = next(rows, None)
+            self.write_object(table_name, code, details)
+
+    def append_section(self, section_path):
+        """
+        Recopie en flux une section temporaire dans le rapport puis la supprime
+
+        Args:
+            section_path (str): Chemin de la section produite par open_section
+        """
+        self.stream.flush()
+        with open(section_path, 'r', newline='', encoding='utf-8') as section:
+            shutil.copyfileobj(section, self.stream, 1 << 20)
+        os.remove(section_path)
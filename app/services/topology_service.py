@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+import shapely
+from app.services.archive_reader import ArchiveReader
+from app.services.report_writer import ReportWriter
+from app.validators.rules import METRIC_CRS
+from app.validators.topology import NetworkGraph
+
+class TopologyService:
+    """
+    Contrôle de la topologie du réseau optique d'une livraison GRACE THD
+    
+    Le graphe a pour sommets les nœuds (t_noeud) et pour arêtes les câbles (t_cable,
+    cb_nd1 - cb_nd2). Sont contrôlés: la cohérence entre les extrémités déclarées d'un
+    câble et celles de sa géométrie (t_cableline), les nœuds reliés à aucun câble ni
+    cheminement, les câbles formant des cycles et la continuité NRO -> SRO -> PBO.
+    """
+    
+    # Nom sous lequel le contrôle figure dans les résultats de l'import et le rapport
+    TABLE = 'topologie'
+    
+    # Distance maximale (mètres, Lambert 93) entre l'extrémité d'une géométrie de câble et son nœud
+    SNAP_DISTANCE = 1.0
+    
+    @staticmethod
+    def check_archive(file_path):
+        """
+        Contrôle la topologie du réseau décrit par une archive
+        
+        Exécuté dans un processus du pool de préparation de l'import.
+        
+        Args:
+            file_path (str): Chemin de l'archive ZIP
+        
+        Returns:
+            dict: Résultat du contrôle (success, message, count, errors, validation),
+                  ou None si la livraison ne contient pas de câbles et de nœuds (avec leurs codes)
+        """
+        with ArchiveReader(file_path) as archive:
+            cables_member = archive.find('t_cable', ('.csv', '.dbf'))
+            nodes_member = archive.find('t_noeud', ('.shp', '.geojson'))
+            if cables_member is None or nodes_member is None:
+                return None
+            
+            cables = archive.read_columns(cables_member, ['cb_code', 'cb_nd1', 'cb_nd2'])
+            nodes = TopologyService._read_geometries(archive, nodes_member, ['nd_code'])
+            lines = TopologyService._read_table(archive, 't_cableline', ['cl_cb_code'], geometry=True)
+            paths = TopologyService._read_table(archive, 't_cheminement', ['cm_ndcode1', 'cm_ndcode2'])
+            nro = TopologyService._read_table(archive, 't_znro', ['zn_code', 'zn_nd_code'])
+            sro = TopologyService._read_table(archive, 't_zsro', ['zs_code', 'zs_nd_code', 'zs_zn_code'])
+            ebp = TopologyService._read_table(archive, 't_ebp', ['bp_code', 'bp_pt_code', 'bp_typelog'])
+            ptech = TopologyService._read_table(archive, 't_ptech', ['pt_code', 'pt_nd_code'])
+        
+        if not {'cb_code', 'cb_nd1', 'cb_nd2'} <= set(cables.columns) or 'nd_code' not in nodes.columns:
+            return None
+        
+        graph, codes, kept = NetworkGraph.from_codes(nodes['nd_code'], cables['cb_nd1'], cables['cb_nd2'])
+        cable_codes = cables['cb_code'].fillna('N/A').to_numpy(dtype=object)
+        findings = []
+        
+        # Extrémités des géométries rattachées au nœud le plus proche (index STRtree)
+        if lines is not None and 'cl_cb_code' in lines.columns:
+            findings.append(TopologyService._check_endpoints(cables, nodes, lines))
+        
+        # Nœuds reliés à aucun câble ni cheminement
+        linked = pd.concat([cables['cb_nd1'], cables['cb_nd2']] + (
+            [paths[column] for column in ('cm_ndcode1', 'cm_ndcode2') if column in paths.columns]
+            if paths is not None else []
+        ))
+        orphans = nodes['nd_code'].notna() & ~nodes['nd_code'].isin(linked.dropna().unique())
+        findings.append(pd.DataFrame({
+            'table': 't_noeud',
+            'code': nodes.loc[orphans, 'nd_code'],
+            'controle': 'nd_orphelin',
+            'message': "Nœud relié à aucun câble ni cheminement"
+        }))
+        
+        # Câbles formant un cycle (le réseau de distribution doit être arborescent)
+        labels = graph.components()
+        in_cycle = graph.cycle_edges()
+        cycle_cables = np.flatnonzero(kept)[in_cycle]
+        findings.append(pd.DataFrame({
+            'table': 't_cable',
+            'code': cable_codes[cycle_cables],
+            'controle': 'cb_cycle',
+            'message': "Câble appartenant à un cycle du réseau"
+        }))
+        
+        # Continuité NRO -> SRO -> PBO: même composante connexe du graphe des câbles
+        def component(node_codes):
+            positions = codes.get_indexer(node_codes.to_numpy(dtype=object))
+            return np.where(positions >= 0, labels[np.maximum(positions, 0)], -1)
+        
+        if sro is not None and {'zs_code', 'zs_nd_code', 'zs_zn_code'} <= set(sro.columns) \
+                and nro is not None and {'zn_code', 'zn_nd_code'} <= set(nro.columns):
+            zones = sro.merge(nro, left_on='zs_zn_code', right_on='zn_code', how='inner')
+            zones = zones[zones['zs_nd_code'].notna() & zones['zn_nd_code'].notna()]
+            sro_component = component(zones['zs_nd_code'])
+            cut = (sro_component == -1) | (sro_component != component(zones['zn_nd_code']))
+            findings.append(pd.DataFrame({
+                'table': 't_zsro',
+                'code': zones.loc[cut, 'zs_code'].fillna('N/A'),
+                'controle': 'zs_continuite',
+                'message': "SRO " + zones.loc[cut, 'zs_nd_code'] + " non relié par câble au NRO " + zones.loc[cut, 'zn_nd_code']
+            }))
+        
+        if sro is not None and 'zs_nd_code' in sro.columns and ebp is not None and ptech is not None \
+                and {'bp_code', 'bp_pt_code', 'bp_typelog'} <= set(ebp.columns) and {'pt_code', 'pt_nd_code'} <= set(ptech.columns):
+            pbo = ebp[ebp['bp_typelog'] == 'PBO'].merge(ptech, left_on='bp_pt_code', right_on='pt_code', how='inner')
+            pbo = pbo[pbo['pt_nd_code'].notna()]
+            sro_components = component(sro['zs_nd_code'].dropna())
+            pbo_component = component(pbo['pt_nd_code'])
+            cut = (pbo_component == -1) | ~np.isin(pbo_component, sro_components[sro_components >= 0])
+            findings.append(pd.DataFrame({
+                'table': 't_ebp',
+                'code': pbo.loc[cut, 'bp_code'].fillna('N/A'),
+                'controle': 'bp_continuite',
+                'message': "PBO non relié par câble à un SRO (nœud " + pbo.loc[cut, 'pt_nd_code'] + ")"
+            }))
+        
+        findings = pd.concat(findings, ignore_index=True)
+        counts = findings.groupby(['table', 'controle']).size()
+        count = len(findings)
+        summary = f"{graph.node_count} nœuds, {len(graph.sources)} câbles, {int(len(np.unique(labels)))} composantes"
+        return ReportWriter.check_result(
+            findings.itertuples(index=False, name=None),
+            f"{count} anomalies de topologie ({summary})" if count else f"Topologie valide ({summary})",
+            [
+                {'controle': controle, 'message': f"{table}: {number} anomalies {controle}"}
+                for (table, controle), number in counts.items()
+            ]
+        )
+    
+    @staticmethod
+    def _check_endpoints(cables, nodes, lines):
+        """
+        Compare les nœuds déclarés d'un câble aux nœuds situés aux extrémités de sa géométrie
+        
+        Returns:
+            DataFrame: Anomalies (table, code, controle, message)
+        """
+        # Une géométrie par câble: les câbles découpés en plusieurs tronçons sont ignorés
+        lines = lines[lines['cl_cb_code'].notna() & ~lines['cl_cb_code'].duplicated(keep=False)]
+        matched = cables[['cb_code', 'cb_nd1', 'cb_nd2']].merge(
+            lines, left_on='cb_code', right_on='cl_cb_code', how='inner'
+        )
+        geometries = np.asarray(matched.geometry.values, dtype=object)
+        present = ~shapely.is_missing(geometries)
+        matched, geometries = matched[present], geometries[present]
+        
+        tree = shapely.STRtree(np.asarray(nodes.geometry.values, dtype=object))
+        node_codes = nodes['nd_code'].to_numpy(dtype=object)
+        snapped = []
+        for index in (0, -1):
+            endpoints = shapely.get_point(shapely.line_merge(geometries), index)
+            found, nearest = tree.query_nearest(endpoints, max_distance=TopologyService.SNAP_DISTANCE, all_matches=False)
+            codes = np.full(len(endpoints), None, dtype=object)
+            codes[found] = node_codes[nearest]
+            snapped.append(pd.Series(codes, index=matched.index))
+        start, end = snapped
+        
+        declared_1, declared_2 = matched['cb_nd1'], matched['cb_nd2']
+        consistent = ((start == declared_1) & (end == declared_2)) | ((start == declared_2) & (end == declared_1))
+        wrong = matched[~consistent]
+        label = f"aucun nœud à moins de {TopologyService.SNAP_DISTANCE:g} m"
+        return pd.DataFrame({
+            'table': 't_cable',
+            'code': wrong['cb_code'],
+            'controle': 'cb_extremites',
+            'message': ("Extrémités de la géométrie (" + start[~consistent].fillna(label) + ", "
+                        + end[~consistent].fillna(label) + ") différentes de cb_nd1, cb_nd2 ("
+                        + wrong['cb_nd1'].fillna('vide') + ", " + wrong['cb_nd2'].fillna('vide') + ")")
+        })
+    
+    @staticmethod
+    def _read_table(archive, table, columns, geometry=False):
+        """
+        Lit les colonnes d'une table de la livraison, avec sa géométrie si demandé
+        
+        Returns:
+            DataFrame: Colonnes de la table, ou None si la table est absente
+        """
+        if geometry:
+            member = archive.find(table, ('.shp', '.geojson'))
+            return TopologyService._read_geometries(archive, member, columns) if member else None
+        member = archive.find(table, ('.csv', '.dbf', '.geojson', '.shp'))
+        return archive.read_columns(member, columns) if member else None
+    
+    @staticmethod
+    def _read_geometries(archive, member, columns):
+        """
+        Lit une couche vectorielle en Lambert 93, limitée à quelques colonnes en texte
+        """
+        gdf = archive.read_vector(member)
+        # Données GRACE THD sans projection déclarée: Lambert 93
+        gdf = gdf.set_crs(METRIC_CRS) if gdf.crs is None else gdf.to_crs(METRIC_CRS)
+        attributes = [column for column in columns if column in gdf.columns]
+        result = gdf[attributes + [gdf.geometry.name]].copy()
+        for column in attributes:
+            values = result[column].astype(str).where(result[column].notna())
+            result[column] = values.where(values.str.strip() != '')
+        return result
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from app.services.report_writer import ReportWriter
+from app.validators.rules import RULESET_VERSION
+
+class ValidationCache:
+    """
+    Cache adressé par contenu des résultats de validation et de chargement d'une table
+
+    La clé combine l'empreinte des fichiers de la table dans l'archive et la version
+    du jeu de règles: une table renvoyée à l'identique, sans changement de règles,
+    reprend la section de rapport de la livraison précédente sans être revalidée.
+
+    La clé ignore l'état de la base: seul un rejet est repris tel quel, une table
+    chargée étant rechargée (voir ImportService).
+
+    Chaque entrée est un fichier JSON (résultat) et un fichier CSV (section du
+    rapport); l'éviction supprime les entrées les moins récemment utilisées au-delà
+    de la taille maximale du dossier.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        Args:
+            cache_dir (str): Dossier du cache (None: cache désactivé)
+        """
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(table_name, digest):
+        """
+        Calcule la clé d'une table à partir de l'empreinte de ses fichiers et de la version des règles
+
+        Args:
+            table_name (str): Nom de la table
+            digest (str): Empreinte des fichiers de la table (ArchiveReader.table_digest)
+
+        Returns:
+            str: Clé hexadécimale
+        """
+        return hashlib.sha256(f"{table_name}:{digest}:{RULESET_VERSION}".encode('utf-8')).hexdigest()
+
+    def get(self, table_name, key):
+        """
+        Recherche le résultat d'une table déjà traitée
+
+        La section de rapport est copiée dans un fichier temporaire, consommé ensuite
+        par la génération du rapport comme une section produite par la validation.
+
+        Args:
+            table_name (str): Nom de la table
+            key (str): Clé calculée par key()
+
+        Returns:
+            dict: Résultat de la table (avec sa section de rapport) ou None si absent du cache
+        """
+        if not self.cache_dir:
+            return None
+        result_path, section_path = self._paths(table_name, key)
+        try:
+            with open(result_path, 'r', encoding='utf-8') as result_file:
+                entry = json.load(result_file)
+            section = ReportWriter.open_section()
+            section.close()
+            shutil.copyfile(section_path, section.file_path)
+        except (OSError, ValueError):
+            # Entrée absente, évincée entre-temps ou illisible
+            return None
+
+        # Entrée utilisée: elle devient la plus récente pour l'éviction
+        now = time.time()
+        for path in (result_path, section_path):
+            os.utime(path, (now, now))
+
+        cached_at = time.strftime('%d/%m/%Y %H:%M', time.localtime(entry['cached_at']))
+        return {
+            'success': entry['success'],
+            'message': f"Table inchangée depuis la livraison du {cached_at}: {entry['message']}",
+            'errors': entry['errors'],
+            'count': 0,
+            'cached': True,
+            'validation': {'report_section': section.file_path}
+        }
+
+    def put(self, table_name, key, result):
+        """
+        Enregistre le résultat d'une table et une copie de sa section de rapport
+
+        Args:
+            table_name (str): Nom de la table
+            key (str): Clé calculée par key()
+            result (dict): Résultat de l'importation de la table (avec 'validation')
+        """
+        if not self.cache_dir or 'report_section' not in result.get('validation', {}):
+            return
+        result_path, section_path = self._paths(table_name, key)
+        entry = {
+            'success': result['success'],
+            'message': result['message'],
+            'errors': [str(error) for error in result.get('errors', [])],
+            'cached_at': time.time()
+        }
+
+        # Écriture dans des fichiers temporaires renommés ensuite: une lecture concurrente
+        # ne voit jamais d'entrée partielle (la section est renommée avant le résultat)
+        descriptor, temp_section = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(descriptor)
+        shutil.copyfile(result['validation']['report_section'], temp_section)
+        os.replace(temp_section, section_path)
+
+        descriptor, temp_result = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as result_file:
+            json.dump(entry, result_file)
+        os.replace(temp_result, result_path)
+
+    def _paths(self, table_name, key):
+        """
+        Retourne les chemins du résultat (JSON) et de la section de rapport (CSV) d'une entrée
+        """
+        base = os.path.join(self.cache_dir, f"{table_name}_{key}")
+        return f"{base}.json", f"{base}.csv"
+
+    @staticmethod
+    def evict(cache_dir, max_size):
+        """
+        Supprime les fichiers les moins récemment utilisés d'un dossier de cache au-delà d'une taille maximale
+
+        Sert au cache des résultats de validation comme au cache Parquet des tables
+        analysées (la date de modification est mise à jour à chaque utilisation).
+
+        Args:
+            cache_dir (str): Dossier du cache
+            max_size (int): Taille maximale du dossier, en octets
+        """
+        if not cache_dir or not os.path.isdir(cache_dir):
+            return
+        files = []
+        for entry in os.scandir(cache_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,283 @@
+from psycopg2.extras import execute_values
+from sqlalchemy import text, bindparam
+from app import db
+from app.lazy import LazyImport
+from app.models.adresse import Adresse
+from app.models.adresse_empreinte import AdresseEmpreinte
+from app.models.organisme import Organisme
+from app.models.validation_result import ValidationResult
+from app.services.adresse_service import AdresseService
+from app.services.organisme_service import OrganismeService
+from app.services.report_writer import ReportWriter
+
+# Règles de validation (numpy, pandas, shapely): chargées à la première écriture de résultats
+rules = LazyImport('app.validators.rules')
+
+class ValidationResultService:
+    """
+    Résultats de validation persistés dans gracethd_commun.validation_result
+
+    La table contient les mêmes lignes que le rapport: une ligne de statut par objet
+    (contrôle ReportWriter.OBJECT_CONTROL) puis une ligne par contrôle en échec. Elle
+    est alimentée en masse par l'import (sections du rapport) et par la revalidation
+    incrémentale, qui ne revalide que les objets modifiés depuis leur dernière
+    validation, ou tous les objets lorsque le jeu de règles a changé.
+    """
+
+    # Tables validées: modèle, clé, date de mise à jour, empreintes et validation par lot
+    TABLES = {
+        't_adresse': {
+            'model': Adresse, 'key': 'ad_code', 'majdate': 'ad_majdate',
+            'fingerprints': AdresseEmpreinte, 'validate': AdresseService.validate_adresses
+        },
+        't_organisme': {
+            'model': Organisme, 'key': 'or_code', 'majdate': 'or_majdate',
+            'fingerprints': None, 'validate': OrganismeService.validate_organismes
+        },
+    }
+
+    # Vue matérialisée de synthèse (migration 2c6d8e0f4a17) et ses colonnes de regroupement
+    SUMMARY_VIEW = 'gracethd_commun.validation_summary'
+    SUMMARY_GROUPS = {
+        'table': 'table_name', 'controle': 'controle', 'statut': 'statut',
+        'ad_insee': 'ad_insee', 'ad_commune': 'ad_commune'
+    }
+
+    @staticmethod
+    def store_section(section_path):
+        """
+        Enregistre les résultats d'une section du rapport produite par la validation d'un import
+
+        La section est chargée par COPY; les résultats précédents des objets qu'elle
+        contient sont remplacés.
+
+        Args:
+            section_path (str): Chemin de la section (ReportWriter.open_section)
+        """
+        connection = db.session.connection().connection
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE staging_validation_result (ligne bigserial, table_name text, code_objet text, "
+                "controle text, statut text, message text) ON COMMIT DROP"
+            )
+            with open(section_path, 'r', newline='', encoding='utf-8') as section:
+                cursor.copy_expert(
+                    "COPY staging_validation_result (table_name, code_objet, controle, statut, message) "
+                    "FROM STDIN WITH (FORMAT csv, DELIMITER ';')",
+                    section, size=1 << 20
+                )
+            # Lignes sans code d'objet: rien à rattacher
+            cursor.execute("DELETE FROM staging_validation_result WHERE code_objet = 'N/A'")
+            cursor.execute("SELECT DISTINCT table_name FROM staging_validation_result")
+            tables = [table_name for (table_name,) in cursor.fetchall()]
+
+            results = ValidationResultService._table_sql(ValidationResult.__table__)
+            cursor.execute(
+                f"DELETE FROM {results} v USING (SELECT DISTINCT table_name, code_objet FROM staging_validation_result) s "
+                f"WHERE v.table_name = s.table_name AND v.code_objet = s.code_objet"
+            )
+            for table_name in tables:
+                # Doublons du fichier: seules les lignes de la dernière occurrence d'un objet sont conservées
+                spec = ValidationResultService.TABLES.get(table_name, {})
+                fingerprint, join = 'NULL', ''
+                if spec.get('fingerprints') is not None:
+                    fingerprint = 'e.empreinte'
+                    join = (
+                        f"LEFT JOIN {ValidationResultService._table_sql(spec['fingerprints'].__table__)} e "
+                        f"ON e.{spec['key']} = s.code_objet AND s.controle = %(summary)s"
+                    )
+                cursor.execute(
+                    f"INSERT INTO {results} (table_name, code_objet, controle, statut, message, ruleset_version, "
+                    f"empreinte, validated_at) "
+                    f"SELECT DISTINCT ON (s.code_objet, s.controle) s.table_name, s.code_objet, s.controle, s.statut, "
+                    f"s.message, %(version)s, {fingerprint}, LOCALTIMESTAMP "
+                    f"FROM (SELECT *, max(ligne) FILTER (WHERE controle = %(summary)s) "
+                    f"OVER (PARTITION BY code_objet) AS derniere FROM staging_validation_result "
+                    f"WHERE table_name = %(table)s) s {join} "
+                    f"WHERE s.ligne >= s.derniere "
+                    f"ORDER BY s.code_objet, s.controle, s.ligne DESC",
+                    {'summary': ReportWriter.OBJECT_CONTROL, 'version': rules.RULESET_VERSION, 'table': table_name}
+                )
+        db.session.commit()
+
+    @staticmethod
+    def revalidate(table_name, full=False, batch_size=1000):
+        """
+        Revalide les objets d'une table dont le résultat enregistré n'est plus à jour
+
+        Un objet est revalidé s'il n'a jamais été validé, si le jeu de règles a changé,
+        si sa date de mise à jour est postérieure à sa dernière validation ou si son
+        empreinte a changé. Les résultats des objets supprimés sont effacés.
+
+        Args:
+            table_name (str): Nom de la table (ex: t_adresse)
+            full (bool): Revalider tous les objets
+            batch_size (int): Nombre d'objets validés par lot
+
+        Returns:
+            int: Nombre d'objets revalidés
+        """
+        spec = ValidationResultService.TABLES[table_name]
+        key = spec['key']
+        objects = ValidationResultService._table_sql(spec['model'].__table__)
+        results = ValidationResultService._table_sql(ValidationResult.__table__)
+        params = {'table': table_name, 'summary': ReportWriter.OBJECT_CONTROL, 'version': rules.RULESET_VERSION}
+
+        db.session.execute(text(
+            f"DELETE FROM {results} v WHERE v.table_name = :table "
+            f"AND NOT EXISTS (SELECT 1 FROM {objects} o WHERE o.{key} = v.code_objet)"
+        ), params)
+        db.session.commit()
+
+        fingerprint, join, stale = 'NULL', '', 'TRUE'
+        if spec['fingerprints'] is not None:
+            fingerprint = 'e.empreinte'
+            join = f"LEFT JOIN {ValidationResultService._table_sql(spec['fingerprints'].__table__)} e ON e.{key} = o.{key}"
+        if not full:
+            stale = (
+                f"v.code_objet IS NULL OR v.ruleset_version <> :version OR o.{spec['majdate']} > v.validated_at"
+                + (" OR e.empreinte IS DISTINCT FROM v.empreinte" if join else "")
+            )
+
+        # Parcours par clé: chaque lot reprend après le dernier code traité
+        revalidated = 0
+        last = ''
+        while True:
+            rows = db.session.execute(text(
+                f"SELECT o.{key}, {fingerprint} FROM {objects} o "
+                f"LEFT JOIN {results} v ON v.table_name = :table AND v.code_objet = o.{key} AND v.controle = :summary "
+                f"{join} WHERE o.{key} > :last AND ({stale}) ORDER BY o.{key} LIMIT :limit"
+            ), {**params, 'last': last, 'limit': batch_size}).fetchall()
+            if not rows:
+                break
+            fingerprints = dict(rows)
+            ValidationResultService.store_results(table_name, spec['validate'](list(fingerprints)), fingerprints)
+            revalidated += len(rows)
+            last = rows[-1][0]
+        if revalidated:
+            ValidationResultService.refresh_summary()
+        return revalidated
+
+    @staticmethod
+    def store_results(table_name, results, fingerprints=None):
+        """
+        Enregistre les résultats d'un lot d'objets validés, en remplaçant les précédents
+
+        Args:
+            table_name (str): Nom de la table
+            results (dict): Code -> résultat (valid, details), voir RulePlan.object_results
+            fingerprints (dict): Code -> empreinte de l'objet validé
+        """
+        if not results:
+            return
+        fingerprints = fingerprints or {}
+        rows = []
+        for code, result in results.items():
+            rows.append((table_name, code, ReportWriter.OBJECT_CONTROL, 'OK' if result['valid'] else 'NOK',
+                         'Tous les contrôles sont valides' if result['valid'] else 'Des contrôles ont échoué',
+                         rules.RULESET_VERSION, fingerprints.get(code)))
+            # Un contrôle en échec plusieurs fois pour un objet: un seul message conservé
+            failed = {detail['controle']: detail['message'] for detail in result['details']}
+            rows.extend(
+                (table_name, code, controle, 'NOK', message, rules.RULESET_VERSION, None)
+                for controle, message in failed.items()
+            )
+
+        results_table = ValidationResultService._table_sql(ValidationResult.__table__)
+        connection = db.session.connection().connection
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {results_table} WHERE table_name = %s AND code_objet = ANY(%s)",
+                (table_name, list(results))
+            )
+            execute_values(
+                cursor,
+                f"INSERT INTO {results_table} (table_name, code_objet, controle, statut, message, ruleset_version, "
+                f"empreinte, validated_at) VALUES %s",
+                rows,
+                template="(%s, %s, %s, %s, %s, %s, %s, LOCALTIMESTAMP)",
+                page_size=1000
+            )
+        db.session.commit()
+
+    @staticmethod
+    def iter_results(table_name, batch_size=1000):
+        """
+        Parcourt en flux les résultats enregistrés d'une table, au format des lignes du rapport
+
+        Args:
+            table_name (str): Nom de la table
+            batch_size (int): Nombre de lignes lues par lot
+
+        Yields:
+            dict: Ligne du rapport (table, code_objet, controle, statut, message)
+        """
+        query = (
+            db.session.query(ValidationResult.code_objet, ValidationResult.controle,
+                             ValidationResult.statut, ValidationResult.message)
+            .filter(ValidationResult.table_name == table_name)
+            .order_by(ValidationResult.code_objet,
+                      ValidationResult.controle != ReportWriter.OBJECT_CONTROL,
+                      ValidationResult.controle)
+        )
+        for code, controle, statut, message in query.yield_per(batch_size):
+            yield {'table': table_name, 'code_objet': code, 'controle': controle, 'statut': statut, 'message': message}
+
+    @staticmethod
+    def refresh_summary():
+        """
+        Recalcule la vue de synthèse sans bloquer sa lecture (CONCURRENTLY)
+        """
+        db.session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {ValidationResultService.SUMMARY_VIEW}"))
+        db.session.commit()
+
+    @staticmethod
+    def summary(group_by=('table', 'controle', 'statut'), filters=None):
+        """
+        Compte les résultats de validation par groupe, à partir de la vue de synthèse
+
+        La vue est déjà agrégée par table, contrôle, statut et commune: la requête ne
+        somme que quelques milliers de lignes, quelle que soit la taille des tables.
+        Sur la ligne de statut (contrôle ReportWriter.OBJECT_CONTROL), le nombre est
+        celui des objets; sur les autres, celui des objets en échec pour ce contrôle.
+
+        Args:
+            group_by (tuple): Regroupements, parmi les clés de SUMMARY_GROUPS
+            filters (dict): Valeurs acceptées par regroupement (ex: {'statut': ['NOK']})
+
+        Returns:
+            list: Un dictionnaire par groupe (valeurs des regroupements et count), par ordre des regroupements
+
+        Raises:
+            ValueError: Si un regroupement ou un filtre est inconnu
+        """
+        groups = ValidationResultService.SUMMARY_GROUPS
+        unknown = [name for name in list(group_by) + list(filters or {}) if name not in groups]
+        if unknown:
+            raise ValueError(f"Regroupement inconnu: {', '.join(unknown)} (valeurs possibles: {', '.join(groups)})")
+
+        columns = ', '.join(groups[name] for name in group_by)
+        conditions, params = [], {}
+        for name, values in (filters or {}).items():
+            if values:
+                conditions.append(f"{groups[name]} IN :{name}")
+                params[name] = tuple(values)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        grouping = f"GROUP BY {columns} ORDER BY {columns}" if group_by else ''
+
+        statement = text(
+            f"SELECT {columns + ', ' if group_by else ''}sum(nombre) AS count "
+            f"FROM {ValidationResultService.SUMMARY_VIEW} {where} {grouping}"
+        ).bindparams(*[bindparam(name, expanding=True) for name in params])
+        rows = db.session.execute(statement, params).fetchall()
+        return [
+            {**dict(zip(group_by, row[:-1])), 'count': int(row[-1] or 0)}
+            for row in rows
+        ]
+
+    @staticmethod
+    def _table_sql(table):
+        """
+        Retourne le nom qualifié et protégé d'une table pour une requête SQL
+        """
+        return db.engine.dialect.identifier_preparer.format_table(table)
@@ -0,0 +1,274 @@
+import numpy as np
+import pandas as pd
+
+# Colonnes lues pour le contrôle des capacités, par table GRACE THD
+CAPACITY_COLUMNS = {
+    't_cable': ['cb_code', 'cb_capafo', 'cb_modulo'],
+    't_fibre': ['fo_code', 'fo_cb_code', 'fo_nincab', 'fo_numtub', 'fo_nintub'],
+    't_cassette': ['cs_code', 'cs_nb_pas'],
+    't_position': ['ps_code', 'ps_1', 'ps_2', 'ps_cs_code', 'ps_fonct'],
+}
+
+# Fonctions de position reliant deux fibres (épissure, passage): ps_1 et ps_2 obligatoires
+SPLICE_FUNCTIONS = ('EP', 'PA')
+
+
+def encode(*keys):
+    """
+    Encode une clé composée en un entier par ligne
+
+    Les numéros des colonnes (factorisées) sont combinés en base mixte, le résultat étant
+    renuméroté à chaque étape pour rester inférieur au nombre de lignes; une ligne dont
+    une colonne est vide reçoit -1.
+
+    Args:
+        *keys (ndarray): Numéros de chaque colonne de la clé (-1: valeur vide)
+
+    Returns:
+        ndarray: Numéro de la clé de chaque ligne
+    """
+    result = np.zeros(len(keys[0]), dtype=np.int64)
+    missing = np.zeros(len(keys[0]), dtype=bool)
+    for numbers in keys:
+        missing |= numbers == -1
+        result, _ = pd.factorize(result * (int(numbers.max(initial=-1)) + 2) + numbers + 1)
+    result[missing] = -1
+    return result
+
+
+def duplicated(codes):
+    """
+    Repère les lignes dont le numéro de clé apparaît plusieurs fois
+
+    Tri des numéros puis comparaison de voisins, toutes les occurrences étant marquées.
+
+    Args:
+        codes (ndarray): Numéros de clé (-1: clé vide, jamais en double)
+
+    Returns:
+        ndarray: Masque des lignes en double
+    """
+    order = np.argsort(codes, kind='stable')
+    ordered = codes[order]
+    same = (ordered[1:] == ordered[:-1]) & (ordered[1:] != -1)
+    repeated = np.zeros(len(codes), dtype=bool)
+    repeated[1:] |= same
+    repeated[:-1] |= same
+    result = np.zeros(len(codes), dtype=bool)
+    result[order] = repeated
+    return result
+
+
+class CapacityCheck:
+    """
+    Contrôle de cohérence des capacités d'une livraison
+
+    Câbles, fibres, cassettes et positions sont rapprochés par leurs clés encodées en
+    entiers; les comptages et doublons sont des agrégations vectorisées (bincount, tri).
+    """
+
+    def __init__(self, frames):
+        """
+        Args:
+            frames (dict): Table -> DataFrame de ses colonnes CAPACITY_COLUMNS, en texte
+        """
+        self.frames = frames
+        self.factorized = {}
+
+    def check(self):
+        """
+        Exécute les contrôles dont les tables sont présentes dans la livraison
+
+        Returns:
+            tuple: (anomalies DataFrame table/code/controle/message,
+                    nombre d'anomalies par contrôle {(table, controle): nombre})
+        """
+        findings = []
+        if {'t_cable', 't_fibre'} <= set(self.frames) and 'cb_code' in self.frames['t_cable'].columns:
+            findings.extend(self._cable_fibres())
+        if 't_fibre' in self.frames:
+            findings.extend(self._fibre_numbers())
+        if 't_position' in self.frames:
+            findings.extend(self._position_fibres())
+            if 't_cassette' in self.frames and 'cs_code' in self.frames['t_cassette'].columns:
+                findings.extend(self._cassette_occupancy())
+
+        findings = [finding for finding in findings if len(finding)]
+        if not findings:
+            return pd.DataFrame(columns=['table', 'code', 'controle', 'message']), {}
+        result = pd.concat(findings, ignore_index=True)
+        return result, result.groupby(['table', 'controle'], sort=False).size().to_dict()
+
+    def _cable_fibres(self):
+        """
+        Nombre de fibres et rangs des fibres de chaque câble comparés à sa capacité
+        """
+        cables = self.frames['t_cable'].dropna(subset=['cb_code']).drop_duplicates('cb_code')
+        fibres = self.frames['t_fibre']
+        if cables.empty:
+            return []
+        capacity = self._numbers('t_cable', 'cb_capafo', cables.index)
+        modulo = self._numbers('t_cable', 'cb_modulo', cables.index)
+
+        # Câble de chaque fibre (-1: câble absent, signalé par le contrôle des références)
+        cable = pd.Index(cables['cb_code'], dtype=object).get_indexer(
+            self._column(fibres, 'fo_cb_code').to_numpy(dtype=object)
+        )
+        known = cable != -1
+        counts = np.bincount(cable[known], minlength=len(cables))
+        over = counts > capacity
+        findings = [pd.DataFrame({
+            'table': 't_cable',
+            'code': cables.loc[over, 'cb_code'],
+            'controle': 'cb_capafo',
+            'message': [f"{count} fibres pour une capacité de {limit:g}"
+                        for count, limit in zip(counts[over], capacity[over])]
+        })]
+
+        # Rang de la fibre dans le câble et position dans les tubes (tubes de cb_modulo fibres)
+        fibre_capacity = np.where(known, capacity[np.maximum(cable, 0)], np.nan)
+        fibre_modulo = np.where(known, modulo[np.maximum(cable, 0)], np.nan)
+        rank = self._numbers('t_fibre', 'fo_nincab')
+        tube = self._numbers('t_fibre', 'fo_numtub')
+        in_tube = self._numbers('t_fibre', 'fo_nintub')
+        beyond = rank > fibre_capacity
+        findings.append(self._fibre_findings(
+            fibres, beyond, 'fo_nincab',
+            [f"Rang {value:g} au-delà de la capacité du câble ({limit:g})"
+             for value, limit in zip(rank[beyond], fibre_capacity[beyond])]
+        ))
+        beyond = (in_tube > fibre_modulo) | (tube > np.ceil(fibre_capacity / fibre_modulo))
+        findings.append(self._fibre_findings(
+            fibres, beyond, 'fo_numtub',
+            [f"Tube {numtub:g}, fibre {nintub:g} hors capacité du câble ({limit:g} fibres, tubes de {size:g})"
+             for numtub, nintub, limit, size in zip(tube[beyond], in_tube[beyond],
+                                                     fibre_capacity[beyond], fibre_modulo[beyond])]
+        ))
+        return findings
+
+    def _fibre_numbers(self):
+        """
+        Numéros de fibre en double dans un câble ou dans un tube
+        """
+        fibres = self.frames['t_fibre']
+        cable = self._column(fibres, 'fo_cb_code')
+        rank = self._column(fibres, 'fo_nincab')
+        tube = self._column(fibres, 'fo_numtub')
+        in_tube = self._column(fibres, 'fo_nintub')
+        findings = []
+        numbers = {column: self._factorize('t_fibre', column)[0]
+                   for column in ('fo_cb_code', 'fo_nincab', 'fo_numtub', 'fo_nintub')}
+        repeated = duplicated(encode(numbers['fo_cb_code'], numbers['fo_nincab']))
+        findings.append(self._fibre_findings(
+            fibres, repeated, 'fo_nincab_doublon',
+            "Rang " + rank[repeated] + " en double dans le câble " + cable[repeated]
+        ))
+        repeated = duplicated(encode(numbers['fo_cb_code'], numbers['fo_numtub'], numbers['fo_nintub']))
+        findings.append(self._fibre_findings(
+            fibres, repeated, 'fo_nintub_doublon',
+            "Fibre " + in_tube[repeated] + " en double dans le tube " + tube[repeated]
+            + " du câble " + cable[repeated]
+        ))
+        return findings
+
+    def _position_fibres(self):
+        """
+        Fibres raccordées plusieurs fois et épissures incomplètes
+
+        Une fibre n'arrive (ps_1) et ne repart (ps_2) qu'une fois: ses deux extrémités.
+        """
+        positions = self.frames['t_position']
+        incoming = self._column(positions, 'ps_1')
+        outgoing = self._column(positions, 'ps_2')
+        # Numérotation commune des fibres des deux colonnes
+        numbers, _ = pd.factorize(pd.concat([incoming, outgoing], ignore_index=True))
+        incoming_numbers, outgoing_numbers = numbers[:len(positions)], numbers[len(positions):]
+
+        repeated_in = duplicated(incoming_numbers)
+        repeated_out = duplicated(outgoing_numbers)
+        looped = (incoming_numbers == outgoing_numbers) & (incoming_numbers != -1)
+        flagged = repeated_in | repeated_out | looped
+        messages = np.select(
+            [looped[flagged], repeated_in[flagged]],
+            ["Même fibre en entrée et en sortie: " + incoming[flagged],
+             "Fibre " + incoming[flagged] + " raccordée plusieurs fois en entrée (ps_1)"],
+            "Fibre " + outgoing[flagged] + " raccordée plusieurs fois en sortie (ps_2)"
+        )
+        findings = [self._findings(positions, 'ps_code', 't_position', flagged, 'ps_fibre_doublon', messages)]
+
+        function = self._column(positions, 'ps_fonct')
+        incomplete = function.isin(SPLICE_FUNCTIONS).to_numpy() & ((incoming_numbers == -1) | (outgoing_numbers == -1))
+        findings.append(self._findings(
+            positions, 'ps_code', 't_position', incomplete, 'ps_fibres',
+            "Position " + function[incomplete] + " sans fibre en entrée ou en sortie"
+        ))
+        return findings
+
+    def _cassette_occupancy(self):
+        """
+        Nombre de positions de chaque cassette comparé à son nombre de pas
+        """
+        cassettes = self.frames['t_cassette'].dropna(subset=['cs_code']).drop_duplicates('cs_code')
+        capacity = self._numbers('t_cassette', 'cs_nb_pas', cassettes.index)
+        cassette = pd.Index(cassettes['cs_code'], dtype=object).get_indexer(
+            self._column(self.frames['t_position'], 'ps_cs_code').to_numpy(dtype=object)
+        )
+        counts = np.bincount(cassette[cassette != -1], minlength=len(cassettes))
+        over = counts > capacity
+        return [pd.DataFrame({
+            'table': 't_cassette',
+            'code': cassettes.loc[over, 'cs_code'],
+            'controle': 'cs_nb_pas',
+            'message': [f"{count} positions pour {limit:g} pas"
+                        for count, limit in zip(counts[over], capacity[over])]
+        })]
+
+    def _fibre_findings(self, fibres, mask, controle, messages):
+        return self._findings(fibres, 'fo_code', 't_fibre', mask, controle, messages)
+
+    @staticmethod
+    def _findings(df, key, table, mask, controle, messages):
+        """
+        Anomalies des lignes d'un DataFrame sélectionnées par un masque
+        """
+        codes = CapacityCheck._column(df, key)[mask].fillna('N/A')
+        return pd.DataFrame({
+            'table': table,
+            'code': codes.to_numpy(dtype=object),
+            'controle': controle,
+            'message': np.asarray(messages, dtype=object)
+        })
+
+    @staticmethod
+    def _column(df, column):
+        """
+        Colonne d'un DataFrame, vide si elle n'a pas été livrée
+        """
+        return df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+    def _factorize(self, table, column):
+        """
+        Numéros (hachage) et valeurs distinctes d'une colonne, calculés une fois par colonne
+        """
+        if (table, column) not in self.factorized:
+            self.factorized[table, column] = pd.factorize(self._column(self.frames[table], column))
+        return self.factorized[table, column]
+
+    def _numbers(self, table, column, index=None):
+        """
+        Colonne convertie en nombres (NaN si vide ou non numérique: aucun dépassement)
+
+        Seules les valeurs distinctes sont converties.
+
+        Args:
+            table (str): Table GRACE THD
+            column (str): Colonne
+            index (Index): Lignes retenues (toutes par défaut)
+        """
+        numbers, uniques = self._factorize(table, column)
+        values = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').to_numpy(dtype=float)
+        # Le numéro -1 (valeur vide) désigne le NaN ajouté en dernière position
+        result = np.append(values, np.nan)[numbers]
+        if index is not None:
+            result = result[self.frames[table].index.get_indexer(index)]
+        return result
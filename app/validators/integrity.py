@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+# Registre des références entre tables GRACE THD: clé de chaque table et, pour chaque
+# colonne de référence, la table dont elle contient la clé. Une table d'association
+# (sans clé propre) est identifiée par plusieurs colonnes.
+# Pour contrôler une nouvelle référence, l'ajouter à la table qui la porte.
+REFERENCES = {
+    't_adresse': {'key': 'ad_code', 'references': {}},
+    't_organisme': {'key': 'or_code', 'references': {'or_ad_code': 't_adresse'}},
+    't_reference': {'key': 'rf_code', 'references': {}},
+    't_noeud': {'key': 'nd_code', 'references': {}},
+    't_znro': {'key': 'zn_code', 'references': {'zn_nd_code': 't_noeud'}},
+    't_zsro': {'key': 'zs_code', 'references': {
+        'zs_nd_code': 't_noeud', 'zs_zn_code': 't_znro', 'zs_ad_code': 't_adresse'
+    }},
+    't_site': {'key': 'st_code', 'references': {'st_nd_code': 't_noeud', 'st_ad_code': 't_adresse'}},
+    't_local': {'key': 'lc_code', 'references': {'lc_st_code': 't_site'}},
+    't_ptech': {'key': 'pt_code', 'references': {'pt_nd_code': 't_noeud'}},
+    't_baie': {'key': 'ba_code', 'references': {'ba_lc_code': 't_local', 'ba_rf_code': 't_reference'}},
+    't_tiroir': {'key': 'ti_code', 'references': {'ti_ba_code': 't_baie', 'ti_rf_code': 't_reference'}},
+    't_ebp': {'key': 'bp_code', 'references': {
+        'bp_pt_code': 't_ptech', 'bp_lc_code': 't_local', 'bp_rf_code': 't_reference'
+    }},
+    't_cassette': {'key': 'cs_code', 'references': {'cs_bp_code': 't_ebp', 'cs_rf_code': 't_reference'}},
+    't_cheminement': {'key': 'cm_code', 'references': {'cm_ndcode1': 't_noeud', 'cm_ndcode2': 't_noeud'}},
+    't_cable': {'key': 'cb_code', 'references': {
+        'cb_nd1': 't_noeud', 'cb_nd2': 't_noeud', 'cb_bp1': 't_ebp', 'cb_bp2': 't_ebp',
+        'cb_rf_code': 't_reference'
+    }},
+    't_cableline': {'key': 'cl_code', 'references': {'cl_cb_code': 't_cable'}},
+    't_cab_chem': {'key': ['cc_cb_code', 'cc_cm_code'], 'references': {
+        'cc_cb_code': 't_cable', 'cc_cm_code': 't_cheminement'
+    }},
+    't_love': {'key': 'lv_id', 'references': {'lv_cb_code': 't_cable', 'lv_nd_code': 't_noeud'}},
+    't_fibre': {'key': 'fo_code', 'references': {'fo_cb_code': 't_cable'}},
+    't_position': {'key': 'ps_code', 'references': {
+        'ps_1': 't_fibre', 'ps_2': 't_fibre', 'ps_cs_code': 't_cassette', 'ps_ti_code': 't_tiroir'
+    }},
+}
+
+
+def key_columns(table):
+    """
+    Retourne les colonnes identifiant les objets d'une table
+
+    Args:
+        table (str): Nom de la table GRACE THD
+
+    Returns:
+        list: Colonnes de la clé
+    """
+    key = REFERENCES[table]['key']
+    return list(key) if isinstance(key, (list, tuple)) else [key]
+
+
+def required_columns(table):
+    """
+    Retourne les colonnes d'une table lues pour le contrôle des références
+
+    Args:
+        table (str): Nom de la table GRACE THD
+
+    Returns:
+        list: Colonnes de la clé puis colonnes de référence
+    """
+    columns = key_columns(table)
+    return columns + [column for column in REFERENCES[table]['references'] if column not in columns]
+
+
+class KeyIndex:
+    """
+    Index de hachage des clés d'une table
+
+    La table de hachage est construite une seule fois (pandas.Index) puis interrogée
+    par colonnes entières, sans requête ni boucle par ligne.
+    """
+
+    def __init__(self, keys):
+        """
+        Args:
+            keys (Series): Clés de la table (doublons et valeurs vides ignorés)
+        """
+        self.index = pd.Index(keys.dropna().unique(), dtype=object)
+
+    def __len__(self):
+        return len(self.index)
+
+    def contains(self, values):
+        """
+        Args:
+            values (Series): Valeurs recherchées
+
+        Returns:
+            ndarray: Masque des valeurs présentes dans l'index
+        """
+        return self.index.get_indexer(values.to_numpy(dtype=object)) != -1
+
+
+class ReferenceCheck:
+    """
+    Contrôle des références d'une livraison
+
+    Les index des clés sont construits à la première référence vers chaque table et
+    partagés par toutes les colonnes qui la référencent.
+    """
+
+    def __init__(self, frames):
+        """
+        Args:
+            frames (dict): Table -> DataFrame de ses colonnes required_columns, en texte
+        """
+        self.frames = frames
+        self.indexes = {}
+
+    def key_index(self, table):
+        """
+        Retourne l'index des clés d'une table de la livraison
+        """
+        if table not in self.indexes:
+            self.indexes[table] = KeyIndex(self.frames[table][key_columns(table)[0]])
+        return self.indexes[table]
+
+    def check(self, table):
+        """
+        Contrôle les colonnes de référence d'une table
+
+        Une référence vers une table absente de la livraison, ou livrée sans sa colonne
+        de clé, n'est pas contrôlée.
+
+        Args:
+            table (str): Nom de la table GRACE THD
+
+        Returns:
+            tuple: (anomalies DataFrame code/controle/message, comptes par colonne
+                    {colonne: (table cible, nombre)}, colonnes non contrôlées {colonne: table cible})
+        """
+        df = self.frames[table]
+        findings, counts, unchecked = [], {}, {}
+        for column, target in REFERENCES[table]['references'].items():
+            if column not in df.columns:
+                continue
+            if target not in self.frames or key_columns(target)[0] not in self.frames[target].columns:
+                unchecked[column] = target
+                continue
+
+            values = df[column]
+            dangling = values.notna().to_numpy() & ~self.key_index(target).contains(values)
+            counts[column] = (target, int(dangling.sum()))
+            if not dangling.any():
+                continue
+            rows = df[dangling]
+            findings.append(pd.DataFrame({
+                'position': np.flatnonzero(dangling),
+                'code': self._codes(table, rows),
+                'controle': f"{column}_reference",
+                'message': f"Référence inexistante dans {target}: " + rows[column].astype(str)
+            }))
+
+        if findings:
+            result = pd.concat(findings, ignore_index=True)
+            result = result.sort_values('position', kind='stable').drop(columns='position')
+        else:
+            result = pd.DataFrame(columns=['code', 'controle', 'message'])
+        return result, counts, unchecked
+
+    @staticmethod
+    def _codes(table, rows):
+        """
+        Codes des objets d'un DataFrame ('N/A' pour une clé vide)
+        """
+        columns = [column for column in key_columns(table) if column in rows.columns]
+        if not columns:
+            return pd.Series('N/A', index=rows.index)
+        codes = rows[columns].fillna('N/A').astype(str)
+        return codes.iloc[:, 0] if len(columns) == 1 else codes.agg('/'.join, axis=1)
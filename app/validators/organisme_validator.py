@@ -1,5 +1,4 @@
-import re
-import pandas as pd
+from app.validators.rules import get_plan
 
 class OrganismeValidator:
     """
@@ -7,21 +6,8 @@ class OrganismeValidator:
     """
     
     def __init__(self):
-        # Définir les règles de validation
-        self.rules = {
-            # Champs obligatoires
-            'required_fields': ['or_code', 'or_nom', 'or_type'],
-            
-            # Formats attendus pour certains champs
-            'formats': {
-                'or_code': {'regex': r'^[A-Za-z0-9_-]{1,20}$', 'message': "Le code de l'organisme doit contenir uniquement des lettres, chiffres, tirets et underscores (max 20 caractères)"},
-                'or_siret': {'regex': r'^\d{14}$', 'message': "Le numéro SIRET doit être composé de 14 chiffres"},
-                'or_siren': {'regex': r'^\d{9}$', 'message': "Le numéro SIREN doit être composé de 9 chiffres"},
-                'or_postal': {'regex': r'^\d{5}$', 'message': "Le code postal doit être composé de 5 chiffres"},
-                'or_telfixe': {'regex': r'^[0-9]{10,20}$', 'message': "Le numéro de téléphone fixe doit être composé de 10 à 20 chiffres"},
-                'or_mail': {'regex': r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$', 'message': "Le format de l'adresse email est invalide"},
-            }
-        }
+        # Plan de règles compilé une seule fois par processus (voir app.validators.rules)
+        self.plan = get_plan('t_organisme')
     
     def validate_dataframe(self, df):
         """
@@ -33,40 +19,7 @@ class OrganismeValidator:
         Returns:
             dict: Résultat de la validation avec statut et erreurs
         """
-        errors = []
-        
-        # Vérifier les champs obligatoires
-        for field in self.rules['required_fields']:
-            if field not in df.columns:
-                errors.append(f"Champ obligatoire manquant: {field}")
-            elif df[field].isnull().any():
-                missing_count = df[field].isnull().sum()
-                errors.append(f"{missing_count} organismes ont une valeur manquante pour le champ: {field}")
-        
-        # Vérifier les formats
-        for field, rule in self.rules['formats'].items():
-            if field not in df.columns:
-                continue
-                
-            # Filtrer les lignes non nulles
-            non_null_rows = df[~df[field].isnull()]
-            
-            if 'regex' in rule:
-                # Convertir en string pour le regex
-                non_null_rows = non_null_rows.copy()
-                non_null_rows[field] = non_null_rows[field].astype(str)
-                invalid_mask = ~non_null_rows[field].str.match(rule['regex'])
-                if invalid_mask.any():
-                    invalid_count = invalid_mask.sum()
-                    errors.append(f"{invalid_count} organismes ont un format invalide pour {field}: {rule['message']}")
-        
-        # Vérifier les doublons sur les champs uniques
-        for field in ['or_code']:
-            if field in df.columns:
-                duplicates = df[field].dropna().duplicated()
-                if duplicates.any():
-                    duplicate_count = duplicates.sum()
-                    errors.append(f"{duplicate_count} valeurs en doublon pour le champ unique {field}")
+        errors = self.plan.summarize(df)
         
         # Résultat de la validation
         return {
@@ -74,35 +27,57 @@ class OrganismeValidator:
             'errors': errors
         }
     
-    def validate_organisme(self, organisme):
+    def validate_rows(self, df):
         """
-        Valide une instance d'organisme
+        Valide chaque organisme d'un DataFrame en une seule passe vectorisée
         
         Args:
-            organisme: Instance de l'organisme à valider
+            df (DataFrame): DataFrame avec les données d'organismes
             
         Returns:
-            dict: Résultat de la validation avec statut et erreurs
+            DataFrame: Anomalies avec les colonnes index (position de la ligne), code, controle, champ, message
+        """
+        return self.plan.evaluate_frame(df)
+    
+    def validate_chunks(self):
         """
-        errors = []
+        Démarre la validation d'un fichier d'organismes lu par morceaux
         
-        # Vérifier les champs obligatoires
-        for field in self.rules['required_fields']:
-            if not hasattr(organisme, field) or getattr(organisme, field) is None:
-                errors.append(f"Champ obligatoire manquant: {field}")
+        Chaque morceau est validé par la méthode evaluate de l'objet retourné; l'unicité
+        est contrôlée sur l'ensemble du fichier et summarize donne les messages agrégés.
         
-        # Vérifier les formats
-        for field, rule in self.rules['formats'].items():
-            if not hasattr(organisme, field) or getattr(organisme, field) is None:
-                continue
-                
-            value = str(getattr(organisme, field))
+        Returns:
+            IncrementalValidation: Validation incrémentale
+        """
+        return self.plan.incremental()
+    
+    def validate_records(self, df):
+        """
+        Valide des organismes relus en base en une seule passe vectorisée
+        
+        Args:
+            df (DataFrame): Organismes à valider (une ligne par organisme)
+            
+        Returns:
+            dict: Résultat par code, au même format que validate_organisme
+        """
+        return self.plan.object_results(df)
+    
+    def validate_organisme(self, organisme):
+        """
+        Valide une instance d'organisme
+        
+        Args:
+            organisme: Instance de l'organisme à valider
             
-            if 'regex' in rule and not re.match(rule['regex'], value):
-                errors.append(f"Format invalide pour {field}: {rule['message']}")
+        Returns:
+            dict: Résultat de la validation avec statut, messages d'erreur et détail par contrôle
+        """
+        findings = self.plan.evaluate_object(organisme)
         
         # Résultat de la validation
         return {
-            'valid': len(errors) == 0,
-            'errors': errors
+            'valid': len(findings) == 0,
+            'errors': [finding['message'] for finding in findings],
+            'details': findings
         }
@@ -0,0 +1,730 @@
+import re
+import json
+import hashlib
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+from shapely.ops import transform
+from geoalchemy2.shape import to_shape
+
+# Registre déclaratif des règles de validation GRACE THD, par table.
+# Types de règles: required, regex, range, enum, unique, geometry, cross_field,
+# et contrôles spatiaux en Lambert 93: proximity, position, zone.
+# Pour ajouter une table, déclarer sa clé, le libellé de ses objets et ses règles.
+RULES = {
+    't_adresse': {
+        'key': 'ad_code',
+        'noun': 'adresses',
+        'rules': [
+            # Champs obligatoires
+            {'type': 'required', 'field': 'ad_code'},
+            {'type': 'required', 'field': 'ad_nomvoie'},
+            {'type': 'required', 'field': 'ad_commune'},
+            {'type': 'required', 'field': 'ad_insee'},
+
+            # Formats attendus pour certains champs
+            {'type': 'regex', 'field': 'ad_code', 'regex': r'^[A-Za-z0-9_-]{1,254}$',
+             'message': "Le code d'adresse doit contenir uniquement des lettres, chiffres, tirets et underscores"},
+            {'type': 'regex', 'field': 'ad_insee', 'regex': r'^\d{5}$',
+             'message': "Le code INSEE doit être composé de 5 chiffres"},
+            {'type': 'regex', 'field': 'ad_postal', 'regex': r'^\d{5}$',
+             'message': "Le code postal doit être composé de 5 chiffres"},
+            {'type': 'regex', 'field': 'ad_hexacle', 'regex': r'^[A-Za-z0-9]{10}$',
+             'message': "Le code HEXACLE doit être composé de 10 caractères alphanumériques"},
+            {'type': 'range', 'field': 'ad_distinf', 'min': 0, 'max': 9999.99,
+             'message': "La distance doit être comprise entre 0 et 9999.99 mètres"},
+
+            # Valeurs permises pour certains champs
+            {'type': 'enum', 'field': 'ad_raclong', 'values': ['0', '1']},
+            {'type': 'enum', 'field': 'ad_isole', 'values': ['0', '1']},
+            {'type': 'enum', 'field': 'ad_prio', 'values': ['0', '1']},
+            {'type': 'enum', 'field': 'ad_imneuf', 'values': ['0', '1']},
+            {'type': 'enum', 'field': 'ad_iaccgst', 'values': ['0', '1']},
+            {'type': 'enum', 'field': 'ad_dta', 'values': ['0', '1']},
+
+            # Champs uniques
+            {'type': 'unique', 'field': 'ad_code'},
+            {'type': 'unique', 'field': 'ad_batcode'},
+            {'type': 'unique', 'field': 'ad_codtemp'},
+
+            # Géométrie
+            {'type': 'geometry', 'field': 'geom'},
+
+            # Cohérence entre champs
+            {'type': 'cross_field', 'check': 'paired', 'fields': ['ad_x_ban', 'ad_y_ban'],
+             'message': "Les coordonnées BAN X et Y doivent être renseignées ensemble"},
+
+            # Contrôles spatiaux (distances en mètres, Lambert 93)
+            {'type': 'proximity', 'field': 'geom', 'distance': 1.0,
+             'message': "Adresses distantes de moins de 1 m"},
+            {'type': 'position', 'fields': ['ad_x_ban', 'ad_y_ban'], 'distance': 100.0,
+             'message': "Géométrie à plus de 100 m des coordonnées BAN"},
+            {'type': 'zone', 'field': 'geom', 'zones': ['t_znro', 't_zsro'],
+             'message': "Adresse hors des zones de la livraison"},
+        ]
+    },
+    't_organisme': {
+        'key': 'or_code',
+        'noun': 'organismes',
+        'rules': [
+            # Champs obligatoires
+            {'type': 'required', 'field': 'or_code'},
+            {'type': 'required', 'field': 'or_nom'},
+            {'type': 'required', 'field': 'or_type'},
+
+            # Formats attendus pour certains champs
+            {'type': 'regex', 'field': 'or_code', 'regex': r'^[A-Za-z0-9_-]{1,20}$',
+             'message': "Le code de l'organisme doit contenir uniquement des lettres, chiffres, tirets et underscores (max 20 caractères)"},
+            {'type': 'regex', 'field': 'or_siret', 'regex': r'^\d{14}$',
+             'message': "Le numéro SIRET doit être composé de 14 chiffres"},
+            {'type': 'regex', 'field': 'or_siren', 'regex': r'^\d{9}$',
+             'message': "Le numéro SIREN doit être composé de 9 chiffres"},
+            {'type': 'regex', 'field': 'or_postal', 'regex': r'^\d{5}$',
+             'message': "Le code postal doit être composé de 5 chiffres"},
+            {'type': 'regex', 'field': 'or_telfixe', 'regex': r'^[0-9]{10,20}$',
+             'message': "Le numéro de téléphone fixe doit être composé de 10 à 20 chiffres"},
+            {'type': 'regex', 'field': 'or_mail', 'regex': r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$',
+             'message': "Le format de l'adresse email est invalide"},
+
+            # Champs uniques
+            {'type': 'unique', 'field': 'or_code'},
+        ]
+    },
+}
+
+# Version du jeu de règles: change dès qu'une règle est ajoutée ou modifiée
+RULESET_VERSION = hashlib.sha1(json.dumps(RULES, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+# Suffixe des identifiants de contrôle par type de règle
+RULE_KINDS = {
+    'required': 'obligatoire',
+    'regex': 'format',
+    'range': 'bornes',
+    'enum': 'valeurs',
+    'unique': 'unicite',
+    'geometry': 'geometrie',
+    'cross_field': 'coherence',
+    'proximity': 'proximite',
+    'position': 'ecart',
+    'zone': 'hors_zone',
+}
+
+# Messages agrégés par type de règle (et variante) pour la validation d'un DataFrame complet
+SUMMARY_MESSAGES = {
+    ('required', 'absent'): "Champ obligatoire manquant: {field}",
+    ('required', None): "{count} {noun} ont une valeur manquante pour le champ: {field}",
+    ('regex', None): "{count} {noun} ont un format invalide pour {field}: {message}",
+    ('range', 'non_numerique'): "Le champ {field} contient des valeurs non numériques",
+    ('range', None): "{count} {noun} ont une valeur hors limites pour {field}: {message}",
+    ('enum', None): "{count} {noun} ont des valeurs non autorisées pour {field}. Valeurs autorisées: {allowed}",
+    ('unique', None): "{count} valeurs en doublon pour le champ unique {field}",
+    ('geometry', None): "{count} géométries invalides détectées",
+    ('cross_field', None): "{count} {noun} présentent une incohérence pour {field}: {message}",
+    ('proximity', None): "{count} {noun} sont en doublon de position: {message}",
+    ('position', None): "{count} {noun} présentent un écart de position pour {field}: {message}",
+    ('zone', None): "{count} {noun} sont hors des zones de la livraison: {message}",
+}
+
+# Système de coordonnées des contrôles spatiaux (Lambert 93, distances en mètres)
+METRIC_CRS = 'EPSG:2154'
+
+
+class RulePlan:
+    """
+    Plan d'exécution compilé des règles d'une table
+
+    Les expressions régulières sont précompilées et les valeurs permises converties
+    en ensembles une seule fois; le même plan sert à la validation vectorisée d'un
+    DataFrame et à la validation d'un objet isolé.
+    """
+
+    def __init__(self, table, definition):
+        self.table = table
+        self.key = definition['key']
+        self.noun = definition['noun']
+        self.rules = [self._compile(rule, self.key) for rule in definition['rules']]
+
+    @staticmethod
+    def _compile(rule, key):
+        compiled = dict(rule)
+        if rule['type'] == 'proximity':
+            # Le message désigne l'objet voisin par son code
+            compiled['key'] = key
+        if 'fields' in rule:
+            compiled['field'] = ', '.join(rule['fields'])
+        compiled.setdefault('id', f"{rule.get('field') or rule['fields'][0]}_{RULE_KINDS[rule['type']]}")
+        if rule['type'] == 'regex':
+            compiled['pattern'] = re.compile(rule['regex'])
+        elif rule['type'] == 'enum':
+            compiled['allowed'] = frozenset(rule['values'])
+            compiled['allowed_text'] = ', '.join(rule['values'])
+        return compiled
+
+    def evaluate_frame(self, df, context=None):
+        """
+        Évalue toutes les règles sur un DataFrame en une seule passe vectorisée
+
+        Args:
+            df (DataFrame): DataFrame ou GeoDataFrame à valider
+            context (dict): Données de la livraison utilisées par les règles (voir zone_tables)
+
+        Returns:
+            DataFrame: Anomalies avec les colonnes index (position de la ligne), code, controle, champ, message
+        """
+        return self._findings(df, self._iter_frame(df, context=context))
+
+    def summarize(self, df, context=None):
+        """
+        Évalue toutes les règles sur un DataFrame et retourne un message agrégé par contrôle en échec
+
+        Args:
+            df (DataFrame): DataFrame ou GeoDataFrame à valider
+            context (dict): Données de la livraison utilisées par les règles (voir zone_tables)
+
+        Returns:
+            list: Messages d'erreur agrégés
+        """
+        return self._summary_messages(
+            (rule, variant, int(mask.sum())) for rule, variant, mask, _ in self._iter_frame(df, context=context)
+        )
+
+    def evaluate_records(self, df):
+        """
+        Évalue en une seule passe vectorisée les règles applicables à des objets isolés
+
+        Équivalent de evaluate_object appliqué à chaque ligne (objets relus en base):
+        les règles d'unicité et de proximité, qui portent sur un fichier livré, et les
+        zones, qui font partie de la livraison, sont ignorées.
+
+        Args:
+            df (DataFrame): DataFrame ou GeoDataFrame des objets à valider
+
+        Returns:
+            DataFrame: Anomalies avec les colonnes index (position de la ligne), code, controle, champ, message
+        """
+        return self._findings(df, self._iter_frame(df, exclude=('unique', 'proximity')))
+
+    def object_results(self, df):
+        """
+        Valide chaque objet d'un DataFrame et regroupe les anomalies par code
+
+        Args:
+            df (DataFrame): DataFrame ou GeoDataFrame des objets à valider
+
+        Returns:
+            dict: Code -> résultat au format de la validation d'un objet (valid, errors, details)
+        """
+        results = {
+            code: {'valid': True, 'errors': [], 'details': []}
+            for code in df[self.key].tolist()
+        }
+        findings = self.evaluate_records(df)
+        for finding in findings[['code', 'controle', 'champ', 'message']].to_dict('records'):
+            result = results[finding['code']]
+            result['valid'] = False
+            result['errors'].append(finding['message'])
+            result['details'].append(finding)
+        return results
+
+    def fields(self):
+        """
+        Retourne les champs contrôlés par les règles, clé comprise
+
+        Returns:
+            list: Noms des champs, dans l'ordre des règles
+        """
+        fields = [self.key]
+        for rule in self.rules:
+            for field in rule.get('fields', [rule.get('field')]):
+                if field not in fields:
+                    fields.append(field)
+        return fields
+
+    def zone_tables(self):
+        """
+        Retourne les tables de la livraison dont les polygones sont attendus dans le
+        contexte de validation (context['zones'], table -> polygones en METRIC_CRS)
+
+        Returns:
+            list: Noms des tables de zones
+        """
+        tables = []
+        for rule in self.rules:
+            if rule['type'] == 'zone':
+                tables.extend(table for table in rule['zones'] if table not in tables)
+        return tables
+
+    def incremental(self, context=None):
+        """
+        Démarre une validation par morceaux (fichier lu en flux)
+
+        Args:
+            context (dict): Données de la livraison utilisées par les règles (voir zone_tables)
+
+        Returns:
+            IncrementalValidation: Validation conservant l'état d'unicité entre les morceaux
+        """
+        return IncrementalValidation(self, context)
+
+    def evaluate_object(self, obj):
+        """
+        Évalue les règles applicables à un objet isolé (instance du modèle)
+
+        Les règles d'unicité, qui portent sur un ensemble d'objets, sont ignorées.
+
+        Args:
+            obj: Instance à valider
+
+        Returns:
+            list: Anomalies sous forme de dictionnaires code, controle, champ, message
+        """
+        code = getattr(obj, self.key, None)
+        findings = []
+        for rule in self.rules:
+            checker = _OBJECT_CHECKS.get(rule['type'])
+            if checker is None:
+                continue
+            message = checker(rule, obj)
+            if message is not None:
+                findings.append({'code': code, 'controle': rule['id'], 'champ': rule['field'], 'message': message})
+        return findings
+
+    def _iter_frame(self, df, indexes=None, exclude=(), context=None):
+        """
+        Produit (règle, variante, masque des lignes en échec, message) pour chaque contrôle en échec
+
+        Args:
+            df (DataFrame): DataFrame à valider
+            indexes (dict): Index d'unicité par champ, partagés entre les morceaux d'un même fichier
+            exclude (tuple): Types de règles à ne pas évaluer
+            context (dict): Données de la livraison utilisées par les règles (voir zone_tables)
+        """
+        spatial = None
+        for rule in self.rules:
+            if rule['type'] in exclude:
+                continue
+            if rule['type'] in _SPATIAL_CHECKS:
+                # Géométries projetées une seule fois pour toutes les règles spatiales
+                if spatial is None:
+                    spatial = SpatialFrame(df, context)
+                checks = _SPATIAL_CHECKS[rule['type']](rule, df, spatial)
+            elif rule['type'] == 'unique' and indexes is not None:
+                checks = _frame_unique_indexed(rule, df, indexes[rule['field']])
+            else:
+                checks = _FRAME_CHECKS[rule['type']](rule, df)
+            for variant, mask, message in checks:
+                if mask.any():
+                    yield rule, variant, mask, message
+
+    def _findings(self, df, failures, offset=0):
+        """
+        Construit le DataFrame des anomalies à partir des contrôles en échec
+        """
+        if self.key in df.columns:
+            codes = df[self.key].to_numpy(dtype=object)
+        else:
+            codes = np.full(len(df), None, dtype=object)
+
+        findings = []
+        for rule, _, mask, message in failures:
+            positions = np.flatnonzero(mask.to_numpy(dtype=bool))
+            if isinstance(message, pd.Series):
+                message = message.to_numpy(dtype=object)[positions]
+            findings.append(pd.DataFrame({
+                'index': positions + offset,
+                'code': codes[positions],
+                'controle': rule['id'],
+                'champ': rule['field'],
+                'message': message
+            }))
+
+        if not findings:
+            return pd.DataFrame(columns=['index', 'code', 'controle', 'champ', 'message'])
+        return pd.concat(findings, ignore_index=True).sort_values('index', kind='stable', ignore_index=True)
+
+    def _summary_messages(self, counts):
+        """
+        Formate les messages agrégés à partir de tuples (règle, variante, nombre de lignes en échec)
+        """
+        return [
+            SUMMARY_MESSAGES[(rule['type'], variant)].format(
+                count=count,
+                noun=self.noun,
+                field=rule['field'],
+                message=rule.get('message', ''),
+                allowed=rule.get('allowed_text', '')
+            )
+            for rule, variant, count in counts
+        ]
+
+
+class UniqueIndex:
+    """
+    Index incrémental des valeurs déjà rencontrées pour un champ unique
+
+    Les valeurs sont conservées sous forme d'empreintes 64 bits triées (8 octets par
+    valeur au lieu d'une chaîne Python), ce qui permet de contrôler l'unicité sur un
+    fichier lu par morceaux avec une mémoire bornée. Le risque de collision
+    d'empreintes est négligeable à l'échelle d'une livraison.
+    """
+
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def check_and_add(self, values):
+        """
+        Signale les doublons d'un morceau (déjà vus ou répétés dans le morceau) puis les indexe
+
+        Args:
+            values (Series): Valeurs du champ pour le morceau
+
+        Returns:
+            Series: Masque des lignes en doublon (les occurrences après la première)
+        """
+        present = values.notnull().to_numpy()
+        hashes = pd.util.hash_array(values[present].astype(str).to_numpy(dtype=object))
+
+        positions = np.searchsorted(self.hashes, hashes)
+        seen = np.zeros(len(hashes), dtype=bool)
+        found = positions < len(self.hashes)
+        seen[found] = self.hashes[positions[found]] == hashes[found]
+        duplicated = seen | pd.Series(hashes).duplicated().to_numpy()
+
+        # Fusion de deux suites triées: le tri stable (timsort) est linéaire ici
+        self.hashes = np.sort(np.concatenate([self.hashes, np.sort(hashes[~duplicated])]), kind='stable')
+
+        mask = np.zeros(len(values), dtype=bool)
+        mask[present] = duplicated
+        return pd.Series(mask, index=values.index)
+
+
+class IncrementalValidation:
+    """
+    Validation d'un fichier lu par morceaux
+
+    Les règles sont évaluées sur chaque morceau; les index d'unicité et les compteurs
+    des messages agrégés sont conservés d'un morceau à l'autre, et les positions des
+    anomalies sont exprimées par rapport au début du fichier. La proximité entre
+    adresses est contrôlée au sein de chaque morceau.
+    """
+
+    def __init__(self, plan, context=None):
+        self.plan = plan
+        self.context = context
+        self.indexes = {rule['field']: UniqueIndex() for rule in plan.rules if rule['type'] == 'unique'}
+        self.counts = {}
+        self.offset = 0
+
+    def evaluate(self, df):
+        """
+        Évalue toutes les règles sur le morceau suivant du fichier
+
+        Args:
+            df (DataFrame): Morceau à valider
+
+        Returns:
+            DataFrame: Anomalies du morceau (mêmes colonnes que RulePlan.evaluate_frame)
+        """
+        failures = list(self.plan._iter_frame(df, self.indexes, context=self.context))
+        for rule, variant, mask, _ in failures:
+            entry = self.counts.setdefault((rule['id'], variant), [rule, variant, 0])
+            entry[2] += int(mask.sum())
+
+        findings = self.plan._findings(df, failures, offset=self.offset)
+        self.offset += len(df)
+        return findings
+
+    def summarize(self):
+        """
+        Retourne les messages agrégés pour l'ensemble des morceaux évalués
+
+        Returns:
+            list: Messages d'erreur agrégés
+        """
+        return self.plan._summary_messages(tuple(entry) for entry in self.counts.values())
+
+
+class SpatialFrame:
+    """
+    Géométries d'un DataFrame projetées en Lambert 93 pour les contrôles spatiaux
+
+    Les contrôles portent sur des tableaux de géométries shapely (fonctions
+    vectorisées et STRtree), une valeur manquante valant None.
+    """
+
+    def __init__(self, df, context=None):
+        self.zones = (context or {}).get('zones', {})
+        self.geometries = None
+        geometry_name = getattr(df, '_geometry_column_name', None)
+        if geometry_name is None or geometry_name not in df.columns:
+            return
+        geometry = df.geometry
+        if geometry.crs is None:
+            geometry = geometry.set_crs('EPSG:4326')
+        self.geometries = np.asarray(geometry.to_crs(METRIC_CRS).values, dtype=object)
+
+
+@lru_cache(maxsize=None)
+def get_plan(table):
+    """
+    Retourne le plan compilé des règles d'une table (compilé une seule fois par processus)
+
+    Args:
+        table (str): Nom de la table GRACE THD (ex: 't_adresse')
+
+    Returns:
+        RulePlan: Plan d'exécution des règles
+    """
+    return RulePlan(table, RULES[table])
+
+
+def preload():
+    """
+    Compile les plans de toutes les tables et prépare la transformation vers Lambert 93
+
+    Appelé avant le fork des workers (app.lazy.preload), qui partagent alors ces objets.
+    """
+    for table in RULES:
+        get_plan(table)
+    _to_metric()
+
+
+# Contrôles vectorisés: chaque fonction produit des tuples (variante, masque, message)
+
+def _frame_required(rule, df):
+    field = rule['field']
+    if field not in df.columns:
+        yield 'absent', pd.Series(True, index=df.index), f"Champ obligatoire manquant: {field}"
+    else:
+        yield None, df[field].isnull(), f"Champ obligatoire manquant: {field}"
+
+
+def _frame_regex(rule, df):
+    field = rule['field']
+    if field not in df.columns:
+        return
+    present = df[field].notnull()
+    invalid = pd.Series(False, index=df.index)
+    invalid[present] = ~df.loc[present, field].astype(str).str.match(rule['pattern']).astype(bool)
+    yield None, invalid, f"Format invalide pour {field}: {rule['message']}"
+
+
+def _frame_range(rule, df):
+    field = rule['field']
+    if field not in df.columns:
+        return
+    numeric = pd.to_numeric(df[field], errors='coerce')
+    yield 'non_numerique', df[field].notnull() & numeric.isnull(), f"Le champ {field} contient une valeur non numérique"
+    yield None, (numeric < rule['min']) | (numeric > rule['max']), f"Valeur hors limites pour {field}: {rule['message']}"
+
+
+def _frame_enum(rule, df):
+    field = rule['field']
+    if field not in df.columns:
+        return
+    as_text = df[field].astype(str)
+    invalid = df[field].notnull() & ~as_text.isin(rule['allowed'])
+    yield None, invalid, (f"Valeur non autorisée pour {field}: " + as_text
+                          + f". Valeurs autorisées: {rule['allowed_text']}")
+
+
+def _frame_unique(rule, df):
+    field = rule['field']
+    if field not in df.columns:
+        return
+    # Les occurrences après la première sont signalées
+    yield None, df[field].notnull() & df[field].duplicated(), f"Valeur en doublon pour le champ unique {field}"
+
+
+def _frame_geometry(rule, df):
+    geometry_name = getattr(df, '_geometry_column_name', None)
+    if geometry_name is None or geometry_name not in df.columns:
+        return
+    geometry = df.geometry
+    yield None, geometry.notnull() & ~geometry.is_valid, "Géométrie invalide"
+
+
+def _frame_cross_field(rule, df):
+    if not all(field in df.columns for field in rule['fields']):
+        return
+    if rule['check'] == 'paired':
+        present = df[rule['fields']].notnull()
+        yield None, present.any(axis=1) & ~present.all(axis=1), rule['message']
+
+
+def _frame_unique_indexed(rule, df, index):
+    field = rule['field']
+    if field not in df.columns:
+        return
+    # Doublons par rapport aux morceaux précédents comme au sein du morceau
+    yield None, index.check_and_add(df[field]), f"Valeur en doublon pour le champ unique {field}"
+
+
+# Contrôles spatiaux: mêmes tuples, à partir des géométries projetées (SpatialFrame)
+
+def _spatial_proximity(rule, df, spatial):
+    if spatial.geometries is None:
+        return
+    # Paires d'adresses voisines par l'index STRtree, sans comparaison deux à deux
+    tree = shapely.STRtree(spatial.geometries)
+    first, second = tree.query(spatial.geometries, predicate='dwithin', distance=rule['distance'])
+    pairs = first < second
+    if not pairs.any():
+        return
+    # Chaque adresse est signalée une fois, par rapport à la première adresse voisine du fichier
+    neighbours = pd.Series(first[pairs]).groupby(second[pairs]).min()
+    mask = np.zeros(len(df), dtype=bool)
+    mask[neighbours.index.to_numpy()] = True
+    if rule['key'] in df.columns:
+        labels = df[rule['key']].astype(str).to_numpy(dtype=object)
+    else:
+        labels = np.array([f"ligne {position + 1}" for position in range(len(df))], dtype=object)
+    message = np.full(len(df), None, dtype=object)
+    message[neighbours.index.to_numpy()] = (
+        f"Position à moins de {rule['distance']:g} m de l'adresse " + pd.Series(labels[neighbours.to_numpy()])
+    ).to_numpy(dtype=object)
+    yield None, pd.Series(mask, index=df.index), pd.Series(message, index=df.index)
+
+
+def _spatial_position(rule, df, spatial):
+    if spatial.geometries is None or not all(field in df.columns for field in rule['fields']):
+        return
+    x, y = (pd.to_numeric(df[field], errors='coerce').to_numpy(dtype=float) for field in rule['fields'])
+    present = ~np.isnan(x) & ~np.isnan(y)
+    distance = np.full(len(df), np.nan)
+    distance[present] = shapely.distance(spatial.geometries[present], shapely.points(x[present], y[present]))
+    mask = present & (distance > rule['distance'])
+    message = (
+        "Géométrie à " + pd.Series(np.nan_to_num(distance).round().astype(np.int64), index=df.index).astype(str)
+        + f" m des coordonnées {', '.join(rule['fields'])} (tolérance {rule['distance']:g} m)"
+    )
+    yield None, pd.Series(mask, index=df.index), message
+
+
+def _spatial_zone(rule, df, spatial):
+    if spatial.geometries is None:
+        return
+    present = ~shapely.is_missing(spatial.geometries)
+    outside = []
+    for table in rule['zones']:
+        polygons = spatial.zones.get(table)
+        if polygons is None or len(polygons) == 0:
+            continue
+        # Adresses contenues dans au moins un polygone de la table (bord compris)
+        tree = shapely.STRtree(polygons)
+        inside, _ = tree.query(spatial.geometries, predicate='intersects')
+        mask = present.copy()
+        mask[inside] = False
+        outside.append((table, mask))
+    if not outside:
+        return
+    mask = np.logical_or.reduce([table_mask for _, table_mask in outside])
+    tables = pd.Series('', index=df.index)
+    for table, table_mask in outside:
+        tables = tables.where(~table_mask, tables + ', ' + table)
+    yield None, pd.Series(mask, index=df.index), "Adresse hors des zones " + tables.str.lstrip(', ')
+
+
+_SPATIAL_CHECKS = {
+    'proximity': _spatial_proximity,
+    'position': _spatial_position,
+    'zone': _spatial_zone,
+}
+
+
+_FRAME_CHECKS = {
+    'required': _frame_required,
+    'regex': _frame_regex,
+    'range': _frame_range,
+    'enum': _frame_enum,
+    'unique': _frame_unique,
+    'geometry': _frame_geometry,
+    'cross_field': _frame_cross_field,
+}
+
+
+# Contrôles d'un objet isolé: chaque fonction retourne le message d'erreur ou None
+
+def _object_required(rule, obj):
+    if getattr(obj, rule['field'], None) is None:
+        return f"Champ obligatoire manquant: {rule['field']}"
+    return None
+
+
+def _object_regex(rule, obj):
+    value = getattr(obj, rule['field'], None)
+    if value is not None and not rule['pattern'].match(str(value)):
+        return f"Format invalide pour {rule['field']}: {rule['message']}"
+    return None
+
+
+def _object_range(rule, obj):
+    value = getattr(obj, rule['field'], None)
+    if value is None:
+        return None
+    try:
+        numeric_val = float(value)
+    except (TypeError, ValueError):
+        return f"Le champ {rule['field']} contient une valeur non numérique"
+    if numeric_val < rule['min'] or numeric_val > rule['max']:
+        return f"Valeur hors limites pour {rule['field']}: {rule['message']}"
+    return None
+
+
+def _object_enum(rule, obj):
+    value = getattr(obj, rule['field'], None)
+    if value is not None and str(value) not in rule['allowed']:
+        return f"Valeur non autorisée pour {rule['field']}: {value}. Valeurs autorisées: {rule['allowed_text']}"
+    return None
+
+
+def _object_geometry(rule, obj):
+    value = getattr(obj, rule['field'], None)
+    if value is None:
+        return None
+    if not to_shape(value).is_valid:
+        return "Géométrie invalide"
+    return None
+
+
+def _object_cross_field(rule, obj):
+    if rule['check'] == 'paired':
+        present = [getattr(obj, field, None) is not None for field in rule['fields']]
+        if any(present) and not all(present):
+            return rule['message']
+    return None
+
+
+def _object_position(rule, obj):
+    value = getattr(obj, 'geom', None)
+    coordinates = [getattr(obj, field, None) for field in rule['fields']]
+    if value is None or any(coordinate is None for coordinate in coordinates):
+        return None
+    try:
+        x, y = (float(coordinate) for coordinate in coordinates)
+    except (TypeError, ValueError):
+        return None
+    geometry = transform(_to_metric().transform, to_shape(value))
+    distance = geometry.distance(shapely.Point(x, y))
+    if distance > rule['distance']:
+        return (f"Géométrie à {round(distance)} m des coordonnées {', '.join(rule['fields'])} "
+                f"(tolérance {rule['distance']:g} m)")
+    return None
+
+
+@lru_cache(maxsize=None)
+def _to_metric():
+    return Transformer.from_crs('EPSG:4326', METRIC_CRS, always_xy=True)
+
+
+_OBJECT_CHECKS = {
+    'required': _object_required,
+    'regex': _object_regex,
+    'range': _object_range,
+    'enum': _object_enum,
+    'geometry': _object_geometry,
+    'cross_field': _object_cross_field,
+    'position': _object_position,
+}
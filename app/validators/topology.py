@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+
+
+class NetworkGraph:
+    """
+    Graphe non orienté du réseau, en tableaux d'entiers au format CSR
+
+    Les nœuds sont numérotés de 0 à n-1 (codes factorisés par hachage) et les arêtes
+    de 0 à m-1. Les voisins du nœud i sont indices[indptr[i]:indptr[i + 1]], les arêtes
+    correspondantes edges[indptr[i]:indptr[i + 1]]: quelques tableaux numpy au lieu d'un
+    objet par nœud, parcourus par opérations vectorisées.
+    """
+
+    def __init__(self, node_count, sources, targets):
+        """
+        Args:
+            node_count (int): Nombre de nœuds
+            sources (ndarray): Nœud de départ de chaque arête
+            targets (ndarray): Nœud d'arrivée de chaque arête
+        """
+        self.node_count = node_count
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int64)
+
+        # Chaque arête apparaît dans la liste des deux nœuds qu'elle relie
+        ends = np.concatenate([self.sources, self.targets])
+        others = np.concatenate([self.targets, self.sources])
+        edges = np.tile(np.arange(len(self.sources), dtype=np.int64), 2)
+        order = np.argsort(ends)
+        self.indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ends, minlength=node_count), out=self.indptr[1:])
+        self.indices = others[order]
+        self.edges = edges[order]
+
+    @classmethod
+    def from_codes(cls, node_codes, sources, targets):
+        """
+        Construit le graphe à partir des codes des nœuds et des extrémités des arêtes
+
+        Une extrémité absente de node_codes devient un nœud supplémentaire; une arête
+        dont une extrémité est vide est ignorée.
+
+        Args:
+            node_codes (Series): Codes des nœuds
+            sources (Series): Code du nœud de départ de chaque arête
+            targets (Series): Code du nœud d'arrivée de chaque arête
+
+        Returns:
+            tuple: (graphe, Index des codes par numéro de nœud, masque des arêtes retenues)
+        """
+        kept = (sources.notna() & targets.notna()).to_numpy()
+        values = pd.concat([node_codes.dropna(), sources[kept], targets[kept]], ignore_index=True)
+        numbers, codes = pd.factorize(values)
+        offset = len(values) - 2 * int(kept.sum())
+        edge_count = int(kept.sum())
+        graph = cls(len(codes), numbers[offset:offset + edge_count], numbers[offset + edge_count:])
+        return graph, pd.Index(codes, dtype=object), kept
+
+    def degree(self):
+        """
+        Returns:
+            ndarray: Nombre d'arêtes de chaque nœud (une boucle compte deux fois)
+        """
+        return np.diff(self.indptr)
+
+    def components(self):
+        """
+        Numérote les composantes connexes
+
+        Accrochage des racines par la plus petite étiquette voisine puis compression des
+        chemins (saut de pointeurs): un nombre d'itérations logarithmique, chacune en
+        opérations vectorisées sur toutes les arêtes.
+
+        Returns:
+            ndarray: Étiquette de composante de chaque nœud (plus petit numéro de la composante)
+        """
+        labels = np.arange(self.node_count, dtype=np.int64)
+        sources, targets = self.sources, self.targets
+        while True:
+            source_labels, target_labels = labels[sources], labels[targets]
+            pending = source_labels != target_labels
+            if not pending.any():
+                return labels
+            # Racine de la plus grande étiquette accrochée à la plus petite
+            low = np.minimum(source_labels[pending], target_labels[pending])
+            high = np.maximum(source_labels[pending], target_labels[pending])
+            np.minimum.at(labels, high, low)
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+            # Seules les arêtes reliant encore deux composantes restent à traiter
+            sources, targets = sources[pending], targets[pending]
+
+    def cycle_edges(self):
+        """
+        Repère les arêtes appartenant à un cycle ou reliant deux cycles (2-cœur du graphe)
+
+        Les arêtes parallèles (plusieurs câbles entre les deux mêmes nœuds) et les boucles
+        ne forment pas de cycle: le contrôle porte sur le graphe des paires de nœuds reliés.
+        Seules les composantes comptant au moins autant de paires que de nœuds contiennent
+        un cycle; leurs feuilles sont retirées par vagues successives, chaque vague ne
+        parcourant que les voisins des feuilles retirées.
+
+        Returns:
+            ndarray: Masque des arêtes restantes après élagage des branches
+        """
+        low = np.minimum(self.sources, self.targets)
+        high = np.maximum(self.sources, self.targets)
+        distinct = low != high
+        pairs, pair_of_edge = np.unique(low[distinct] * self.node_count + high[distinct], return_inverse=True)
+        pair_sources, pair_targets = pairs // self.node_count, pairs % self.node_count
+
+        # Les composantes ne dépendent pas des arêtes parallèles: celles du graphe complet
+        labels = self.components()
+        cyclic = np.bincount(labels[pair_sources], minlength=self.node_count) \
+            >= np.bincount(labels, minlength=self.node_count)
+        candidates = np.flatnonzero(cyclic[labels[pair_sources]])
+        simple = NetworkGraph(self.node_count, pair_sources[candidates], pair_targets[candidates])
+        removed = np.zeros(len(candidates), dtype=bool)
+        simple._prune(simple.degree().copy(), removed)
+
+        in_cycle = np.zeros(len(pairs), dtype=bool)
+        in_cycle[candidates[~removed]] = True
+        result = np.zeros(len(self.sources), dtype=bool)
+        result[np.flatnonzero(distinct)] = in_cycle[pair_of_edge]
+        return result
+
+    def _prune(self, degree, removed, batch_size=64):
+        """
+        Retire les feuilles jusqu'à ce que tous les nœuds restants aient au moins deux arêtes
+
+        Vagues vectorisées tant qu'elles sont nombreuses, puis parcours séquentiel:
+        une longue chaîne pendante donnerait sinon une vague par nœud.
+
+        Args:
+            degree (ndarray): Nombre d'arêtes restantes de chaque nœud (modifié)
+            removed (ndarray): Masque des arêtes retirées (modifié)
+            batch_size (int): Nombre minimal de feuilles pour une vague vectorisée
+        """
+        leaves = np.flatnonzero(degree == 1)
+        while len(leaves) >= batch_size:
+            # Arêtes encore présentes des feuilles de cette vague
+            starts, ends = self.indptr[leaves], self.indptr[leaves + 1]
+            lengths = ends - starts
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            edges = self.edges[positions]
+            live = ~removed[edges]
+            edges, neighbours = edges[live], self.indices[positions][live]
+            # Une arête entre deux feuilles de la même vague n'est retirée qu'une fois
+            edges, first = np.unique(edges, return_index=True)
+            neighbours = neighbours[first]
+            removed[edges] = True
+            degree[leaves] = 0
+            np.subtract.at(degree, neighbours, 1)
+            leaves = np.unique(neighbours[degree[neighbours] == 1])
+
+        if not len(leaves):
+            return
+        indptr, indices, edges = self.indptr.tolist(), self.indices.tolist(), self.edges.tolist()
+        pending, done = leaves.tolist(), removed.tolist()
+        counts = degree.tolist()
+        while pending:
+            leaf = pending.pop()
+            for position in range(indptr[leaf], indptr[leaf + 1]):
+                edge = edges[position]
+                if done[edge]:
+                    continue
+                done[edge] = True
+                counts[leaf] -= 1
+                neighbour = indices[position]
+                counts[neighbour] -= 1
+                if counts[neighbour] == 1:
+                    pending.append(neighbour)
+        removed[:] = done
+        degree[:] = counts
@@ -0,0 +1,3 @@
+"""
+Mesures de performance de bout en bout du validateur sur des livraisons synthétiques
+"""
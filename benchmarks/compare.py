@@ -0,0 +1,81 @@
+"""
+Comparaison de deux fichiers de résultats de benchmarks.run
+
+Les mesures sont rapprochées par livraison (taille, taux d'anomalies, réseau, format)
+et par phase. Le code de sortie vaut 1 si une phase est plus lente que le seuil.
+
+Exemple:
+    python -m benchmarks.compare benchmarks/results/avant.json benchmarks/results/apres.json --threshold 0.1
+"""
+import sys
+import json
+import argparse
+from benchmarks.run import PHASES
+
+# Champs identifiant une mesure d'un fichier à l'autre
+KEY_FIELDS = ('size', 'error_rate', 'network', 'adresse_format', 'phase')
+
+
+def load(path):
+    """
+    Returns:
+        tuple: (description de l'exécution, mesures indexées par KEY_FIELDS)
+    """
+    with open(path) as results_file:
+        run = json.load(results_file)
+    return run, {tuple(result[field] for field in KEY_FIELDS): result for result in run['results']}
+
+
+def compare(before, after, threshold):
+    """
+    Rapproche les mesures communes à deux exécutions
+
+    Args:
+        before (dict): Mesures de référence indexées par KEY_FIELDS
+        after (dict): Mesures comparées
+        threshold (float): Ralentissement relatif toléré (0.1: 10 %)
+
+    Returns:
+        list: Lignes (clé, mesure de référence, mesure comparée, rapport des durées, régression)
+    """
+    rows = []
+    def order(key):
+        # Par livraison puis dans l'ordre d'exécution des phases
+        return key[0], str(key[1:-1]), PHASES.index(key[-1]) if key[-1] in PHASES else len(PHASES)
+
+    for key in sorted(set(before) & set(after), key=order):
+        ratio = after[key]['seconds'] / before[key]['seconds'] if before[key]['seconds'] else None
+        rows.append((key, before[key], after[key], ratio, ratio is not None and ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comparaison de deux exécutions de benchmarks.run")
+    parser.add_argument('before', help="Résultats de référence (JSON)")
+    parser.add_argument('after', help="Résultats comparés (JSON)")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Ralentissement toléré (0.1: 10 %%)")
+    args = parser.parse_args(argv)
+
+    before_run, before = load(args.before)
+    after_run, after = load(args.after)
+    print(f"Référence: {(before_run['commit'] or '?')[:10]} ({before_run['date']})")
+    print(f"Comparé:   {(after_run['commit'] or '?')[:10]} ({after_run['date']})")
+    print(f"{'taille':>9} {'phase':<9} {'avant (s)':>10} {'après (s)':>10} {'rapport':>8} "
+          f"{'Mo avant':>9} {'Mo après':>9}")
+
+    regressions = 0
+    for key, old, new, ratio, regression in compare(before, after, args.threshold):
+        size, phase = key[0], key[-1]
+        regressions += regression
+        print(f"{size:>9} {phase:<9} {old['seconds']:>10.2f} {new['seconds']:>10.2f} "
+              f"{ratio if ratio is not None else float('nan'):>8.2f} "
+              f"{old['peak_rss_mb'] or 0:>9.0f} {new['peak_rss_mb'] or 0:>9.0f}"
+              f"{'  RÉGRESSION' if regression else ''}")
+
+    if regressions:
+        print(f"{regressions} phases plus lentes de plus de {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
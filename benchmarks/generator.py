@@ -0,0 +1,307 @@
+"""
+Génération de livraisons GRACE THD synthétiques pour les mesures de performance
+
+Les tables sont construites par opérations vectorisées (numpy) à partir d'une graine:
+une même combinaison de paramètres produit toujours la même archive. Une fraction
+des lignes (error_rate) reçoit une anomalie détectée par les contrôles.
+"""
+import os
+import shutil
+import tempfile
+import zipfile
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from pyproj import Transformer
+
+# Projection des livraisons (Lambert 93) et emprise des données générées
+CRS = 'EPSG:2154'
+ORIGIN = (829000.0, 6289000.0)
+
+# Espacement des adresses (mètres): au-delà de la distance du contrôle de proximité
+SPACING = 3.0
+
+# Nombre de communes et de voies générées
+COMMUNES = 200
+VOIES = ['RUE DES ECOLES', 'AVENUE DE LA GARE', 'CHEMIN DU MOULIN', 'PLACE DE LA MAIRIE',
+         'RUE DU COMMERCE', 'ROUTE DE NIMES', 'IMPASSE DES LILAS', 'ALLEE DES PINS']
+
+# Fibres par câble et par tube des réseaux générés
+CAPACITY = 12
+MODULO = 6
+
+
+def archive_name(rows, error_rate=0.0, network=False, adresse_format='shp', seed=0):
+    """
+    Nom de fichier d'une livraison générée, unique pour ses paramètres
+
+    Returns:
+        str: Nom de l'archive ZIP
+    """
+    suffix = '_reseau' if network else ''
+    return f"livraison_{rows}_{error_rate:g}_{adresse_format}{suffix}_{seed}.zip"
+
+
+def generate_delivery(path, rows, error_rate=0.0, network=False, adresse_format='shp', seed=0):
+    """
+    Écrit une livraison synthétique dans une archive ZIP
+
+    Args:
+        path (str): Chemin de l'archive à créer
+        rows (int): Nombre d'adresses (t_organisme: une ligne pour 10 adresses)
+        error_rate (float): Part des lignes portant une anomalie (0 à 1)
+        network (bool): Ajouter les tables du réseau (nœuds, câbles, fibres, positions, zones)
+        adresse_format (str): 'shp' (Shapefile) ou 'csv' (géométrie WKT en EPSG:4326)
+        seed (int): Graine du générateur aléatoire
+
+    Returns:
+        dict: Nombre de lignes générées par table
+    """
+    rng = np.random.default_rng(seed)
+    counts = {}
+    work_dir = tempfile.mkdtemp(prefix='livraison_')
+    try:
+        adresses = _adresses(rng, rows, error_rate)
+        if adresse_format == 'csv':
+            to_wgs84 = Transformer.from_crs(CRS, 'EPSG:4326', always_xy=True)
+            longitude, latitude = to_wgs84.transform(adresses['x'].to_numpy(), adresses['y'].to_numpy())
+            table = adresses.drop(columns=['x', 'y'])
+            table['geom'] = shapely.to_wkt(shapely.points(longitude, latitude), rounding_precision=7)
+            _write_csv(work_dir, 't_adresse', table)
+        else:
+            _write_vector(work_dir, 't_adresse', adresses.drop(columns=['x', 'y']),
+                          shapely.points(adresses['x'].to_numpy(), adresses['y'].to_numpy()))
+        counts['t_adresse'] = len(adresses)
+
+        organismes = _organismes(rng, max(rows // 10, 1), adresses['ad_code'], error_rate)
+        _write_csv(work_dir, 't_organisme', organismes)
+        counts['t_organisme'] = len(organismes)
+
+        if network:
+            counts.update(_network(rng, work_dir, adresses, error_rate))
+
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+            for name in sorted(os.listdir(work_dir)):
+                archive.write(os.path.join(work_dir, name), name)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return counts
+
+
+def _codes(prefix, count, start=0):
+    """
+    Codes GRACE THD séquentiels (préfixe et numéro sur 12 chiffres)
+    """
+    numbers = np.arange(start, start + count).astype(str)
+    return np.char.add(prefix, np.char.zfill(numbers, 12)).astype(object)
+
+
+def _errors(rng, count, error_rate, kinds):
+    """
+    Tire les lignes en anomalie et le type d'anomalie de chacune
+
+    Returns:
+        ndarray: Indice du type d'anomalie par ligne (-1: ligne sans anomalie)
+    """
+    kind = np.full(count, -1)
+    faulty = rng.random(count) < error_rate
+    kind[faulty] = rng.integers(0, kinds, int(faulty.sum()))
+    return kind
+
+
+def _adresses(rng, rows, error_rate):
+    """
+    Adresses sur une grille régulière légèrement perturbée, coordonnées BAN comprises
+
+    Returns:
+        DataFrame: Colonnes de t_adresse (texte) et coordonnées x, y en Lambert 93
+    """
+    side = int(np.ceil(np.sqrt(rows)))
+    position = np.arange(rows)
+    x = ORIGIN[0] + (position % side) * SPACING + rng.uniform(-0.5, 0.5, rows)
+    y = ORIGIN[1] + (position // side) * SPACING + rng.uniform(-0.5, 0.5, rows)
+    commune = rng.integers(0, COMMUNES, rows)
+    insee = np.char.add('30', np.char.zfill(commune.astype(str), 3))
+    df = pd.DataFrame({
+        'ad_code': _codes('AD', rows),
+        'ad_nomvoie': np.asarray(VOIES, dtype=object)[rng.integers(0, len(VOIES), rows)],
+        'ad_numero': rng.integers(1, 200, rows).astype(str).astype(object),
+        'ad_rep': np.where(rng.random(rows) < 0.05, 'B', None),
+        'ad_insee': insee.astype(object),
+        'ad_postal': insee.astype(object),
+        'ad_commune': np.char.add('COMMUNE ', commune.astype(str)).astype(object),
+        'ad_hexacle': np.char.add('HX', np.char.zfill(position.astype(str), 8)).astype(object),
+        'ad_isole': '0',
+        'ad_prio': '0',
+        'ad_imneuf': '0',
+        'ad_ietat': 'CI',
+        'ad_nblres': rng.integers(0, 10, rows).astype(str).astype(object),
+        'ad_x_ban': np.round(x + rng.uniform(-5, 5, rows), 2).astype(str).astype(object),
+        'ad_y_ban': np.round(y + rng.uniform(-5, 5, rows), 2).astype(str).astype(object),
+        'ad_creadat': '2024-01-15 10:00:00',
+        'x': x,
+        'y': y,
+    })
+
+    # Anomalies: champ obligatoire, format, valeur, doublon de code, écart BAN, doublon de position
+    kind = _errors(rng, rows, error_rate, 6)
+    df.loc[kind == 0, 'ad_nomvoie'] = None
+    df.loc[kind == 1, 'ad_insee'] = '3A0' + df.loc[kind == 1, 'ad_insee'].str[3:]
+    df.loc[kind == 2, 'ad_isole'] = '2'
+    previous = np.maximum(position - 1, 0)
+    duplicate_code = np.flatnonzero(kind == 3)
+    df.loc[duplicate_code, 'ad_code'] = df['ad_code'].to_numpy()[previous[duplicate_code]]
+    df.loc[kind == 4, 'ad_x_ban'] = (x[kind == 4] + 500).round(2).astype(str)
+    same_position = np.flatnonzero(kind == 5)
+    df.loc[same_position, 'x'] = x[previous[same_position]]
+    df.loc[same_position, 'y'] = y[previous[same_position]]
+    return df
+
+
+def _organismes(rng, rows, adresse_codes, error_rate):
+    """
+    Organismes rattachés à des adresses de la livraison
+
+    Returns:
+        DataFrame: Colonnes de t_organisme (texte)
+    """
+    position = np.arange(rows)
+    df = pd.DataFrame({
+        'or_code': _codes('OR', rows),
+        'or_nom': np.char.add('ORGANISME ', position.astype(str)).astype(object),
+        'or_type': np.asarray(['PROP', 'GEST', 'MOE'], dtype=object)[position % 3],
+        'or_siret': np.char.zfill(position.astype(str), 14).astype(object),
+        'or_siren': np.char.zfill(position.astype(str), 9).astype(object),
+        'or_postal': '30000',
+        'or_commune': 'NIMES',
+        'or_ad_code': adresse_codes.to_numpy()[rng.integers(0, len(adresse_codes), rows)],
+        'or_telfixe': '0466000000',
+        'or_mail': np.char.add(np.char.add('contact', position.astype(str)), '@exemple.fr').astype(object),
+    })
+
+    # Anomalies: champ obligatoire, SIRET, adresse de courriel, référence à une adresse absente
+    kind = _errors(rng, rows, error_rate, 4)
+    df.loc[kind == 0, 'or_nom'] = None
+    df.loc[kind == 1, 'or_siret'] = '123'
+    df.loc[kind == 2, 'or_mail'] = 'contact.exemple.fr'
+    df.loc[kind == 3, 'or_ad_code'] = 'AD_INCONNUE'
+    return df
+
+
+def _network(rng, work_dir, adresses, error_rate):
+    """
+    Réseau arborescent NRO -> SRO -> PBO: un nœud pour 10 adresses
+
+    Chaque nœud (hors NRO) est relié par un câble à un nœud précédent proche; chaque
+    câble porte CAPACITY fibres, épissurées dans une cassette du nœud d'arrivée.
+
+    Returns:
+        dict: Nombre de lignes générées par table
+    """
+    count = max(len(adresses) // 10, 2)
+    sample = np.sort(rng.choice(len(adresses), count, replace=False))
+    x, y = adresses['x'].to_numpy()[sample], adresses['y'].to_numpy()[sample]
+    nodes = _codes('ND', count)
+    _write_vector(work_dir, 't_noeud', pd.DataFrame({'nd_code': nodes}), shapely.points(x, y))
+
+    # Arbre: le parent de chaque nœud est l'un des 20 nœuds précédents
+    child = np.arange(1, count)
+    parent = np.maximum(child - rng.integers(1, 21, count - 1), 0)
+    cables = _codes('CB', count - 1)
+    cable_frame = pd.DataFrame({
+        'cb_code': cables,
+        'cb_nd1': nodes[parent],
+        'cb_nd2': nodes[child],
+        'cb_capafo': str(CAPACITY),
+        'cb_modulo': str(MODULO),
+    })
+    lines = shapely.linestrings(np.stack([np.stack([x[parent], y[parent]], axis=1),
+                                          np.stack([x[child], y[child]], axis=1)], axis=1))
+
+    # Anomalies: extrémité déclarée différente de la géométrie (crée aussi un cycle)
+    kind = _errors(rng, count - 1, error_rate, 1)
+    wrong = np.flatnonzero(kind == 0)
+    cable_frame.loc[wrong, 'cb_nd2'] = nodes[rng.integers(0, count, len(wrong))]
+    _write_csv(work_dir, 't_cable', cable_frame)
+    _write_vector(work_dir, 't_cableline', pd.DataFrame({'cl_code': _codes('CL', count - 1), 'cl_cb_code': cables}), lines)
+
+    # Zones: un NRO couvrant l'emprise, des SRO en bandes verticales
+    margin = 10.0
+    xmin, ymin = adresses['x'].min() - margin, adresses['y'].min() - margin
+    xmax, ymax = adresses['x'].max() + margin, adresses['y'].max() + margin
+    _write_vector(work_dir, 't_znro', pd.DataFrame({'zn_code': ['ZN000000000001'], 'zn_nd_code': [nodes[0]]}),
+                  [shapely.box(xmin, ymin, xmax, ymax)])
+    bands = max(min(count // 100, 50), 1)
+    edges = np.linspace(xmin, xmax, bands + 1)
+    sro_nodes = nodes[np.linspace(1, count - 1, bands).astype(int)]
+    _write_vector(work_dir, 't_zsro', pd.DataFrame({
+        'zs_code': _codes('ZS', bands), 'zs_nd_code': sro_nodes, 'zs_zn_code': 'ZN000000000001'
+    }), shapely.box(edges[:-1], ymin, edges[1:], ymax))
+
+    # Boîtiers PBO sur un nœud sur dix
+    boxes = np.arange(0, count, 10)
+    ptech = _codes('PT', len(boxes))
+    _write_csv(work_dir, 't_ptech', pd.DataFrame({'pt_code': ptech, 'pt_nd_code': nodes[boxes]}))
+    _write_csv(work_dir, 't_ebp', pd.DataFrame({
+        'bp_code': _codes('BP', len(boxes)), 'bp_pt_code': ptech, 'bp_typelog': 'PBO'
+    }))
+
+    # Fibres: CAPACITY par câble, rangées par tubes de MODULO fibres
+    fibre_count = (count - 1) * CAPACITY
+    rank = np.arange(fibre_count) % CAPACITY
+    fibres = pd.DataFrame({
+        'fo_code': _codes('FO', fibre_count),
+        'fo_cb_code': np.repeat(cables, CAPACITY),
+        'fo_nincab': (rank + 1).astype(str).astype(object),
+        'fo_numtub': (rank // MODULO + 1).astype(str).astype(object),
+        'fo_nintub': (rank % MODULO + 1).astype(str).astype(object),
+    })
+    # Anomalies: rang en double dans le câble
+    kind = _errors(rng, fibre_count, error_rate, 1)
+    fibres.loc[(kind == 0) & (rank > 0), 'fo_nincab'] = '1'
+    _write_csv(work_dir, 't_fibre', fibres)
+
+    # Cassettes (une par nœud d'arrivée) et épissures: fibre du câble amont vers celle du câble aval
+    cassettes = _codes('CS', count)
+    _write_csv(work_dir, 't_cassette', pd.DataFrame({'cs_code': cassettes, 'cs_nb_pas': None}))
+    upstream = np.repeat(child, CAPACITY)
+    positions = pd.DataFrame({
+        'ps_code': _codes('PS', fibre_count),
+        'ps_1': fibres['fo_code'].to_numpy(),
+        'ps_2': None,
+        'ps_cs_code': cassettes[upstream],
+        'ps_fonct': 'AT',
+    })
+    # Anomalies: fibre raccordée deux fois
+    kind = _errors(rng, fibre_count, error_rate, 1)
+    repeated = np.flatnonzero((kind == 0) & (np.arange(fibre_count) > 0))
+    positions.loc[repeated, 'ps_1'] = positions['ps_1'].to_numpy()[repeated - 1]
+    _write_csv(work_dir, 't_position', positions)
+
+    return {
+        't_noeud': count, 't_cable': count - 1, 't_cableline': count - 1, 't_znro': 1, 't_zsro': bands,
+        't_ptech': len(boxes), 't_ebp': len(boxes), 't_fibre': fibre_count, 't_cassette': count,
+        't_position': fibre_count,
+    }
+
+
+def _write_csv(work_dir, table, df):
+    df.to_csv(os.path.join(work_dir, f"{table}.csv"), sep=';', index=False)
+
+
+def _write_vector(work_dir, table, df, geometries):
+    """
+    Écrit un Shapefile, chaque champ texte ayant la largeur de sa plus longue valeur
+
+    Les champs de 254 caractères attribués par défaut porteraient le DBF au-delà de sa
+    taille maximale (2 Go) pour quelques millions de lignes.
+    """
+    df = df.reset_index(drop=True)
+    gdf = gpd.GeoDataFrame(df, geometry=np.asarray(geometries, dtype=object), crs=CRS)
+    properties = {}
+    for column in df.columns:
+        values = df[column].dropna().astype(str)
+        properties[column] = f"str:{max(int(values.str.len().max()), 1) if len(values) else 1}"
+    schema = {'geometry': gdf.geom_type.iloc[0], 'properties': properties}
+    gdf.to_file(os.path.join(work_dir, f"{table}.shp"), encoding='utf-8', schema=schema)
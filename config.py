@@ -14,6 +14,31 @@ class Config:
     REPORTS_FOLDER = os.path.join(UPLOAD_FOLDER, 'reports')
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 Mo max pour les uploads
     
+    # Imports en tâche de fond
+    JOBS_DATABASE = os.environ.get('JOBS_DATABASE') or os.path.join(UPLOAD_FOLDER, 'jobs.db')
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 2))  # Nombre d'imports simultanés par processus
+    IMPORT_PROCESSES = int(os.environ.get('IMPORT_PROCESSES', os.cpu_count() or 1))  # Processus de lecture/validation des tables
+    IMPORT_MEMORY_BUDGET = int(os.environ.get('IMPORT_MEMORY_BUDGET', 256 * 1024 * 1024))  # Mémoire par table (octets) avant lecture par morceaux
+    PARSED_CACHE_FOLDER = os.environ.get('PARSED_CACHE_FOLDER') or os.path.join(UPLOAD_FOLDER, 'cache')  # Tables analysées (Parquet)
+    PARSED_CACHE_MAX_SIZE = int(os.environ.get('PARSED_CACHE_MAX_SIZE', 5 * 1024 ** 3))  # Taille maximale du cache Parquet (octets)
+    VALIDATION_CACHE_FOLDER = os.environ.get('VALIDATION_CACHE_FOLDER') or os.path.join(UPLOAD_FOLDER, 'validation_cache')
+    VALIDATION_CACHE_MAX_SIZE = int(os.environ.get('VALIDATION_CACHE_MAX_SIZE', 1024 ** 3))  # Taille maximale du cache des résultats (octets)
+    IMPORT_INCREMENTAL = os.environ.get('IMPORT_INCREMENTAL', '').lower() in ('1', 'true', 'oui')  # Adresses: écrire seulement les lignes modifiées et supprimer les absentes
+    IMPORT_JOB_HEARTBEAT = int(os.environ.get('IMPORT_JOB_HEARTBEAT', 10))  # Intervalle (secondes) des signes de vie des processus exécutant des tâches
+    
+    # Rapport de validation
+    VALIDATION_BATCH_MAX = int(os.environ.get('VALIDATION_BATCH_MAX', 1000))  # Objets validés au plus par appel de /api/<table>/validate
+    REPORT_COMPRESS = os.environ.get('REPORT_COMPRESS', '').lower() in ('1', 'true', 'oui')  # Rapport en .csv.gz
+    REPORT_FLUSH_INTERVAL = int(os.environ.get('REPORT_FLUSH_INTERVAL', 10000))  # Lignes écrites entre deux vidages sur disque
+    
+    # Mesures des imports (durée, lignes et requêtes par phase)
+    IMPORT_TRACE_MEMORY = os.environ.get('IMPORT_TRACE_MEMORY', '').lower() in ('1', 'true', 'oui')  # Pic de mémoire par phase (tracemalloc, ralentit l'import)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'oui')  # Exposer /metrics (format Prometheus)
+    
+    # Démarrage: pandas, geopandas et les règles de validation sont chargés au premier import ou
+    # à la première validation, sauf préchargement par le processus maître (gunicorn --preload)
+    PRELOAD = os.environ.get('PRELOAD', '').lower() in ('1', 'true', 'oui')
+    
     # Créer les dossiers nécessaires s'ils n'existent pas
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     os.makedirs(REPORTS_FOLDER, exist_ok=True)
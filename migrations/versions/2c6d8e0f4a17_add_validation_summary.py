@@ -0,0 +1,40 @@
+"""Synthèse des résultats de validation
+
+Revision ID: 2c6d8e0f4a17
+Revises: 5f7a9c1e3b62
+Create Date: 2026-10-18 12:08:44.217390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c6d8e0f4a17'
+down_revision = '5f7a9c1e3b62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nombre de lignes de résultat par table, contrôle, statut et commune (celle de
+    # l'adresse, ou de l'adresse de rattachement pour un organisme), rafraîchie après
+    # chaque enregistrement de résultats
+    op.execute("""
+        CREATE MATERIALIZED VIEW gracethd_commun.validation_summary AS
+        SELECT v.table_name, v.controle, v.statut, a.ad_insee, a.ad_commune, count(*) AS nombre
+        FROM gracethd_commun.validation_result v
+        LEFT JOIN gracethd_commun.t_organisme o
+            ON v.table_name = 't_organisme' AND o.or_code = v.code_objet
+        LEFT JOIN gracethd_commun.t_adresse a
+            ON a.ad_code = CASE WHEN v.table_name = 't_adresse' THEN v.code_objet ELSE o.or_ad_code END
+        GROUP BY v.table_name, v.controle, v.statut, a.ad_insee, a.ad_commune
+    """)
+    # Index unique requis par REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index('idx_validation_summary_groupe', 'validation_summary',
+                    ['table_name', 'controle', 'statut', 'ad_insee', 'ad_commune'],
+                    unique=True, schema='gracethd_commun')
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW gracethd_commun.validation_summary')
@@ -0,0 +1,29 @@
+"""Empreintes des adresses pour l'import incrémental
+
+Revision ID: 3b8e1f2a9d47
+Revises: c5f565fd9cee
+Create Date: 2026-10-18 10:05:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e1f2a9d47'
+down_revision = 'c5f565fd9cee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('t_adresse_empreinte',
+    sa.Column('ad_code', sa.String(length=254), nullable=False, comment="Code de l'adresse dans la table t_adresse"),
+    sa.Column('empreinte', sa.BigInteger(), nullable=False, comment="Hachage des valeurs normalisées et de la géométrie (WKB) de l'adresse"),
+    sa.PrimaryKeyConstraint('ad_code'),
+    schema='gracethd_commun'
+    )
+
+
+def downgrade():
+    op.drop_table('t_adresse_empreinte', schema='gracethd_commun')
@@ -0,0 +1,35 @@
+"""Résultats de validation persistés
+
+Revision ID: 5f7a9c1e3b62
+Revises: 8d2c4e6f1a35
+Create Date: 2026-10-18 11:26:03.551870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f7a9c1e3b62'
+down_revision = '8d2c4e6f1a35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('validation_result',
+    sa.Column('table_name', sa.String(length=64), nullable=False, comment="Table de l'objet validé (ex: t_adresse)"),
+    sa.Column('code_objet', sa.String(length=254), nullable=False, comment="Code de l'objet validé"),
+    sa.Column('controle', sa.String(length=100), nullable=False, comment="Identifiant du contrôle ('Validation complète' pour le statut de l'objet)"),
+    sa.Column('statut', sa.String(length=3), nullable=False, comment='Résultat du contrôle (OK/NOK)'),
+    sa.Column('message', sa.Text(), nullable=True, comment='Message du contrôle'),
+    sa.Column('ruleset_version', sa.String(length=12), nullable=False, comment='Version du jeu de règles utilisée (RULESET_VERSION)'),
+    sa.Column('empreinte', sa.BigInteger(), nullable=True, comment="Empreinte de l'objet validé, sur la ligne de statut (import incrémental)"),
+    sa.Column('validated_at', sa.DateTime(), nullable=False, comment='Date de la validation'),
+    sa.PrimaryKeyConstraint('table_name', 'code_objet', 'controle'),
+    schema='gracethd_commun'
+    )
+
+
+def downgrade():
+    op.drop_table('validation_result', schema='gracethd_commun')
@@ -0,0 +1,36 @@
+"""Index de recherche des adresses
+
+Revision ID: 8d2c4e6f1a35
+Revises: 3b8e1f2a9d47
+Create Date: 2026-10-18 10:41:37.902214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2c4e6f1a35'
+down_revision = '3b8e1f2a9d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Recherche approchante et par préfixe (ILIKE) sur le nom de commune
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.batch_alter_table('t_adresse', schema='gracethd_commun') as batch_op:
+        batch_op.create_index('idx_t_adresse_ad_insee', ['ad_insee'], unique=False)
+        batch_op.create_index('idx_t_adresse_ad_postal', ['ad_postal'], unique=False)
+        batch_op.create_index('idx_t_adresse_ad_ietat', ['ad_ietat'], unique=False)
+        batch_op.create_index('idx_t_adresse_ad_commune_trgm', ['ad_commune'], unique=False,
+                              postgresql_using='gin', postgresql_ops={'ad_commune': 'gin_trgm_ops'})
+    # L'emprise (geom &&) utilise l'index GiST idx_t_adresse_geom de la migration initiale
+
+
+def downgrade():
+    with op.batch_alter_table('t_adresse', schema='gracethd_commun') as batch_op:
+        batch_op.drop_index('idx_t_adresse_ad_commune_trgm', postgresql_using='gin')
+        batch_op.drop_index('idx_t_adresse_ad_ietat')
+        batch_op.drop_index('idx_t_adresse_ad_postal')
+        batch_op.drop_index('idx_t_adresse_ad_insee')
@@ -1,12 +1,15 @@
 from app import create_app, db
 from app.models.adresse import Adresse
 
-app = create_app()
-
-@app.shell_context_processor
 def make_shell_context():
     """Configure les objets disponibles dans le shell Flask"""
     return {'db': db, 'Adresse': Adresse}
 
+# Les processus du pool d'import, lancés par 'spawn', réimportent ce module sous le nom
+# __mp_main__: ils n'exécutent que la préparation des tables et n'ont pas besoin de l'application
+if __name__ != '__mp_main__':
+    app = create_app()
+    app.shell_context_processor(make_shell_context)
+
 if __name__ == '__main__':
     app.run(debug=True)